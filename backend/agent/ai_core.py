@@ -1,40 +1,69 @@
-import os
-import json
 import logging
-import openai
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from random import random
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, transaction
+from .concurrency import run_concurrently
+from .grading import submit_for_grading
+from .llm import get_llm_client
+from .notifications import notify_new_task
 from .models import User, Task, UserTask, LearningPath
-from .views import send_telegram_notification
+from .blockchain import averify_transaction_on_chain, verify_transaction_on_chain
+from .requirements import get_task_matcher
+from .payouts import queue_token_reward
+from .prompt_cache import task_template_cache, task_fingerprint
+from .recommendations import recommend_quests
+from .structured import check_quiz
+from .task_dedup import find_similar_task
+from .task_pool import return_pooled_task, take_pooled_task
+from .tx_index import find_proof_owner, claim_transaction
+from .view_cache import invalidate_users
+from .xp_ledger import complete_user_task, level_for_xp
 
 logger = logging.getLogger(__name__)
 
+PASS_SCORE = 7  # Submission score out of 10 needed to pass
+
+# Follow-up suggestions from async views may call the model; they run here
+# so the response does not wait for them
+_suggestion_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="suggest")
+
 
 class LearnEarnAIAgent:
     """Core AI agent for the Learn & Earn platform"""
 
-    def __init__(self):
+    def __init__(self, llm=None):
         """Initialize the AI agent"""
-        # Get OpenAI API key from environment
-        self.openai_api_key = os.environ.get("CONNECTION_CONFIGS_CONFIG_OPENAI_API_KEY")
-        if not self.openai_api_key:
-            logger.error("OpenAI API key not found in environment variables")
-        else:
-            openai.api_key = self.openai_api_key
+        # All prompts go through one client (backend, timeouts, retries)
+        self.llm = llm or get_llm_client()
 
-    def generate_ai_task(self, user, topic=None, task_type="learning"):
+    def generate_ai_task(self, user, topic=None, task_type="learning", difficulty=None):
         """Auto-create a task matching user's level and interests"""
         if not topic:
-            topic = list(user.interests.keys())[0]  # Use primary interest
+            topic = list(user.interests.values())[0]  # Use primary interest
 
+        task_data = self._get_task_data(user.level, topic, task_type, difficulty)
+        return self._save_ai_task(user.level, task_data, task_type, user=user)
+
+    def _get_task_data(self, level, topic, task_type, difficulty=None):
+        """Serve task data from the template cache, generating on a miss"""
+        return task_template_cache.get_or_generate(
+            task_fingerprint(topic, level, task_type, difficulty),
+            partial(self._request_task_data, level, topic, task_type, difficulty),
+        )
+
+    def _request_task_data(self, level, topic, task_type, difficulty=None):
+        """Ask the model for a task and its verification data (no DB access)"""
         prompt = f"""
-    Create a {task_type} task about {topic} for a Web3 learner (Level {user.level}).
+    Create a {task_type} task about {topic} for a Web3 learner (Level {level}).
+    {"" if not difficulty else f"Difficulty: {difficulty}"}
     Format as JSON with:
     - title: Max 8 words
     - description: 1-2 sentences
     - verification_type: quiz/transaction/social_proof
-    - xp_reward: {10 * user.level} to {20 * user.level}
+    - xp_reward: {10 * level} to {20 * level}
     - token_reward: Half of XP value
-        {"" if task_type != "quest" else "- project: 'AI Generated'"}
     
         Example for Level 1 DeFi:
         {{
@@ -46,17 +75,20 @@ class LearnEarnAIAgent:
         }}
         """
 
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
+        task_data = self.llm.complete_structured(
+            [{"role": "user", "content": prompt}], "task"
         )
+        task_data["verification_data"] = self._generate_verification_data(task_data)
+        return task_data
 
-        task_data = json.loads(response.choices[0].message.content)
-        return self._save_ai_task(user, task_data, task_type)
+    def _save_ai_task(self, level, task_data, task_type, user=None):
+        """Save generated task to DB, reusing a near-duplicate if one exists"""
+        task = find_similar_task(
+            task_data["title"], task_data["description"], task_type, level, user
+        )
+        if task is not None:
+            return task
 
-    def _save_ai_task(self, user, task_data, task_type):
-        """Save generated task to DB"""
         task = Task.objects.create(
             title=task_data["title"],
             description=task_data["description"],
@@ -64,8 +96,8 @@ class LearnEarnAIAgent:
             xp_reward=task_data["xp_reward"],
             token_reward=task_data.get("token_reward", task_data["xp_reward"] // 2),
             verification_type=task_data["verification_type"],
-            min_level=user.level,
-            verification_data=self._generate_verification_data(task_data),
+            min_level=level,
+            verification_data=task_data["verification_data"],
         )
         return task
 
@@ -80,8 +112,9 @@ class LearnEarnAIAgent:
             - options: Array of 4 strings
             - correct_answer: String (exact option text)
             """
-            response = openai.ChatCompletion.create(...)
-            return json.loads(response.choices[0].message.content)
+            return self.llm.complete_structured(
+                [{"role": "user", "content": prompt}], "quiz", check=check_quiz
+            )
         return {}  # Other types handled during verification
 
     def create_personalized_path(self, user_id, interest):
@@ -89,45 +122,92 @@ class LearnEarnAIAgent:
         try:
             user = User.objects.get(telegram_id=user_id)
 
-            # Create learning path container
-            learning_path = LearningPath.objects.create(
-                user=user, topic=interest, status="active"
-            )
-
-            # Generate progressive tasks
+            # Generate progressive tasks, scaling difficulty with position
             task_types = ["learning", "practice", "quest"]  # Basic progression
-            generated_tasks = []
-
-            for i, task_type in enumerate(task_types):
-                # Scale difficulty based on position in path
-                difficulty = {
-                    "learning": "beginner",
-                    "practice": "intermediate",
-                    "quest": "advanced",
-                }[task_type]
-
-                # Generate task
-                task = self.generate_ai_task(
-                    user=user,
-                    topic=interest,
-                    task_type=task_type,
-                    difficulty=difficulty,
-                )
+            difficulties = {
+                "learning": "beginner",
+                "practice": "intermediate",
+                "quest": "advanced",
+            }
 
-                # Connect to path
-                UserTask.objects.create(
-                    user=user,
-                    task=task,
-                    learning_path=learning_path,
-                    status="pending",
-                    order=i + 1,  # Track progression order
+            # Take pre-generated tasks first; only empty buckets need the model
+            pooled = {
+                task_type: take_pooled_task(
+                    user.level, interest, task_type, difficulties[task_type], self
+                )
+                for task_type in task_types
+            }
+            missing = [task_type for task_type in task_types if not pooled[task_type]]
+
+            try:
+                # Model calls are independent, so run them all at once; results
+                # come back in the order they were submitted
+                generated = dict(
+                    zip(
+                        missing,
+                        run_concurrently(
+                            [
+                                partial(
+                                    self._get_task_data,
+                                    user.level,
+                                    interest,
+                                    task_type,
+                                    difficulties[task_type],
+                                )
+                                for task_type in missing
+                            ]
+                        ),
+                    )
                 )
 
-                # Send notification for quests only
-                if task_type == "quest":
-                    send_telegram_notification(user.telegram_id, task)
-
-                generated_tasks.append(task)
+                with transaction.atomic():
+                    # Create learning path container
+                    learning_path = LearningPath.objects.create(
+                        user=user,
+                        topic=interest,
+                        status="active",
+                        task_count=len(task_types),
+                    )
+
+                    generated_tasks = [
+                        pooled[task_type]
+                        or self._save_ai_task(
+                            user.level, generated[task_type], task_type, user=user
+                        )
+                        for task_type in task_types
+                    ]
+
+                    # Connect to path; task_count above already covers these rows
+                    UserTask.objects.bulk_create(
+                        [
+                            UserTask(
+                                user=user,
+                                task=task,
+                                learning_path=learning_path,
+                                status="pending",
+                                order=i + 1,  # Track progression order
+                            )
+                            for i, task in enumerate(generated_tasks)
+                        ]
+                    )
+                    invalidate_users([user.id])
+            except Exception:
+                # Taking an entry deleted it, so a failed path must hand it back
+                for task_type, task in pooled.items():
+                    if task:
+                        return_pooled_task(
+                            task,
+                            user.level,
+                            interest,
+                            task_type,
+                            difficulties[task_type],
+                        )
+                raise
+
+            # Send notification for quests only
+            for task in generated_tasks:
+                if task.task_type == "quest":
+                    notify_new_task(user.telegram_id, task)
 
             # Generate path description using GPT
             path_description = self._generate_path_description(
@@ -135,7 +215,7 @@ class LearnEarnAIAgent:
             )
 
             learning_path.description = path_description
-            learning_path.save()
+            learning_path.save(update_fields=["description", "updated_at"])
 
             return {
                 "success": True,
@@ -156,35 +236,54 @@ class LearnEarnAIAgent:
         Tasks:
         {chr(10).join(f"- {t.task_type}: {t.title}" for t in tasks)}
         """
-        response = openai.ChatCompletion.create(
+        return self.llm.complete(
+            [{"role": "user", "content": prompt}],
             model="gpt-3.5-turbo",  # Faster for descriptions
-            messages=[{"role": "user", "content": prompt}],
             max_tokens=100,
         )
-        return response.choices[0].message.content
 
     def verify_task_completion(self, user_task_id, proof_data):
         """Verify if a task has been completed based on proof data"""
         try:
-            user_task = UserTask.objects.get(id=user_task_id)
-            task = user_task.task
-
-            # Different verification logic based on verification type
-            if task.verification_type == "quiz":
-                return self._verify_quiz(user_task, proof_data)
-            elif task.verification_type == "transaction":
-                return self._verify_transaction(user_task, proof_data)
-            elif task.verification_type == "social_proof":
-                return self._verify_social_proof(user_task, proof_data)
-            elif task.verification_type == "submission":
-                return self._verify_submission(user_task, proof_data)
+            user_task = UserTask.objects.select_related("task", "user").get(
+                id=user_task_id
+            )
+            result = self._verify_by_type(user_task, proof_data)
+
+            passed = result["success"] and result.get("passed", True)
+            if passed and random() < 0.3:  # 30% chance to suggest new task
+                self._suggest_next_task(user_task.user)
+
+            return result
+
+        except UserTask.DoesNotExist:
+            return {"success": False, "error": "Task not found"}
+        except Exception as e:
+            logger.error(f"Error verifying task: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def averify_task_completion(self, user_task_id, proof_data):
+        """verify_task_completion for async views
+
+        Transaction proofs are looked up over async RPC; the other kinds are
+        short database work and run in a thread.
+        """
+        try:
+            user_task = await UserTask.objects.select_related("task", "user").aget(
+                id=user_task_id
+            )
+            if user_task.task.verification_type == "transaction":
+                result = await self._averify_transaction(user_task, proof_data)
             else:
-                return {"success": False, "error": "Unknown verification type"}
+                result = await sync_to_async(self._verify_by_type)(
+                    user_task, proof_data
+                )
 
-            if success and random() < 0.3:  # 30% chance to suggest new task
-                user = UserTask.objects.get(id=user_task_id).user
-                new_task = self.generate_ai_task(user)
-                # Send via Telegram: "Try this next: {new_task.title}"
+            passed = result["success"] and result.get("passed", True)
+            if passed and random() < 0.3:  # 30% chance to suggest new task
+                _suggestion_executor.submit(self._suggest_in_background, user_task.user)
+
+            return result
 
         except UserTask.DoesNotExist:
             return {"success": False, "error": "Task not found"}
@@ -192,47 +291,79 @@ class LearnEarnAIAgent:
             logger.error(f"Error verifying task: {e}")
             return {"success": False, "error": str(e)}
 
+    def _verify_by_type(self, user_task, proof_data):
+        # Different verification logic based on verification type
+        verification_type = user_task.task.verification_type
+        if verification_type == "quiz":
+            return self._verify_quiz(user_task, proof_data)
+        if verification_type == "transaction":
+            return self._verify_transaction(user_task, proof_data)
+        if verification_type == "social_proof":
+            return self._verify_social_proof(user_task, proof_data)
+        if verification_type == "submission":
+            return self._verify_submission(user_task, proof_data)
+        return {"success": False, "error": "Unknown verification type"}
+
+    def _suggest_next_task(self, user):
+        """Assign a follow-up task, preferring the pre-generated pool"""
+        try:
+            topic = list(user.interests.values())[0]
+            pooled = take_pooled_task(user.level, topic, "learning", agent=self)
+            task = pooled or self.generate_ai_task(user, topic=topic)
+            try:
+                UserTask.objects.create(user=user, task=task, status="pending")
+            except Exception:
+                if pooled:
+                    return_pooled_task(pooled, user.level, topic, "learning")
+                raise
+            notify_new_task(user.telegram_id, task)
+        except Exception as e:
+            logger.error(f"Failed to suggest next task: {e}")
+
+    def _suggest_in_background(self, user):
+        close_old_connections()
+        try:
+            self._suggest_next_task(user)
+        finally:
+            close_old_connections()
+
     def _verify_quiz(self, user_task, proof_data):
         """Verify quiz answers"""
-        correct_answers = user_task.task.verification_data.get("answers", {})
+        verification_data = user_task.task.verification_data
+        correct_answers = verification_data.get("answers") or {
+            f"q{i+1}": q["correct_answer"]
+            for i, q in enumerate(verification_data.get("questions", []))
+        }
         user_answers = proof_data.get("answers", {})
 
-        score = 0
         total = len(correct_answers)
+        if not total:
+            return {"success": False, "error": "Quiz is not available yet"}
 
+        score = 0
         for question, correct_answer in correct_answers.items():
             if question in user_answers and user_answers[question] == correct_answer:
                 score += 1
 
         # Update user's progress
         if score / total >= 0.7:  # 70% to pass
-            user_task.status = "verified"
-            user_task.completed_at = datetime.now()
-            user_task.verification_data = {"score": score, "total": total}
-            user_task.save()
-
-            # Update user XP
-            user = user_task.user
-            user.xp_points += user_task.task.xp_reward
-
-            # Check if user level up is needed
-            new_level = self._calculate_level(user.xp_points)
-            if new_level > user.level:
-                user.level = new_level
-
-            user.save()
+            award = complete_user_task(
+                user_task, {"score": score, "total": total}, "quiz"
+            )
+            if award is None:
+                return {"success": False, "error": "Task already verified"}
 
             return {
                 "success": True,
                 "passed": True,
                 "score": f"{score}/{total}",
                 "xp_earned": user_task.task.xp_reward,
-                "level_up": new_level > user.level,
+                "level_up": award["level_up"],
             }
         else:
             user_task.status = "failed"
             user_task.verification_data = {"score": score, "total": total}
-            user_task.save()
+            user_task.save(update_fields=["status", "verification_data"])
             return {"success": True, "passed": False, "score": f"{score}/{total}"}
 
     def _verify_transaction(self, user_task, proof_data):
@@ -241,124 +372,164 @@ class LearnEarnAIAgent:
         if not tx_hash:
             return {"success": False, "error": "No transaction hash provided"}
 
-        # Use web3 to verify the transaction
-        # This is a simplified placeholder - real implementation would check chain
-        from .blockchain import verify_transaction_on_chain
+        # A transaction can prove only one task; one indexed lookup, no RPC
+        chain = proof_data.get("chain") or user_task.user.preferred_chain
+        owner = find_proof_owner(tx_hash, chain)
+        if owner is not None and owner != user_task.id:
+            return {"success": False, "error": "Transaction already used as proof"}
 
         verification = verify_transaction_on_chain(
-            tx_hash, user_task.task.verification_data.get("requirements", {})
+            tx_hash, get_task_matcher(user_task.task), chain
         )
+        return self._record_transaction_proof(user_task, tx_hash, chain, verification)
 
-        if verification["verified"]:
-            # Update user task
-            user_task.status = "verified"
-            user_task.completed_at = datetime.now()
-            user_task.verification_data = {"tx_hash": tx_hash}
-            user_task.save()
-
-            # Update user XP and tokens
-            user = user_task.user
-            user.xp_points += user_task.task.xp_reward
+    async def _averify_transaction(self, user_task, proof_data):
+        """_verify_transaction with the chain lookup awaited, not blocking"""
+        tx_hash = proof_data.get("transaction_hash")
+        if not tx_hash:
+            return {"success": False, "error": "No transaction hash provided"}
 
-            # Update level if needed
-            new_level = self._calculate_level(user.xp_points)
-            if new_level > user.level:
-                user.level = new_level
+        chain = proof_data.get("chain") or user_task.user.preferred_chain
+        owner = await sync_to_async(find_proof_owner)(tx_hash, chain)
+        if owner is not None and owner != user_task.id:
+            return {"success": False, "error": "Transaction already used as proof"}
 
-            user.save()
+        verification = await averify_transaction_on_chain(
+            tx_hash, get_task_matcher(user_task.task), chain
+        )
+        return await sync_to_async(self._record_transaction_proof)(
+            user_task, tx_hash, chain, verification
+        )
 
-            # Issue token reward if needed
-            if user_task.task.token_reward > 0:
-                from .blockchain import issue_token_reward
+    def _record_transaction_proof(self, user_task, tx_hash, chain, verification):
+        """Complete and reward a task for a verified transaction, or fail it"""
+        if verification["verified"] and not claim_transaction(
+            tx_hash, user_task, chain
+        ):
+            return {"success": False, "error": "Transaction already used as proof"}
 
-                issue_token_reward(user.wallet_address, user_task.task.token_reward)
+        if verification["verified"]:
+            user = user_task.user
+            wallet_address = user.wallet_addresses.get(user.preferred_chain)
+            pays_tokens = user_task.task.token_reward > 0 and wallet_address
+            verification_data = {"tx_hash": tx_hash}
+            if pays_tokens:
+                # Paid by the queue, so claim_tokens must not pay it again
+                verification_data["tokens_claimed"] = True
+
+            with transaction.atomic():
+                award = complete_user_task(user_task, verification_data, "transaction")
+                if award is None:
+                    return {"success": False, "error": "Task already verified"}
+
+                # Queue token reward for the next batched payout
+                if pays_tokens:
+                    queue_token_reward(
+                        user,
+                        wallet_address,
+                        user_task.task.token_reward,
+                        chain=user.preferred_chain,
+                        user_task=user_task,
+                    )
+                    user_task.reward_chain = user.preferred_chain
+                    user_task.save(update_fields=["reward_chain"])
 
             return {
                 "success": True,
                 "xp_earned": user_task.task.xp_reward,
                 "tokens_earned": user_task.task.token_reward,
-                "level_up": new_level > user.level,
+                "level_up": award["level_up"],
             }
         else:
+            # Keep the hash so a bulk run can re-check it, e.g. once mined
+            user_task.verification_data = {"transaction_hash": tx_hash}
+            user_task.save(update_fields=["verification_data"])
             return {"success": False, "error": verification["reason"]}
 
     def _verify_social_proof(self, user_task, proof_data):
-        """Verify social media interaction proof"""
+        """Queue social media interaction proof for review"""
         # For MVP: Simple verification with screenshot or link
         proof_link = proof_data.get("proof_link")
 
         if not proof_link:
             return {"success": False, "error": "No proof provided"}
 
+        return self._submit_for_review(
+            user_task, "social_proof", {"proof_link": proof_link}
+        )
+
+    def _verify_submission(self, user_task, proof_data):
+        """Queue text/code submission for review"""
+        submission = proof_data.get("submission")
+
+        if not submission:
+            return {"success": False, "error": "No submission provided"}
+
+        return self._submit_for_review(
+            user_task, "submission", {"submission": submission}
+        )
+
+    def _submit_for_review(self, user_task, kind, proof):
+        """Accept a proof now and leave the model call to the grading worker"""
+        grading = submit_for_grading(user_task, kind, proof)
+        if grading is None:
+            return {"success": False, "error": "Task already submitted for review"}
+        if grading.status == "graded":
+            # The same proof was graded before; no need to wait for the worker
+            return {
+                "success": True,
+                "passed": grading.result["passed"],
+                "score": grading.result["score"],
+                "feedback": grading.result["feedback"],
+                "xp_earned": user_task.task.xp_reward if grading.award else 0,
+                "grading_id": grading.id,
+            }
+        return {
+            "success": True,
+            "passed": False,
+            "pending_review": True,
+            "grading_id": grading.id,
+        }
+
+    def grade_proof(self, kind, task, proof):
+        """Grade one proof; returns {"passed", "score", "feedback"}"""
+        if kind == "social_proof":
+            return self._grade_social_proof(task, proof["proof_link"])
+        return self._grade_submission(task, proof["submission"])
+
+    def _grade_social_proof(self, task, proof_link):
         # Ask GPT to verify the proof (social media post, etc.)
         prompt = f"""
         Verify this social proof for a Web3 task completion:
-        Task: {user_task.task.title}
-        Requirement: {user_task.task.description}
+        Task: {task.title}
+        Requirement: {task.description}
         Provided proof: {proof_link}
         
-        Is this valid proof of task completion? Answer only YES or NO and explain briefly why.
+        Is this valid proof of task completion? Decide and explain briefly why.
         """
 
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
+        verification = self.llm.complete_structured(
+            [
                 {
                     "role": "system",
                     "content": "You are verifying task completion evidence.",
                 },
                 {"role": "user", "content": prompt},
             ],
+            "social_proof_grade",
         )
+        return {
+            "passed": verification["valid"],
+            "score": None,
+            "feedback": verification["feedback"],
+        }
 
-        verification_result = response.choices[0].message.content
-        is_verified = "YES" in verification_result.upper().split()
-
-        if is_verified:
-            # Update user task
-            user_task.status = "verified"
-            user_task.completed_at = datetime.now()
-            user_task.verification_data = {
-                "proof": proof_link,
-                "ai_verification": verification_result,
-            }
-            user_task.save()
-
-            # Update user XP
-            user = user_task.user
-            user.xp_points += user_task.task.xp_reward
-
-            # Check if user level up is needed
-            new_level = self._calculate_level(user.xp_points)
-            if new_level > user.level:
-                user.level = new_level
-
-            user.save()
-
-            return {
-                "success": True,
-                "xp_earned": user_task.task.xp_reward,
-                "level_up": new_level > user.level,
-            }
-        else:
-            return {
-                "success": False,
-                "error": "Proof verification failed",
-                "details": verification_result,
-            }
-
-    def _verify_submission(self, user_task, proof_data):
-        """Verify text/code submission"""
-        submission = proof_data.get("submission")
-
-        if not submission:
-            return {"success": False, "error": "No submission provided"}
-
+    def _grade_submission(self, task, submission):
         # Ask GPT to verify the submission
         prompt = f"""
         Evaluate this submission for a Web3 task:
-        Task: {user_task.task.title}
-        Requirements: {user_task.task.description}
+        Task: {task.title}
+        Requirements: {task.description}
         
         User Submission:
         ```
@@ -366,100 +537,112 @@ class LearnEarnAIAgent:
         ```
         
         Score this submission from 0-10 and explain your reasoning.
-        Format response as: SCORE: X/10. FEEDBACK: Your detailed feedback here.
         """
 
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
+        evaluation = self.llm.complete_structured(
+            [
                 {
                     "role": "system",
                     "content": "You are an expert Web3 educator evaluating submissions.",
                 },
                 {"role": "user", "content": prompt},
             ],
+            "submission_grade",
         )
+        score = evaluation["score"]
+        return {
+            "passed": score >= PASS_SCORE,
+            "score": score,
+            "feedback": evaluation["feedback"],
+        }
 
-        evaluation = response.choices[0].message.content
-        score_part = evaluation.split(".")[0]
+    def grade_proofs_packed(self, kind, items):
+        """Grade several (task, proof) items of one kind in a single prompt
 
-        try:
-            score = int(score_part.split(":")[1].strip().split("/")[0])
-            passed = score >= 7  # 7/10 to pass
-
-            if passed:
-                # Update user task
-                user_task.status = "verified"
-                user_task.completed_at = datetime.now()
-                user_task.verification_data = {
-                    "submission": submission,
-                    "evaluation": evaluation,
-                }
-                user_task.save()
-
-                # Update user XP
-                user = user_task.user
-                user.xp_points += user_task.task.xp_reward
-
-                # Check if user level up is needed
-                new_level = self._calculate_level(user.xp_points)
-                if new_level > user.level:
-                    user.level = new_level
-
-                user.save()
-
-                return {
-                    "success": True,
-                    "passed": True,
-                    "score": score,
-                    "feedback": evaluation,
-                    "xp_earned": user_task.task.xp_reward,
-                    "level_up": new_level > user.level,
+        Returns one grade per item, None where the reply skipped an item.
+        """
+        if kind == "social_proof":
+            instructions = (
+                "Decide for each item whether the proof is valid evidence that "
+                "the task was completed."
+            )
+            entries = [
+                f"Task: {task.title}\nRequirement: {task.description}\n"
+                f"Provided proof: {proof['proof_link']}"
+                for task, proof in items
+            ]
+            fields = '"valid": true or false, "feedback": "brief reason"'
+        else:
+            instructions = (
+                "Score each submission from 0-10 against its task requirements."
+            )
+            entries = [
+                f"Task: {task.title}\nRequirements: {task.description}\n"
+                f"User Submission:\n```\n{proof['submission']}\n```"
+                for task, proof in items
+            ]
+            fields = '"score": 0-10, "feedback": "detailed feedback"'
+
+        prompt = (
+            f"{instructions}\n\n"
+            + "\n\n".join(
+                f"ITEM {i}:\n{entry}" for i, entry in enumerate(entries, start=1)
+            )
+            + f'\n\nFormat as JSON: {{"results": [{{"id": item number, {fields}}}]}}'
+        )
+        reply = self.llm.complete_structured(
+            [
+                {
+                    "role": "system",
+                    "content": "You are an expert Web3 educator reviewing task proofs.",
+                },
+                {"role": "user", "content": prompt},
+            ],
+            f"{kind}_grades",
+        )
+
+        grades = [None] * len(items)
+        for entry in reply["results"]:
+            i = entry["id"] - 1
+            if not 0 <= i < len(items):
+                continue
+            if kind == "social_proof":
+                grades[i] = {
+                    "passed": entry["valid"],
+                    "score": None,
+                    "feedback": entry["feedback"],
                 }
             else:
-                user_task.status = "failed"
-                user_task.verification_data = {
-                    "submission": submission,
-                    "evaluation": evaluation,
-                }
-                user_task.save()
-
-                return {
-                    "success": True,
-                    "passed": False,
-                    "score": score,
-                    "feedback": evaluation,
+                grades[i] = {
+                    "passed": entry["score"] >= PASS_SCORE,
+                    "score": entry["score"],
+                    "feedback": entry["feedback"],
                 }
-        except Exception as e:
-            logger.error(f"Error parsing evaluation score: {e}")
-            return {"success": False, "error": "Failed to evaluate submission"}
+        return grades
 
     def _calculate_level(self, xp):
         """Calculate user level based on XP"""
-        # Simple level calculation: every 100 XP is a level up
-        return max(1, xp // 100 + 1)
+        return level_for_xp(xp)
 
     def find_relevant_quests(self, user_id, count=3):
         """Find relevant quests from projects based on user profile"""
         try:
             user = User.objects.get(telegram_id=user_id)
 
-            # For MVP, simply return quests appropriate for user level
-            available_quests = Task.objects.filter(
-                task_type="quest", min_level__lte=user.level
-            ).order_by("-created_at")[:count]
+            # Ranked by interests, level, chain and reward; taken quests skipped
+            available_quests = recommend_quests(user, count)
 
             return {
                 "success": True,
                 "quests": [
                     {
-                        "id": quest.id,
-                        "title": quest.title,
-                        "description": quest.description,
-                        "project": quest.project,
-                        "xp_reward": quest.xp_reward,
-                        "token_reward": quest.token_reward,
-                        "has_nft": quest.nft_reward,
+                        "id": quest["id"],
+                        "title": quest["title"],
+                        "description": quest["description"],
+                        "project": quest["project"],
+                        "xp_reward": quest["xp_reward"],
+                        "token_reward": quest["token_reward"],
+                        "has_nft": quest["nft_reward"],
                     }
                     for quest in available_quests
                 ],
@@ -478,8 +661,28 @@ class LearnEarnAIAgent:
             if task.task_type != "learning":
                 return {"success": False, "error": "Not a learning task"}
 
-            # Ask GPT to generate an interactive lesson
-            prompt = f"""
+            lesson_content = self.llm.complete(
+                self.lesson_messages(task), model="gpt-4"
+            )
+            # Generate quiz for verification
+            questions = self.generate_quiz(task)
+            self.save_quiz(task, questions)
+
+            return {"success": True, "lesson": lesson_content, "quiz": questions}
+
+        except Task.DoesNotExist:
+            return {"success": False, "error": "Task not found"}
+        except Exception as e:
+            logger.error(f"Error generating lesson: {e}")
+            return {"success": False, "error": str(e)}
+
+    def stream_lesson(self, task):
+        """Async iterator over the lesson markdown as the model writes it"""
+        return self.llm.astream(self.lesson_messages(task), model="gpt-4")
+
+    def lesson_messages(self, task):
+        # Ask GPT to generate an interactive lesson
+        prompt = f"""
             Create an interactive Web3 lesson on:
             Topic: {task.title}
             
@@ -491,19 +694,14 @@ class LearnEarnAIAgent:
             
             Format as markdown with clear sections.
             """
-
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert Web3 educator."},
-                    {"role": "user", "content": prompt},
-                ],
-            )
-
-            lesson_content = response.choices[0].message.content
-
-            # Generate quiz for verification
-            quiz_prompt = f"""
+        return [
+            {"role": "system", "content": "You are an expert Web3 educator."},
+            {"role": "user", "content": prompt},
+        ]
+
+    def generate_quiz(self, task):
+        """Quiz questions for a lesson; needs only the task, not the lesson text"""
+        quiz_prompt = f"""
             Based on the lesson about {task.title}, create a JSON object with 3 multiple-choice questions.
             Format:
             {{
@@ -517,36 +715,21 @@ class LearnEarnAIAgent:
             }}
             """
 
-            quiz_response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are creating a Web3 quiz."},
-                    {"role": "user", "content": quiz_prompt},
-                ],
-            )
-
-            quiz_content = quiz_response.choices[0].message.content
-            quiz_data = json.loads(quiz_content)
-
-            # Update task with verification data
-            answers = {}
-            for i, q in enumerate(quiz_data["questions"]):
-                answers[f"q{i+1}"] = q["correct_answer"]
+        quiz_data = self.llm.complete_structured(
+            [
+                {"role": "system", "content": "You are creating a Web3 quiz."},
+                {"role": "user", "content": quiz_prompt},
+            ],
+            "quiz",
+            check=check_quiz,
+        )
+        return quiz_data["questions"]
 
-            task.verification_data = {
-                "questions": quiz_data["questions"],
-                "answers": answers,
-            }
-            task.save()
+    def save_quiz(self, task, questions):
+        """Update task with verification data"""
+        answers = {}
+        for i, q in enumerate(questions):
+            answers[f"q{i+1}"] = q["correct_answer"]
 
-            return {
-                "success": True,
-                "lesson": lesson_content,
-                "quiz": quiz_data["questions"],
-            }
-
-        except Task.DoesNotExist:
-            return {"success": False, "error": "Task not found"}
-        except Exception as e:
-            logger.error(f"Error generating lesson: {e}")
-            return {"success": False, "error": str(e)}
+        task.verification_data = {"questions": questions, "answers": answers}
+        task.save(update_fields=["verification_data"])
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AgentConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "agent"
+
+    def ready(self):
+        # Connect the path progress and view cache signal receivers
+        from . import progress, view_cache  # noqa: F401
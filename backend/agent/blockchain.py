@@ -1,24 +1,93 @@
 import os
 import json
+import time
+import asyncio
+import threading
+import aiohttp
+from asgiref.sync import sync_to_async
 from web3 import Web3
+from eth_account import Account
 import requests
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 import logging
+from .requirements import RequirementError, compile_requirements
 
 logger = logging.getLogger(__name__)
 
+HEALTH_CHECK_TTL = 30  # Seconds between RPC health checks per chain
+RPC_POOL_SIZE = 20  # Keep-alive connections per RPC URL
+RPC_TIMEOUT = 10  # Seconds per RPC request
+GAS_PRICE_TTL = 15  # Seconds a fetched gas price is reused
+MAX_BATCH_RECIPIENTS = 100  # Recipients per multisend transaction
+
+# Simple ERC20 ABI for transfer function
+ERC20_ABI = [
+    {
+        "inputs": [
+            {"name": "recipient", "type": "address"},
+            {"name": "amount", "type": "uint256"},
+        ],
+        "name": "transfer",
+        "outputs": [{"name": "", "type": "bool"}],
+        "stateMutability": "nonpayable",
+        "type": "function",
+    }
+]
+
+# Simplified NFT ABI for minting
+NFT_ABI = [
+    {
+        "inputs": [
+            {"name": "to", "type": "address"},
+            {"name": "tokenURI", "type": "string"},
+        ],
+        "name": "mintBadge",
+        "outputs": [{"name": "", "type": "uint256"}],
+        "stateMutability": "nonpayable",
+        "type": "function",
+    }
+]
+
+# Disperse-style multisend; the agent account must have approved the
+# contract to spend its reward tokens
+DISPERSE_ABI = [
+    {
+        "inputs": [
+            {"name": "token", "type": "address"},
+            {"name": "recipients", "type": "address[]"},
+            {"name": "values", "type": "uint256[]"},
+        ],
+        "name": "disperseToken",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function",
+    }
+]
+
+
+CONTRACT_ABIS = {"token": ERC20_ABI, "nft": NFT_ABI, "disperse": DISPERSE_ABI}
+
+
+class RPCError(Exception):
+    """Raised when a node answers a JSON-RPC call with an error"""
+
 
 class MultiChainProvider:
-    """Multi-chain provider for the Learn & Earn platform"""
+    """Multi-chain provider for the Learn & Earn platform
+
+    Use get_chain_provider() for the process-wide instance. Connections are
+    opened lazily on first use, keep a pooled keep-alive session per RPC URL
+    and fail over to the next configured URL when a health check fails.
+    """
 
     def __init__(self):
         """Initialize multi-chain support"""
-        # Configure supported chains
+        # Configure supported chains; RPC variables may list several
+        # comma-separated URLs, tried in order
         self.chains = {
             "gnosis": {
-                "rpc_url": os.environ.get(
-                    "CONNECTION_CONFIGS_CONFIG_GNOSIS_LEDGER_RPC"
-                ),
+                "rpc_urls": _rpc_urls("CONNECTION_CONFIGS_CONFIG_GNOSIS_LEDGER_RPC"),
                 "chain_id": 100,  # Gnosis Chain ID
                 "token_address": os.environ.get(
                     "CONNECTION_CONFIGS_CONFIG_LEARN_TOKEN_ADDRESS"
@@ -26,10 +95,13 @@ class MultiChainProvider:
                 "nft_address": os.environ.get(
                     "CONNECTION_CONFIGS_CONFIG_NFT_BADGE_ADDRESS"
                 ),
+                "disperse_address": os.environ.get(
+                    "CONNECTION_CONFIGS_CONFIG_GNOSIS_DISPERSE_ADDRESS"
+                ),
                 "explorer": "https://gnosisscan.io",
             },
             "rootstock": {
-                "rpc_url": os.environ.get("CONNECTION_CONFIGS_CONFIG_ROOTSTOCK_RPC"),
+                "rpc_urls": _rpc_urls("CONNECTION_CONFIGS_CONFIG_ROOTSTOCK_RPC"),
                 "chain_id": 30,  # Rootstock Chain ID
                 "token_address": os.environ.get(
                     "CONNECTION_CONFIGS_CONFIG_ROOTSTOCK_TOKEN_ADDRESS"
@@ -37,34 +109,95 @@ class MultiChainProvider:
                 "nft_address": os.environ.get(
                     "CONNECTION_CONFIGS_CONFIG_ROOTSTOCK_NFT_ADDRESS"
                 ),
+                "disperse_address": os.environ.get(
+                    "CONNECTION_CONFIGS_CONFIG_ROOTSTOCK_DISPERSE_ADDRESS"
+                ),
                 "explorer": "https://explorer.rootstock.io",
             },
         }
 
         # Validate configuration
         for chain, config in self.chains.items():
-            if not config["rpc_url"]:
+            if not config["rpc_urls"]:
                 logger.warning(f"{chain} RPC URL not configured")
             if not config["token_address"]:
                 logger.warning(f"{chain} token address not configured")
             if not config["nft_address"]:
                 logger.warning(f"{chain} NFT address not configured")
 
-        # Initialize web3 providers
-        self.providers = {}
-        for chain, config in self.chains.items():
-            if config["rpc_url"]:
-                try:
-                    self.providers[chain] = Web3(Web3.HTTPProvider(config["rpc_url"]))
-                    logger.info(f"Connected to {chain} at {config['rpc_url']}")
-                except Exception as e:
-                    logger.error(f"Failed to connect to {chain}: {e}")
+        self.providers = {}  # chain -> active Web3 connection
+        self._connections = {}  # rpc url -> Web3
+        self._sessions = {}  # rpc url -> pooled requests.Session
+        self._active_index = {}  # chain -> index into rpc_urls
+        self._checked_at = {}  # chain -> time of last passed health check
+        self._contracts = {}
+        self._agent_key = None
+        self._account = None
+        self._lock = threading.RLock()
 
     def get_web3(self, chain="gnosis"):
-        """Get Web3 provider for specified chain"""
-        if chain not in self.providers:
+        """Get a healthy Web3 provider for specified chain"""
+        if chain not in self.chains or not self.chains[chain]["rpc_urls"]:
             raise ValueError(f"Chain {chain} not supported or not configured")
-        return self.providers[chain]
+
+        web3 = self.providers.get(chain)
+        checked_at = self._checked_at.get(chain)
+        if web3 and checked_at and time.monotonic() - checked_at < HEALTH_CHECK_TTL:
+            return web3
+
+        with self._lock:
+            return self._select_healthy(chain)
+
+    def _select_healthy(self, chain):
+        """Health-check RPC URLs from the active one onwards and use the first live one"""
+        urls = self.chains[chain]["rpc_urls"]
+        start = self._active_index.get(chain, 0)
+        for offset in range(len(urls)):
+            index = (start + offset) % len(urls)
+            web3 = self._connect(urls[index])
+            if self._is_healthy(web3):
+                if chain in self.providers and index != start:
+                    logger.warning(f"{chain} RPC failed over to {urls[index]}")
+                self._active_index[chain] = index
+                self.providers[chain] = web3
+                self._checked_at[chain] = time.monotonic()
+                return web3
+        raise ConnectionError(f"No healthy RPC endpoint for {chain}")
+
+    def _connect(self, rpc_url):
+        """Get or open the Web3 connection for an RPC URL"""
+        if rpc_url not in self._connections:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=RPC_POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._sessions[rpc_url] = session
+            self._connections[rpc_url] = Web3(
+                Web3.HTTPProvider(
+                    rpc_url, request_kwargs={"timeout": RPC_TIMEOUT}, session=session
+                )
+            )
+            logger.info(f"Connected to {rpc_url}")
+        return self._connections[rpc_url]
+
+    def _is_healthy(self, web3):
+        try:
+            web3.eth.block_number
+            return True
+        except Exception as e:
+            logger.error(f"RPC health check failed for {web3.provider}: {e}")
+            return False
+
+    def get_rpc_session(self, chain="gnosis"):
+        """Active RPC URL and its pooled session, for raw JSON-RPC requests"""
+        self.get_web3(chain)
+        rpc_url = self.chains[chain]["rpc_urls"][self._active_index[chain]]
+        return rpc_url, self._sessions[rpc_url]
+
+    def mark_unhealthy(self, chain="gnosis"):
+        """Force a health check, and failover if needed, on next use"""
+        with self._lock:
+            self._checked_at.pop(chain, None)
 
     def get_chain_config(self, chain="gnosis"):
         """Get configuration for specified chain"""
@@ -76,10 +209,31 @@ class MultiChainProvider:
         """Get agent private key for the specified chain"""
         # For now, using the same key for all chains
         # In production, you might want different keys per chain
-        key_path = Path("/agent_key/ethereum_private_key.txt")
-        if not key_path.exists():
-            raise FileNotFoundError("Agent private key not found")
-        return key_path.read_text().strip()
+        if self._agent_key is None:
+            key_path = Path("/agent_key/ethereum_private_key.txt")
+            if not key_path.exists():
+                raise FileNotFoundError("Agent private key not found")
+            self._agent_key = key_path.read_text().strip()
+        return self._agent_key
+
+    def get_account(self, chain="gnosis"):
+        """Get the agent's signing account"""
+        if self._account is None:
+            self._account = Account.from_key(self.get_agent_key(chain))
+        return self._account
+
+    def get_contract(self, chain, kind):
+        """Get a cached contract object for token, nft or disperse"""
+        address = self.get_chain_config(chain)[f"{kind}_address"]
+        if not address:
+            raise ValueError(f"{kind.upper()} address not configured for chain {chain}")
+        web3 = self.get_web3(chain)
+        key = (chain, kind, self._active_index[chain])
+        if key not in self._contracts:
+            self._contracts[key] = web3.eth.contract(
+                address=address, abi=CONTRACT_ABIS[kind]
+            )
+        return self._contracts[key]
 
     def get_explorer_url(self, chain="gnosis", tx_hash=None):
         """Get block explorer URL for the transaction"""
@@ -89,113 +243,379 @@ class MultiChainProvider:
         return base_url
 
 
+def _rpc_urls(env_var):
+    return [
+        url.strip() for url in os.environ.get(env_var, "").split(",") if url.strip()
+    ]
+
+
+_chain_provider = None
+_chain_provider_lock = threading.Lock()
+
+
+def get_chain_provider():
+    """Get the process-wide MultiChainProvider"""
+    global _chain_provider
+    if _chain_provider is None:
+        with _chain_provider_lock:
+            if _chain_provider is None:
+                _chain_provider = MultiChainProvider()
+    return _chain_provider
+
+
 def get_web3_provider(chain="gnosis"):
     """Get Web3 provider for specified chain"""
-    if chain == "gnosis":
-        rpc_url = os.environ.get("CONNECTION_CONFIGS_CONFIG_GNOSIS_LEDGER_RPC")
-    elif chain == "rootstock":
-        rpc_url = os.environ.get("CONNECTION_CONFIGS_CONFIG_ROOTSTOCK_RPC")
-    else:
-        raise ValueError(f"Unsupported chain: {chain}")
-
-    if not rpc_url:
-        raise ValueError(
-            f"{chain.capitalize()} RPC URL not found in environment variables"
-        )
-    return Web3(Web3.HTTPProvider(rpc_url))
+    return get_chain_provider().get_web3(chain)
 
 
 def get_agent_key():
     """Get agent private key from file"""
-    key_path = Path("/agent_key/ethereum_private_key.txt")
-    if not key_path.exists():
-        raise FileNotFoundError("Agent private key not found")
-    return key_path.read_text().strip()
+    return get_chain_provider().get_agent_key()
+
+
+class NonceManager:
+    """Hands out nonces for one sending account serially
+
+    Sends happen under the lock so nonces reach the node in order. After
+    any send error the local counter is dropped and re-read from the chain.
+    """
+
+    def __init__(self, web3, address):
+        self.web3 = web3
+        self.address = address
+        self._lock = threading.Lock()
+        self._next_nonce = None
+
+    def send(self, tx, private_key):
+        """Assign the next nonce to tx, sign and send it, and return the hash"""
+        with self._lock:
+            if self._next_nonce is None:
+                self._next_nonce = self.web3.eth.get_transaction_count(
+                    self.address, "pending"
+                )
+            tx["nonce"] = self._next_nonce
+            try:
+                signed_tx = self.web3.eth.account.sign_transaction(tx, private_key)
+                tx_hash = self.web3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            except Exception:
+                self._next_nonce = None
+                raise
+            self._next_nonce += 1
+            return tx_hash
+
+    def sign(self, tx, private_key):
+        """Assign the next nonce to tx and sign it, for sending by the caller
+
+        Transactions signed here may reach the node out of order; it holds a
+        later nonce until the gap is filled. Call ``resync`` if a send fails.
+        """
+        with self._lock:
+            if self._next_nonce is None:
+                self._next_nonce = self.web3.eth.get_transaction_count(
+                    self.address, "pending"
+                )
+            tx["nonce"] = self._next_nonce
+            signed_tx = self.web3.eth.account.sign_transaction(tx, private_key)
+            self._next_nonce += 1
+            return signed_tx.raw_transaction
+
+    def resync(self):
+        with self._lock:
+            self._next_nonce = None
+
+
+_nonce_managers = {}
+_gas_prices = {}
+_registry_lock = threading.Lock()
+
+
+def get_nonce_manager(chain, web3, address):
+    """Get the process-wide nonce manager for an account on a chain"""
+    key = (chain, address)
+    with _registry_lock:
+        if key not in _nonce_managers:
+            _nonce_managers[key] = NonceManager(web3, address)
+        return _nonce_managers[key]
+
+
+def get_gas_price(chain, web3):
+    """Gas price for a chain, refreshed at most every GAS_PRICE_TTL seconds"""
+    cached = _gas_prices.get(chain)
+    if cached and time.monotonic() - cached[0] < GAS_PRICE_TTL:
+        return cached[1]
+    gas_price = web3.eth.gas_price
+    _gas_prices[chain] = (time.monotonic(), gas_price)
+    return gas_price
+
+
+def _send_context(chain, chain_provider):
+    """Web3, base transaction params, nonce manager and key of the agent"""
+    web3 = chain_provider.get_web3(chain)
+    chain_config = chain_provider.get_chain_config(chain)
+    private_key = chain_provider.get_agent_key(chain)
+    account = chain_provider.get_account(chain)
+    nonce_manager = get_nonce_manager(chain, web3, account.address)
+    tx_params = {
+        "from": account.address,
+        "gasPrice": get_gas_price(chain, web3),
+        "chainId": chain_config["chain_id"],
+    }
+    return web3, tx_params, nonce_manager, private_key
+
+
+def _token_transfer_txs(transfers, chain, chain_provider, web3, tx_params):
+    """Yield (unsigned transaction, transfers it pays) for token transfers"""
+    token_address = chain_provider.get_chain_config(chain)["token_address"]
+    if not token_address:
+        raise ValueError(f"Token address not configured for chain {chain}")
+
+    if chain_provider.get_chain_config(chain).get("disperse_address"):
+        disperse = chain_provider.get_contract(chain, "disperse")
+        for start in range(0, len(transfers), MAX_BATCH_RECIPIENTS):
+            chunk = transfers[start : start + MAX_BATCH_RECIPIENTS]
+            tx = disperse.functions.disperseToken(
+                token_address,
+                [Web3.to_checksum_address(wallet) for wallet, _ in chunk],
+                [web3.to_wei(amount, "ether") for _, amount in chunk],
+            ).build_transaction(
+                {**tx_params, "gas": 60000 + 40000 * len(chunk), "nonce": 0}
+            )
+            yield tx, chunk
+        return
+
+    token_contract = chain_provider.get_contract(chain, "token")
+    for wallet, amount in transfers:
+        tx = token_contract.functions.transfer(
+            Web3.to_checksum_address(wallet), web3.to_wei(amount, "ether")
+        ).build_transaction({**tx_params, "gas": 100000, "nonce": 0})
+        yield tx, [(wallet, amount)]
+
+
+def send_token_batch(transfers, chain="gnosis", chain_provider=None):
+    """Send token amounts to many wallets, yielding (tx_hash, transfers) per tx
+
+    transfers is a list of (wallet_address, amount) pairs. With a multisend
+    contract configured, up to MAX_BATCH_RECIPIENTS transfers share one
+    transaction; otherwise each is sent as its own ERC20 transfer. Hashes are
+    yielded as soon as each transaction is sent, so a caller can record
+    progress before a later send fails.
+    """
+    chain_provider = chain_provider or get_chain_provider()
+    web3, tx_params, nonce_manager, private_key = _send_context(chain, chain_provider)
+    for tx, sent in _token_transfer_txs(
+        transfers, chain, chain_provider, web3, tx_params
+    ):
+        yield web3.to_hex(nonce_manager.send(tx, private_key)), sent
+
+
+def rpc_batch(calls, chain="gnosis", chain_provider=None):
+    """Send (method, params) calls as one JSON-RPC batch; results in call order
+
+    A call that errors or returns nothing yields None in its slot.
+    """
+    chain_provider = chain_provider or get_chain_provider()
+    rpc_url, session = chain_provider.get_rpc_session(chain)
+    payload = [
+        {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+        for i, (method, params) in enumerate(calls)
+    ]
+    response = session.post(rpc_url, json=payload, timeout=RPC_TIMEOUT)
+    response.raise_for_status()
+    results = {item.get("id"): item.get("result") for item in response.json()}
+    return [results.get(i) for i in range(len(calls))]
+
+
+_aio_sessions = {}  # event loop -> aiohttp.ClientSession
+
+
+def _aio_session():
+    """Pooled aiohttp session of the running event loop"""
+    loop = asyncio.get_running_loop()
+    session = _aio_sessions.get(loop)
+    if session is None or session.closed:
+        for old_loop in [old for old in _aio_sessions if old.is_closed()]:
+            del _aio_sessions[old_loop]
+        session = _aio_sessions[loop] = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit_per_host=RPC_POOL_SIZE),
+            timeout=aiohttp.ClientTimeout(total=RPC_TIMEOUT),
+        )
+    return session
+
+
+async def _apost(payload, chain, chain_provider):
+    chain_provider = chain_provider or get_chain_provider()
+    # Picking the URL may run a blocking health check; keep it off the loop
+    rpc_url, _ = await sync_to_async(
+        chain_provider.get_rpc_session, thread_sensitive=False
+    )(chain)
+    try:
+        async with _aio_session().post(rpc_url, json=payload) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        chain_provider.mark_unhealthy(chain)
+        raise
+
+
+async def arpc_batch(calls, chain="gnosis", chain_provider=None):
+    """rpc_batch for async callers, over a pooled aiohttp session"""
+    payload = [
+        {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+        for i, (method, params) in enumerate(calls)
+    ]
+    results = {
+        item.get("id"): item.get("result")
+        for item in await _apost(payload, chain, chain_provider)
+    }
+    return [results.get(i) for i in range(len(calls))]
+
+
+async def arpc(method, params, chain="gnosis", chain_provider=None):
+    """Result of one JSON-RPC call; raises RPCError when the node refuses it"""
+    reply = await _apost(
+        {"jsonrpc": "2.0", "id": 0, "method": method, "params": params},
+        chain,
+        chain_provider,
+    )
+    if reply.get("error"):
+        raise RPCError(reply["error"].get("message", str(reply["error"])))
+    return reply.get("result")
+
+
+async def _asend_signed(signed, chain, chain_provider):
+    """Send a (raw transaction, nonce manager) pair; returns the hash"""
+    raw_tx, nonce_manager = signed
+    try:
+        return await arpc("eth_sendRawTransaction", [raw_tx], chain, chain_provider)
+    except Exception:
+        nonce_manager.resync()
+        raise
+
+
+def check_requirements(tx, requirements):
+    """Reason an indexed transaction fails the task requirements, or None
+
+    ``requirements`` is a raw requirements dict or a compiled matcher; pass
+    the task's matcher from ``get_task_matcher`` to skip recompiling.
+    """
+    return compile_requirements(requirements).check(tx)
 
 
 def verify_transaction_on_chain(tx_hash, requirements, chain="gnosis"):
     """Verify a transaction on-chain based on requirements"""
-    provider = MultiChainProvider().get_web3(chain)
+    # Imported here: the index module builds on this one
+    from .tx_index import lookup_transaction
 
     try:
-        # Get transaction
-        tx = provider.eth.get_transaction(tx_hash)
-        tx_receipt = provider.eth.get_transaction_receipt(tx_hash)
-
-        # Check if transaction exists and was successful
-        if not tx or not tx_receipt:
-            return {"verified": False, "reason": "Transaction not found"}
-
-        if tx_receipt.status != 1:
-            return {"verified": False, "reason": "Transaction failed"}
-
-        # Check specific requirements if any
-        if (
-            "to_address" in requirements
-            and tx.to.lower() != requirements["to_address"].lower()
-        ):
-            return {"verified": False, "reason": "Wrong recipient address"}
-
-        # For checking specific contract interactions, decode logs if needed
-        # This is a simplified implementation
-
-        return {
-            "verified": True,
-            "explorer_url": MultiChainProvider().get_explorer_url(chain, tx_hash),
-        }
+        matcher = compile_requirements(requirements)
+    except RequirementError as e:
+        return {"verified": False, "reason": str(e)}
+
+    chain_provider = get_chain_provider()
+
+    try:
+        # Final transactions come from the local index without any RPC call
+        tx = lookup_transaction(tx_hash, chain, chain_provider)
+        return _verification(tx, matcher, chain, chain_provider)
+    except Exception as e:
+        # Connection trouble: re-check the endpoint before the next call
+        chain_provider.mark_unhealthy(chain)
+        return {"verified": False, "reason": str(e)}
+
+
+async def averify_transaction_on_chain(tx_hash, requirements, chain="gnosis"):
+    """verify_transaction_on_chain for async callers"""
+    from .tx_index import alookup_transaction
+
+    try:
+        matcher = compile_requirements(requirements)
+    except RequirementError as e:
+        return {"verified": False, "reason": str(e)}
+
+    chain_provider = get_chain_provider()
+
+    try:
+        tx = await alookup_transaction(tx_hash, chain, chain_provider)
+        return _verification(tx, matcher, chain, chain_provider)
     except Exception as e:
+        chain_provider.mark_unhealthy(chain)
         return {"verified": False, "reason": str(e)}
 
 
-def issue_token_reward(wallet_address, amount, chain="gnosis"):
+def _verification(tx, matcher, chain, chain_provider):
+    # Check if transaction exists and was successful
+    if not tx:
+        return {"verified": False, "reason": "Transaction not found"}
+
+    reason = matcher.check(tx)
+    if reason:
+        return {"verified": False, "reason": reason}
+
+    return {
+        "verified": True,
+        "final": tx.is_final,
+        "explorer_url": chain_provider.get_explorer_url(chain, tx.tx_hash),
+    }
+
+
+def issue_token_reward(wallet_address, amount, chain="gnosis", chain_provider=None):
     """Issue token rewards to a user on specified chain"""
-    chain_provider = MultiChainProvider()
-    web3 = chain_provider.get_web3(chain)
-    chain_config = chain_provider.get_chain_config(chain)
-    private_key = chain_provider.get_agent_key(chain)
+    chain_provider = chain_provider or get_chain_provider()
+    tx_hash_hex, _ = next(
+        send_token_batch([(wallet_address, amount)], chain, chain_provider)
+    )
+    return _token_reward_result(tx_hash_hex, amount, chain, chain_provider)
 
-    account = web3.eth.account.from_key(private_key)
 
-    # Get token address for the specified chain
-    token_address = chain_config["token_address"]
-    if not token_address:
-        raise ValueError(f"Token address not configured for chain {chain}")
+def _signed_token_reward(wallet_address, amount, chain, chain_provider):
+    web3, tx_params, nonce_manager, private_key = _send_context(chain, chain_provider)
+    tx, _ = next(
+        _token_transfer_txs(
+            [(wallet_address, amount)], chain, chain_provider, web3, tx_params
+        )
+    )
+    return web3.to_hex(nonce_manager.sign(tx, private_key)), nonce_manager
 
-    # Simple ERC20 ABI for transfer function
-    abi = [
-        {
-            "inputs": [
-                {"name": "recipient", "type": "address"},
-                {"name": "amount", "type": "uint256"},
-            ],
-            "name": "transfer",
-            "outputs": [{"name": "", "type": "bool"}],
-            "stateMutability": "nonpayable",
-            "type": "function",
-        }
-    ]
 
-    token_contract = web3.eth.contract(address=token_address, abi=abi)
-
-    # Prepare transaction
-    tx = token_contract.functions.transfer(
-        wallet_address,
-        web3.to_wei(amount, "ether"),  # Convert to token decimals if different
-    ).build_transaction(
-        {
-            "from": account.address,
-            "gas": 100000,
-            "gasPrice": web3.eth.gas_price,
-            "nonce": web3.eth.get_transaction_count(account.address),
-            "chainId": chain_config["chain_id"],
-        }
+async def aissue_token_reward(
+    wallet_address, amount, chain="gnosis", chain_provider=None, on_signed=None
+):
+    """issue_token_reward for async callers; the send does not hold a thread
+
+    ``on_signed`` is awaited with the raw transaction and its hash before
+    the transfer is broadcast, so callers can store it for a safe retry.
+    """
+    chain_provider = chain_provider or get_chain_provider()
+    # Signing may read the nonce or gas price once; keep that off the loop
+    signed = await sync_to_async(_signed_token_reward, thread_sensitive=False)(
+        wallet_address, amount, chain, chain_provider
     )
+    if on_signed is not None:
+        await on_signed(signed[0], Web3.to_hex(Web3.keccak(hexstr=signed[0])))
+    tx_hash_hex = await _asend_signed(signed, chain, chain_provider)
+    return _token_reward_result(tx_hash_hex, amount, chain, chain_provider)
 
-    # Sign and send transaction
-    signed_tx = web3.eth.account.sign_transaction(tx, private_key)
-    tx_hash = web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-    tx_hash_hex = web3.to_hex(tx_hash)
 
+async def arebroadcast_transaction(raw_tx, chain="gnosis", chain_provider=None):
+    """Send a signed transaction again; returns its hash, or None when it can
+    never be mined because its nonce was used by another transaction
+    """
+    tx_hash = Web3.to_hex(Web3.keccak(hexstr=raw_tx))
+    try:
+        await arpc("eth_sendRawTransaction", [raw_tx], chain, chain_provider)
+    except RPCError as e:
+        # Nodes refuse transactions they already hold or have already mined
+        if await arpc("eth_getTransactionReceipt", [tx_hash], chain, chain_provider):
+            return tx_hash
+        message = str(e).lower()
+        if "nonce too low" in message:
+            return None
+        if "known" not in message:
+            raise
+    return tx_hash
+
+
+def _token_reward_result(tx_hash_hex, amount, chain, chain_provider):
     return {
         "success": True,
         "tx_hash": tx_hash_hex,
@@ -205,56 +625,65 @@ def issue_token_reward(wallet_address, amount, chain="gnosis"):
     }
 
 
-def mint_nft_badge(wallet_address, badge_data, chain="gnosis"):
-    """Mint NFT badge for user achievement on specified chain"""
-    chain_provider = MultiChainProvider()
-    web3 = chain_provider.get_web3(chain)
-    chain_config = chain_provider.get_chain_config(chain)
-    private_key = chain_provider.get_agent_key(chain)
-
-    account = web3.eth.account.from_key(private_key)
-
-    # Get NFT address for the specified chain
-    nft_address = chain_config["nft_address"]
-    if not nft_address:
-        raise ValueError(f"NFT address not configured for chain {chain}")
-
-    # Simplified NFT ABI for minting
-    abi = [
-        {
-            "inputs": [
-                {"name": "to", "type": "address"},
-                {"name": "tokenURI", "type": "string"},
-            ],
-            "name": "mintBadge",
-            "outputs": [{"name": "", "type": "uint256"}],
-            "stateMutability": "nonpayable",
-            "type": "function",
-        }
-    ]
-
-    nft_contract = web3.eth.contract(address=nft_address, abi=abi)
-
+def badge_token_uri(badge_data):
+    """Token URI a badge is minted with"""
     # Upload metadata to IPFS (simplified)
     # In a real implementation, you'd use a service like nft.storage
-    token_uri = f"ipfs://badge/{badge_data['id']}"
+    return f"ipfs://badge/{badge_data['id']}"
+
 
-    # Prepare transaction
+def _nft_mint_tx(wallet_address, badge_data, chain, chain_provider, tx_params):
+    """Unsigned mint transaction and the badge's token URI"""
+    nft_contract = chain_provider.get_contract(chain, "nft")
+    token_uri = badge_token_uri(badge_data)
+
+    # Prepare transaction; the nonce manager fills in the real nonce
     tx = nft_contract.functions.mintBadge(wallet_address, token_uri).build_transaction(
-        {
-            "from": account.address,
-            "gas": 200000,
-            "gasPrice": web3.eth.gas_price,
-            "nonce": web3.eth.get_transaction_count(account.address),
-            "chainId": chain_config["chain_id"],
-        }
+        {**tx_params, "gas": 200000, "nonce": 0}
+    )
+    return tx, token_uri
+
+
+def mint_nft_badge(wallet_address, badge_data, chain="gnosis", chain_provider=None):
+    """Mint NFT badge for user achievement on specified chain"""
+    chain_provider = chain_provider or get_chain_provider()
+    web3, tx_params, nonce_manager, private_key = _send_context(chain, chain_provider)
+    tx, token_uri = _nft_mint_tx(
+        wallet_address, badge_data, chain, chain_provider, tx_params
     )
 
     # Sign and send transaction
-    signed_tx = web3.eth.account.sign_transaction(tx, private_key)
-    tx_hash = web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-    tx_hash_hex = web3.to_hex(tx_hash)
+    tx_hash_hex = web3.to_hex(nonce_manager.send(tx, private_key))
+    return _mint_result(tx_hash_hex, token_uri, chain, chain_provider)
+
+
+def _signed_nft_mint(wallet_address, badge_data, chain, chain_provider):
+    web3, tx_params, nonce_manager, private_key = _send_context(chain, chain_provider)
+    tx, token_uri = _nft_mint_tx(
+        wallet_address, badge_data, chain, chain_provider, tx_params
+    )
+    return (web3.to_hex(nonce_manager.sign(tx, private_key)), nonce_manager), token_uri
+
+
+async def amint_nft_badge(
+    wallet_address, badge_data, chain="gnosis", chain_provider=None, on_signed=None
+):
+    """mint_nft_badge for async callers; the send does not hold a thread
+
+    ``on_signed`` is awaited with the raw transaction and its hash before
+    the mint is broadcast, as in aissue_token_reward.
+    """
+    chain_provider = chain_provider or get_chain_provider()
+    signed, token_uri = await sync_to_async(_signed_nft_mint, thread_sensitive=False)(
+        wallet_address, badge_data, chain, chain_provider
+    )
+    if on_signed is not None:
+        await on_signed(signed[0], Web3.to_hex(Web3.keccak(hexstr=signed[0])))
+    tx_hash_hex = await _asend_signed(signed, chain, chain_provider)
+    return _mint_result(tx_hash_hex, token_uri, chain, chain_provider)
+
 
+def _mint_result(tx_hash_hex, token_uri, chain, chain_provider):
     return {
         "success": True,
         "tx_hash": tx_hash_hex,
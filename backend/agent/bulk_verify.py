@@ -0,0 +1,167 @@
+import logging
+from django.db import transaction
+from django.utils import timezone
+from web3 import Web3
+from .blockchain import check_requirements
+from .models import RewardPayout, UserTask, VerifiedTransaction
+from .progress import refresh_path_progress
+from .requirements import get_task_matcher
+from .tx_index import (
+    RPC_BATCH_SIZE,
+    claim_transaction,
+    lookup_transactions_bulk,
+    normalize_tx_hash,
+)
+from .xp_ledger import award_xp_bulk
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ("pending", "active")  # User task states a proof can complete
+
+
+def pending_quest_proofs(quest_id):
+    """(user_task_id, tx_hash) pairs submitted for a quest but not verified"""
+    return [
+        (user_task_id, data["transaction_hash"])
+        for user_task_id, data in UserTask.objects.filter(
+            task_id=quest_id,
+            status__in=OPEN_STATUSES,
+            verification_data__has_key="transaction_hash",
+        )
+        .order_by("id")
+        .values_list("id", "verification_data")
+    ]
+
+
+def verify_proofs_bulk(quest_id, proofs, chain="gnosis", chain_provider=None):
+    """Verify (user_task_id, tx_hash) proofs, yielding one result per proof
+
+    Only transaction-verified user tasks of the quest are considered; any
+    other id is reported as not found. Results come back in input order.
+    Accepted proofs are applied to their user tasks, users and payout queue
+    in bulk, one chunk at a time.
+    """
+    proofs = [(user_task_id, normalize_tx_hash(h)) for user_task_id, h in proofs]
+    user_tasks = (
+        UserTask.objects.filter(task_id=quest_id, task__verification_type="transaction")
+        .select_related("task", "user")
+        .in_bulk([user_task_id for user_task_id, _ in proofs])
+    )
+    owners = dict(
+        VerifiedTransaction.objects.filter(
+            chain=chain,
+            tx_hash__in=[tx_hash for _, tx_hash in proofs],
+            user_task__isnull=False,
+        ).values_list("tx_hash", "user_task_id")
+    )
+    lookups = lookup_transactions_bulk(
+        [tx_hash for _, tx_hash in proofs], chain, chain_provider
+    )
+
+    chunk = []
+    for (user_task_id, tx_hash), (_, record) in zip(proofs, lookups):
+        user_task = user_tasks.get(user_task_id)
+        result = _check_proof(user_task, user_task_id, tx_hash, record, owners)
+        if result["verified"] and not result.get("already_verified"):
+            owners[tx_hash] = user_task_id
+        chunk.append(result)
+        if len(chunk) >= RPC_BATCH_SIZE:
+            apply_verified_proofs(chunk, user_tasks, chain)
+            yield from chunk
+            chunk = []
+
+    apply_verified_proofs(chunk, user_tasks, chain)
+    yield from chunk
+
+
+def _check_proof(user_task, user_task_id, tx_hash, record, owners):
+    result = {"user_task_id": user_task_id, "tx_hash": tx_hash, "verified": False}
+    if user_task is None:
+        result["reason"] = "Task not found"
+    elif owners.get(tx_hash, user_task_id) != user_task_id:
+        result["reason"] = "Transaction already used as proof"
+    elif user_task.status == "verified":
+        result.update(verified=True, already_verified=True)
+    elif user_task.status not in OPEN_STATUSES:
+        result["reason"] = "Task is not open"
+    elif record is None:
+        result["reason"] = "Transaction not found"
+    else:
+        reason = check_requirements(record, get_task_matcher(user_task.task))
+        if reason:
+            result["reason"] = reason
+        else:
+            result["verified"] = True
+    return result
+
+
+def apply_verified_proofs(results, user_tasks, chain):
+    """Mark accepted proofs verified and grant their rewards in a few queries
+
+    Returns the number applied. A proof whose transaction was bound to another
+    task after it was checked is flipped to rejected in its result.
+    """
+    accepted = [r for r in results if r["verified"] and not r.get("already_verified")]
+    if not accepted:
+        return 0
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Lock the tasks and drop any verified concurrently since they were read
+        still_open = set(
+            UserTask.objects.select_for_update()
+            .filter(id__in=[r["user_task_id"] for r in accepted])
+            .filter(status__in=OPEN_STATUSES)
+            .values_list("id", flat=True)
+        )
+        accepted = [r for r in accepted if r["user_task_id"] in still_open]
+
+        # Bind each transaction before anything is credited; owners were read
+        # before the RPC round trips, so another proof may have taken it since
+        bound = []
+        for result in accepted:
+            user_task = user_tasks[result["user_task_id"]]
+            if claim_transaction(result["tx_hash"], user_task, chain):
+                bound.append(result)
+            else:
+                result.update(
+                    verified=False, reason="Transaction already used as proof"
+                )
+        accepted = bound
+
+        awards = []
+        changed = []
+        payouts = []
+        for result in accepted:
+            user_task = user_tasks[result["user_task_id"]]
+            user = user_task.user
+            user_task.status = "verified"
+            user_task.completed_at = now
+            user_task.verification_data = {"tx_hash": result["tx_hash"]}
+            awards.append((user.id, user_task.task.xp_reward, "transaction", user_task))
+
+            # Queue token reward for the next batched payout
+            wallet_address = user.wallet_addresses.get(user.preferred_chain)
+            if user_task.task.token_reward > 0 and wallet_address:
+                payouts.append(
+                    RewardPayout(
+                        user=user,
+                        user_task=user_task,
+                        wallet_address=Web3.to_checksum_address(wallet_address),
+                        chain=user.preferred_chain,
+                        amount=user_task.task.token_reward,
+                    )
+                )
+                user_task.verification_data["tokens_claimed"] = True
+                user_task.reward_chain = user.preferred_chain
+            changed.append(user_task)
+
+        UserTask.objects.bulk_update(
+            changed, ["status", "completed_at", "verification_data", "reward_chain"]
+        )
+        refresh_path_progress({user_task.learning_path_id for user_task in changed})
+        RewardPayout.objects.bulk_create(payouts)
+        award_xp_bulk(awards)
+
+    logger.info(f"Applied {len(accepted)} bulk-verified transaction proofs")
+    return len(accepted)
@@ -0,0 +1,178 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from .blockchain import get_chain_provider, rpc_batch
+from .bulk_verify import OPEN_STATUSES, apply_verified_proofs
+from .models import ChainCheckpoint, UserTask, VerifiedTransaction
+from .requirements import RequirementError, get_task_matcher
+from .tx_index import (
+    CONFIRMATION_DEPTHS,
+    RPC_BATCH_SIZE,
+    get_head_block,
+    record_from_rpc,
+    upsert_records,
+)
+
+logger = logging.getLogger(__name__)
+
+BLOCK_CHUNK = getattr(settings, "INDEXER_BLOCK_CHUNK", 50)  # Blocks per RPC batch
+
+
+def build_task_index(chain):
+    """Map wallet address -> [(user_task, matcher)] for open transaction tasks
+
+    Built once per pass, so every scanned transaction is matched with a
+    dictionary lookup on its sender.
+    """
+    index = defaultdict(list)
+    user_tasks = UserTask.objects.filter(
+        status__in=OPEN_STATUSES, task__verification_type="transaction"
+    ).select_related("task", "user")
+    for user_task in user_tasks:
+        address = (user_task.user.wallet_addresses or {}).get(chain)
+        if not address:
+            continue
+        try:
+            matcher = get_task_matcher(user_task.task)
+        except RequirementError as e:
+            logger.warning(f"Skipping task {user_task.task_id} in indexer: {e}")
+            continue
+        index[address.lower()].append((user_task, matcher))
+    return index
+
+
+def scan_range(chain, from_block, to_block, index, head_block, chain_provider):
+    """Index transactions sent by watched wallets in a block range and
+    complete the open tasks they satisfy; returns the number completed
+
+    Only the sender can prove a task: a wallet that merely appears in a
+    log (as a transfer recipient, say) did not perform the action.
+    """
+    numbers = range(from_block, to_block + 1)
+    results = rpc_batch(
+        [("eth_getBlockByNumber", [hex(number), True]) for number in numbers],
+        chain,
+        chain_provider,
+    )
+
+    transactions = {}  # tx hash -> (tx, block timestamp)
+    senders = {}  # tx hash -> watched wallet that sent it
+    for number, block in zip(numbers, results):
+        if block is None:
+            raise RuntimeError(f"Block {number} not available on {chain}")
+        timestamp = int(block["timestamp"], 16)
+        for tx in block["transactions"]:
+            if tx["from"].lower() in index:
+                tx_hash = tx["hash"].lower()
+                transactions[tx_hash] = (tx, timestamp)
+                senders[tx_hash] = tx["from"].lower()
+
+    if not senders:
+        return 0
+
+    tx_hashes = list(senders)
+    receipts = []
+    for i in range(0, len(tx_hashes), RPC_BATCH_SIZE):
+        chunk = tx_hashes[i : i + RPC_BATCH_SIZE]
+        receipts += rpc_batch(
+            [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in chunk],
+            chain,
+            chain_provider,
+        )
+    records = [
+        record_from_rpc(tx_hash, transactions[tx_hash][0], receipt, chain, head_block)
+        for tx_hash, receipt in zip(tx_hashes, receipts)
+        if receipt
+    ]
+    upsert_records(records)
+
+    claimed = set(
+        VerifiedTransaction.objects.filter(
+            chain=chain, tx_hash__in=tx_hashes, user_task__isnull=False
+        ).values_list("tx_hash", flat=True)
+    )
+    results = []
+    user_tasks = {}
+    for record in records:
+        if record.tx_hash in claimed:
+            continue
+        sent_at = datetime.fromtimestamp(
+            transactions[record.tx_hash][1], tz=dt_timezone.utc
+        )
+        address = senders[record.tx_hash]
+        entry = _match_open_task(record, sent_at, index[address])
+        if entry:
+            user_task, _ = entry
+            # A transaction proves one task, and each task is completed once
+            index[address].remove(entry)
+            user_tasks[user_task.id] = user_task
+            results.append(
+                {
+                    "user_task_id": user_task.id,
+                    "tx_hash": record.tx_hash,
+                    "verified": True,
+                }
+            )
+
+    return apply_verified_proofs(results, user_tasks, chain)
+
+
+def _match_open_task(record, sent_at, entries):
+    for entry in entries:
+        user_task, matcher = entry
+        # Transactions sent before the task was started do not count
+        if user_task.started_at and sent_at < user_task.started_at:
+            continue
+        if matcher.check(record) is None:
+            return entry
+    return None
+
+
+def run_indexer_pass(chain="gnosis", chain_provider=None, max_blocks=None):
+    """Scan blocks from the checkpoint up to the confirmed head of a chain
+
+    A chain seen for the first time starts at its current confirmed head.
+    The checkpoint advances after every chunk, so an interrupted pass
+    resumes where it stopped.
+    """
+    chain_provider = chain_provider or get_chain_provider()
+    try:
+        web3 = chain_provider.get_web3(chain)
+        head_block = get_head_block(chain, web3)
+        safe_block = head_block - CONFIRMATION_DEPTHS.get(chain, 12)
+        checkpoint, _ = ChainCheckpoint.objects.get_or_create(
+            chain=chain, defaults={"block_number": safe_block}
+        )
+
+        start = checkpoint.block_number + 1
+        end = min(safe_block, start + max_blocks - 1) if max_blocks else safe_block
+        index = build_task_index(chain)
+        verified = 0
+
+        if index:
+            for chunk_start in range(start, end + 1, BLOCK_CHUNK):
+                chunk_end = min(chunk_start + BLOCK_CHUNK - 1, end)
+                verified += scan_range(
+                    chain, chunk_start, chunk_end, index, head_block, chain_provider
+                )
+                ChainCheckpoint.objects.filter(pk=checkpoint.pk).update(
+                    block_number=chunk_end
+                )
+        elif end >= start:
+            # Nobody to match: skip ahead without fetching blocks
+            ChainCheckpoint.objects.filter(pk=checkpoint.pk).update(block_number=end)
+
+        if verified:
+            logger.info(f"Indexer completed {verified} tasks on {chain}")
+        return {
+            "success": True,
+            "chain": chain,
+            "from_block": start,
+            "to_block": max(end, start - 1),
+            "verified": verified,
+        }
+    except Exception as e:
+        logger.error(f"Indexer pass on {chain} failed: {e}")
+        chain_provider.mark_unhealthy(chain)
+        return {"success": False, "chain": chain, "error": str(e)}
@@ -0,0 +1,199 @@
+import logging
+from datetime import timedelta
+from functools import partial
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from .blockchain import (
+    aissue_token_reward,
+    amint_nft_badge,
+    arebroadcast_transaction,
+    badge_token_uri,
+)
+from .models import BadgeMint, ClaimBatch, User, UserTask
+
+logger = logging.getLogger(__name__)
+
+# Claims whose transfer has not gone out and may be (re)sent
+UNSENT_STATUSES = ("pending", "failed")
+SEND_TIMEOUT = 300  # Seconds before a claim left "sending" can be retaken
+
+
+def claimable_tasks(user):
+    """Verified token rewards of a user not yet paid by a claim or the queue"""
+    return (
+        UserTask.objects.filter(
+            user=user,
+            status="verified",
+            task__token_reward__gt=0,
+            claim_batch__isnull=True,
+        )
+        # Transaction rewards are paid by the payout queue instead
+        .exclude(verification_data__has_key="tokens_claimed")
+    )
+
+
+def open_claim(user, wallet_address):
+    """Claim every pending reward of a user, or None if there is nothing
+
+    The user row is locked so concurrent claims take turns, and an earlier
+    claim that was never sent (or is still being sent) is returned instead of
+    a new one: its tasks are already linked to it, so a retry pays the same
+    rewards once.
+    """
+    with transaction.atomic():
+        User.objects.select_for_update().filter(id=user.id).values_list(
+            "id", flat=True
+        ).get()
+        claim = (
+            ClaimBatch.objects.filter(user=user)
+            .exclude(status="sent")
+            .order_by("created_at")
+            .first()
+        )
+        if claim is not None:
+            return claim
+
+        pending = claimable_tasks(user)
+        totals = pending.aggregate(amount=Sum("task__token_reward"), count=Count("id"))
+        if not totals["count"]:
+            return None
+
+        claim = ClaimBatch.objects.create(
+            user=user,
+            wallet_address=wallet_address,
+            chain=user.preferred_chain,
+            amount=totals["amount"],
+            task_count=totals["count"],
+        )
+        pending.update(claim_batch=claim)
+    return claim
+
+
+async def asend_claim(claim, chain_provider=None):
+    """Send a claim's transfer at most once; returns the claim as it stands
+
+    Only the caller that moves the claim to "sending" transfers tokens, so a
+    retried or concurrent request gets the original transfer back. A claim
+    left "sending" by a process that died is retaken after SEND_TIMEOUT.
+    The signed transfer is stored before it is broadcast and later attempts
+    re-send that same transaction, so its nonce lets it pay only once. The
+    transfer is awaited, so a slow node holds no worker thread.
+    """
+
+    async def issue(on_signed):
+        result = await aissue_token_reward(
+            claim.wallet_address,
+            claim.amount,
+            claim.chain,
+            chain_provider,
+            on_signed=on_signed,
+        )
+        return result["tx_hash"]
+
+    tx_hash = await _asend_once(claim, issue, chain_provider)
+    if tx_hash is not None:
+        await sync_to_async(_record_sent)(claim, tx_hash)
+    return claim
+
+
+def open_badge_mint(user, wallet_address, badge_data):
+    """The mint record for a user's current level, created on first claim"""
+    mint, _ = BadgeMint.objects.get_or_create(
+        user=user,
+        level=user.level,
+        defaults={
+            "wallet_address": wallet_address,
+            "chain": user.preferred_chain,
+            "token_uri": badge_token_uri(badge_data),
+        },
+    )
+    return mint
+
+
+async def asend_badge_mint(mint, badge_data, chain_provider=None):
+    """Mint a level badge at most once; returns the mint as it stands
+
+    Sent like a claim, so retries and concurrent requests never mint twice.
+    """
+
+    async def issue(on_signed):
+        result = await amint_nft_badge(
+            mint.wallet_address,
+            badge_data,
+            mint.chain,
+            chain_provider,
+            on_signed=on_signed,
+        )
+        return result["tx_hash"]
+
+    tx_hash = await _asend_once(mint, issue, chain_provider)
+    if tx_hash is not None:
+        mint.sent_at = timezone.now()
+        await BadgeMint.objects.filter(id=mint.id).aupdate(
+            status="sent", tx_hash=tx_hash, sent_at=mint.sent_at, error=""
+        )
+        mint.status = "sent"
+        mint.tx_hash = tx_hash
+    return mint
+
+
+async def _asend_once(record, issue, chain_provider):
+    """Broadcast a claim's or mint's transaction; returns its hash, or None
+
+    ``issue(on_signed)`` signs and sends a new transaction. It is called
+    only when the record holds no signed transaction that can still be
+    mined. None means another request owns the send, or the send failed
+    and the record is marked "failed".
+    """
+    rows = type(record).objects.filter(id=record.id)
+    now = timezone.now()
+    started = await rows.filter(
+        Q(status__in=UNSENT_STATUSES)
+        | Q(status="sending", sending_at__lt=now - timedelta(seconds=SEND_TIMEOUT))
+    ).aupdate(status="sending", sending_at=now, attempts=F("attempts") + 1)
+    # Picks up the transaction an earlier attempt signed
+    await record.arefresh_from_db()
+    if not started:
+        # Already sent, or another request is sending it right now
+        return None
+
+    try:
+        tx_hash = None
+        if record.raw_tx:
+            tx_hash = await arebroadcast_transaction(
+                record.raw_tx, record.chain, chain_provider
+            )
+        if tx_hash is None:
+            # Never signed, or its nonce went to another transaction
+            tx_hash = await issue(partial(_record_signed, record))
+    except Exception as e:
+        logger.error(f"{type(record).__name__} {record.id} failed: {e}")
+        await rows.aupdate(status="failed", error=str(e))
+        record.status = "failed"
+        record.error = str(e)
+        return None
+    return tx_hash
+
+
+async def _record_signed(record, raw_tx, tx_hash):
+    await type(record).objects.filter(id=record.id).aupdate(
+        raw_tx=raw_tx, tx_hash=tx_hash
+    )
+    record.raw_tx = raw_tx
+    record.tx_hash = tx_hash
+
+
+def _record_sent(claim, tx_hash):
+    now = timezone.now()
+    with transaction.atomic():
+        ClaimBatch.objects.filter(id=claim.id).update(
+            status="sent", tx_hash=tx_hash, sent_at=now, error=""
+        )
+        UserTask.objects.filter(claim_batch=claim).update(
+            reward_tx_hash=tx_hash, reward_chain=claim.chain
+        )
+    claim.status = "sent"
+    claim.tx_hash = tx_hash
+    claim.sent_at = now
@@ -0,0 +1,34 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Dedicated pool for blocking model calls. Kept apart from the path job pool
+# so a job waiting on its own fan-out can never starve it.
+_llm_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "LLM_CONCURRENCY", 8),
+    thread_name_prefix="llm",
+)
+
+
+def run_concurrently(calls):
+    """Run zero-argument callables in parallel and return results in order
+
+    The callables must not touch the database: they run on pool threads
+    outside the caller's transaction. The first exception is re-raised once
+    every call has finished.
+    """
+    futures = [_llm_executor.submit(call) for call in calls]
+    results = []
+    error = None
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            logger.error(f"Concurrent call failed: {e}")
+            results.append(None)
+            error = error or e
+    if error:
+        raise error
+    return results
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import threading
+from contextlib import aclosing
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import TaskContent
+from .view_cache import TASKS, invalidate
+
+logger = logging.getLogger(__name__)
+
+CACHE_TIMEOUT = 60 * 60  # Seconds a ready lesson stays in the memory cache
+GENERATION_TIMEOUT = 180  # Seconds before an unfinished generation can be retaken
+
+# Striped locks so concurrent first reads of a task in this process wait for
+# a single generation instead of each calling the model
+_locks = [threading.Lock() for _ in range(64)]
+
+
+def _cache_key(task_id):
+    return f"task_content:{task_id}"
+
+
+def _payload(content):
+    return {
+        "success": True,
+        "lesson": content.lesson,
+        "quiz": content.quiz,
+        "version": content.version,
+    }
+
+
+def _claim_generation(task_id):
+    """Take ownership of generating content for a task, or return None"""
+    try:
+        with transaction.atomic():
+            return TaskContent.objects.create(task_id=task_id, status="generating")
+    except IntegrityError:
+        pass
+
+    # Regenerate invalidated content, or take over a generation that died
+    now = timezone.now()
+    claimed = (
+        TaskContent.objects.filter(task_id=task_id)
+        .filter(
+            Q(status="stale")
+            | Q(
+                status="generating",
+                updated_at__lt=now - timedelta(seconds=GENERATION_TIMEOUT),
+            )
+        )
+        .update(status="generating", updated_at=now)
+    )
+    if not claimed:
+        return None
+    return TaskContent.objects.get(task_id=task_id)
+
+
+def get_lesson_content(task, agent):
+    """Get lesson and quiz for a learning task, generating them only once"""
+    if task.task_type != "learning":
+        return {"success": False, "error": "Not a learning task"}
+
+    key = _cache_key(task.id)
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    with _locks[task.id % len(_locks)]:
+        payload, content = _ready_or_claim(task.id)
+        if payload is not None:
+            return payload
+        if content is None:
+            # Another process is generating this lesson; the client polls again
+            return {
+                "success": False,
+                "pending": True,
+                "error": "Lesson content is being generated",
+            }
+
+        result = agent.generate_lesson_content(task.id)
+        if not result["success"]:
+            _release(content)
+            return result
+        return _publish(content, result["lesson"], result["quiz"])
+
+
+def invalidate_lesson_content(task_id):
+    """Mark stored content stale so the next read regenerates it"""
+    updated = TaskContent.objects.filter(task_id=task_id).update(
+        status="stale", version=F("version") + 1, updated_at=timezone.now()
+    )
+    cache.delete(_cache_key(task_id))
+    invalidate(TASKS)
+    logger.info(f"Invalidated lesson content for task {task_id}")
+    return updated > 0
+
+
+def _release(content):
+    """Give up a generation so the next read can retake it"""
+    TaskContent.objects.filter(pk=content.pk, status="generating").update(
+        status="stale", updated_at=timezone.now()
+    )
+
+
+def _publish(content, lesson, quiz):
+    """Store generated content and return its payload"""
+    content.lesson = lesson
+    content.quiz = quiz
+    # Only publish if nobody invalidated the content while we generated it
+    stored = TaskContent.objects.filter(
+        pk=content.pk, status="generating", version=content.version
+    ).update(
+        lesson=content.lesson,
+        quiz=content.quiz,
+        status="ready",
+        updated_at=timezone.now(),
+    )
+
+    payload = _payload(content)
+    if stored:
+        cache.set(_cache_key(content.task_id), payload, CACHE_TIMEOUT)
+    return payload
+
+
+def _ready_or_claim(task_id):
+    """(payload, None) for stored content, else (None, claimed content or None)"""
+    payload = cache.get(_cache_key(task_id))
+    if payload is not None:
+        return payload, None
+    content = TaskContent.objects.filter(task_id=task_id, status="ready").first()
+    if content:
+        payload = _payload(content)
+        cache.set(_cache_key(task_id), payload, CACHE_TIMEOUT)
+        return payload, None
+    return None, _claim_generation(task_id)
+
+
+def _finish_stream(agent, task, content, lesson, quiz):
+    agent.save_quiz(task, quiz)
+    return _publish(content, lesson, quiz)
+
+
+async def stream_lesson_content(task, agent):
+    """Yield (event, data) pairs for a learning task's lesson as it is written
+
+    Stored content is sent at once. Otherwise lesson text is relayed as
+    "lesson" deltas while the quiz is generated alongside and sent as soon
+    as it is ready; the finished lesson is then stored like
+    get_lesson_content would. A generation running elsewhere yields
+    "pending", and the client falls back to polling get_task_content.
+    """
+    payload, content = await sync_to_async(_ready_or_claim)(task.id)
+    if payload is not None:
+        yield "lesson", {"delta": payload["lesson"]}
+        yield "quiz", {"questions": payload["quiz"]}
+        yield "done", {"version": payload["version"]}
+        return
+    if content is None:
+        yield "pending", {"error": "Lesson content is being generated"}
+        return
+
+    # The quiz prompt does not depend on the lesson, so both run at once
+    quiz = asyncio.ensure_future(
+        sync_to_async(agent.generate_quiz, thread_sensitive=False)(task)
+    )
+    parts = []
+    quiz_sent = published = False
+    try:
+        async for delta in agent.stream_lesson(task):
+            parts.append(delta)
+            yield "lesson", {"delta": delta}
+            if not quiz_sent and quiz.done():
+                yield "quiz", {"questions": quiz.result()}
+                quiz_sent = True
+        questions = await quiz
+        if not quiz_sent:
+            yield "quiz", {"questions": questions}
+        payload = await sync_to_async(_finish_stream)(
+            agent, task, content, "".join(parts), questions
+        )
+        published = True
+    except Exception as e:
+        logger.error(f"Error streaming lesson for task {task.id}: {e}")
+        yield "error", {"error": str(e)}
+    finally:
+        if not published:
+            quiz.cancel()
+            await sync_to_async(_release)(content)
+    if published:
+        yield "done", {"version": payload["version"]}
+
+
+async def aget_lesson_content(task, agent):
+    """get_lesson_content for async views, awaiting the model off any thread"""
+    if task.task_type != "learning":
+        return {"success": False, "error": "Not a learning task"}
+
+    parts = []
+    payload = {"success": True}
+    # Closing the stream on an early return releases its generation claim now
+    async with aclosing(stream_lesson_content(task, agent)) as events:
+        async for event, data in events:
+            if event == "lesson":
+                parts.append(data["delta"])
+            elif event == "quiz":
+                payload["quiz"] = data["questions"]
+            elif event == "done":
+                payload.update(lesson="".join(parts), version=data["version"])
+            elif event == "pending":
+                return {"success": False, "pending": True, "error": data["error"]}
+            else:
+                return {"success": False, "error": data["error"]}
+    return payload
@@ -0,0 +1,419 @@
+import time
+import uuid
+import random
+import hashlib
+import logging
+from datetime import timedelta
+from functools import partial
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from .concurrency import run_concurrently
+from .models import GradedProof, GradingRequest, UserTask
+from .notifications import enqueue_notification
+from .progress import refresh_path_progress
+from .view_cache import invalidate_users
+from .xp_ledger import complete_user_task
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = getattr(settings, "GRADING_MAX_ATTEMPTS", 3)
+BATCH_LIMIT = getattr(settings, "GRADING_BATCH_LIMIT", 50)
+PACK_SIZE = getattr(settings, "GRADING_PACK_SIZE", 5)  # Proofs per prompt
+# Seconds a claimed request may stay "grading" before another worker retakes it
+GRADING_TIMEOUT = getattr(settings, "GRADING_TIMEOUT", 600)
+
+# Awaiting review; grading moves the task on to verified or failed
+REVIEW_STATUS = "completed"
+
+
+def normalize_proof(kind, proof):
+    """Canonical text of a proof, so trivially different copies hash alike
+
+    Links lose their scheme, "www.", fragment, trailing slash and utm_*
+    parameters; submissions have their whitespace collapsed.
+    """
+    if kind == "social_proof":
+        link = str(proof["proof_link"]).strip()
+        parts = urlsplit(link if "//" in link else f"//{link}")
+        host = parts.netloc.lower().removeprefix("www.")
+        query = urlencode(
+            sorted(
+                (key, value)
+                for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                if not key.lower().startswith("utm_")
+            )
+        )
+        return f"{host}{parts.path.rstrip('/')}" + (f"?{query}" if query else "")
+    return " ".join(str(proof["submission"]).split())
+
+
+def proof_hash(kind, proof):
+    return hashlib.sha256(normalize_proof(kind, proof).encode("utf-8")).hexdigest()
+
+
+def _reused_grade(grade, first_user_id, first_user_task_id, user_task):
+    """A stored grade as served to another submission of the same proof
+
+    Only the same user's resubmissions reuse the grade. A proof first
+    submitted by someone else fails, flagged with ``duplicate_of``, so a
+    copied answer or link earns nothing.
+    """
+    grade = {**grade, "cached": True}
+    if first_user_id != user_task.user_id:
+        grade.update(
+            passed=False,
+            score=0,
+            feedback="This proof was already submitted by another user.",
+            duplicate_of=first_user_task_id,
+        )
+    return grade
+
+
+def submit_for_grading(user_task, kind, proof):
+    """Mark a task as awaiting review and queue its proof for the worker
+
+    A proof already graded for the task is graded at once from the cache
+    instead of being queued. Returns None if the task is already awaiting
+    review or verified.
+    """
+    content_hash = proof_hash(kind, proof)
+    cached = GradedProof.objects.filter(
+        task_id=user_task.task_id, content_hash=content_hash
+    ).first()
+    with transaction.atomic():
+        updated = (
+            UserTask.objects.filter(id=user_task.id)
+            .exclude(status__in=(REVIEW_STATUS, "verified"))
+            .update(
+                status=REVIEW_STATUS,
+                verification_data={**proof, "review": "pending"},
+            )
+        )
+        if not updated:
+            return None
+        user_task.status = REVIEW_STATUS
+        if cached is None:
+            refresh_path_progress([user_task.learning_path_id])
+            invalidate_users([user_task.user_id])
+            return GradingRequest.objects.create(
+                user_task=user_task, kind=kind, proof=proof, content_hash=content_hash
+            )
+
+        grade = _reused_grade(
+            cached.grade, cached.first_user_id, cached.first_user_task_id, user_task
+        )
+        grading = GradingRequest.objects.create(
+            user_task=user_task,
+            kind=kind,
+            proof=proof,
+            content_hash=content_hash,
+            status="graded",
+            result=grade,
+            graded_at=timezone.now(),
+        )
+        GradedProof.objects.filter(id=cached.id).update(hits=F("hits") + 1)
+        grading.award = _record_grade(user_task, kind, proof, grade)
+    return grading
+
+
+def _claim_batch(limit):
+    """Move the oldest queued requests to "grading" under a fresh batch id
+
+    Requests left "grading" for GRADING_TIMEOUT by a worker that died are
+    claimed again.
+    """
+    now = timezone.now()
+    claimable = GradingRequest.objects.filter(
+        Q(status="queued")
+        | Q(
+            status="grading",
+            claimed_at__lt=now - timedelta(seconds=GRADING_TIMEOUT),
+        )
+    )
+    ids = list(claimable.order_by("created_at").values_list("id", flat=True)[:limit])
+    if not ids:
+        return []
+    batch_id = uuid.uuid4()
+    claimable.filter(id__in=ids).update(
+        status="grading",
+        batch_id=batch_id,
+        claimed_at=now,
+        attempts=F("attempts") + 1,
+    )
+    return list(
+        GradingRequest.objects.filter(batch_id=batch_id)
+        .select_related("user_task__task", "user_task__user")
+        .order_by("created_at")
+    )
+
+
+def _quietly(call):
+    """Run a model call, returning None instead of raising"""
+    try:
+        return call()
+    except Exception as e:
+        logger.warning(f"Grading call failed: {e}")
+        return None
+
+
+def grade_requests(agent, requests):
+    """Grade requests, packing several proofs into each prompt
+
+    Packs of up to PACK_SIZE proofs of the same kind share a prompt and run
+    concurrently; any proof a packed reply leaves out is graded on its own.
+    Returns one grade per request, None where grading failed.
+    """
+    packs = []
+    for kind in ("social_proof", "submission"):
+        same_kind = [i for i, request in enumerate(requests) if request.kind == kind]
+        for start in range(0, len(same_kind), PACK_SIZE):
+            packs.append((kind, same_kind[start : start + PACK_SIZE]))
+
+    grades = [None] * len(requests)
+    packed = run_concurrently(
+        [
+            partial(
+                _quietly,
+                partial(
+                    agent.grade_proofs_packed,
+                    kind,
+                    [(requests[i].user_task.task, requests[i].proof) for i in indexes],
+                ),
+            )
+            for kind, indexes in packs
+        ]
+    )
+    for (_, indexes), pack_grades in zip(packs, packed):
+        for i, grade in zip(indexes, pack_grades or ()):
+            grades[i] = grade
+
+    missing = [i for i, grade in enumerate(grades) if grade is None]
+    singles = run_concurrently(
+        [
+            partial(
+                _quietly,
+                partial(
+                    agent.grade_proof,
+                    requests[i].kind,
+                    requests[i].user_task.task,
+                    requests[i].proof,
+                ),
+            )
+            for i in missing
+        ]
+    )
+    for i, grade in zip(missing, singles):
+        grades[i] = grade
+    return grades
+
+
+def _record_grade(user_task, kind, proof, grade):
+    """Verify or fail the task for a grade; returns the XP award, if any"""
+    if kind == "social_proof":
+        verification_data = {
+            "proof": proof["proof_link"],
+            "ai_verification": grade["feedback"],
+        }
+    else:
+        verification_data = {
+            "submission": proof["submission"],
+            "evaluation": grade["feedback"],
+            "score": grade["score"],
+        }
+    if grade.get("duplicate_of"):
+        verification_data["duplicate_of"] = grade["duplicate_of"]
+
+    if grade["passed"]:
+        return complete_user_task(user_task, verification_data, kind)
+    UserTask.objects.filter(id=user_task.id, status=REVIEW_STATUS).update(
+        status="failed", verification_data=verification_data
+    )
+    refresh_path_progress([user_task.learning_path_id])
+    invalidate_users([user_task.user_id])
+    return None
+
+
+def _store_grade(request, grade):
+    """Keep a fresh grade for identical proofs of the same task"""
+    GradedProof.objects.get_or_create(
+        task_id=request.user_task.task_id,
+        content_hash=request.content_hash,
+        defaults={
+            "kind": request.kind,
+            "grade": {key: grade[key] for key in ("passed", "score", "feedback")},
+            "first_user_id": request.user_task.user_id,
+            "first_user_task_id": request.user_task_id,
+        },
+    )
+
+
+def _apply_grade(agent, request, grade):
+    """Verify or fail the task for a grade, then tell the user
+
+    Returns False if the request was retaken by another worker since this one
+    claimed it; that worker applies its own grade.
+    """
+    user_task = request.user_task
+    task = user_task.task
+    with transaction.atomic():
+        applied = _claimed_rows(request).update(
+            status="graded", result=grade, graded_at=timezone.now(), error=""
+        )
+        if not applied:
+            return False
+        award = _record_grade(user_task, request.kind, request.proof, grade)
+        if not grade.get("cached"):
+            _store_grade(request, grade)
+
+    if not grade["passed"]:
+        message = (
+            f"❌ Your proof for *{task.title}* needs another try.\n"
+            f"{grade['feedback'][:200]}"
+        )
+    elif award is not None:
+        message = f"✅ Your proof for *{task.title}* was approved! +{task.xp_reward} XP"
+        if random.random() < 0.3:  # 30% chance to suggest new task
+            agent._suggest_next_task(user_task.user)
+    else:
+        return True  # Verified some other way in the meantime
+    enqueue_notification(user_task.user.telegram_id, message)
+    return True
+
+
+def _claimed_rows(request):
+    """The request, only while it is still claimed by this worker's batch"""
+    return GradingRequest.objects.filter(
+        id=request.id, batch_id=request.batch_id, status="grading"
+    )
+
+
+def _retry_or_fail(request, error):
+    """Requeue a request whose grading failed, giving up after MAX_ATTEMPTS"""
+    rows = _claimed_rows(request)
+    if request.attempts < MAX_ATTEMPTS:
+        rows.update(status="queued", batch_id=None, error=error)
+        return
+
+    with transaction.atomic():
+        if not rows.update(status="failed", error=error):
+            return  # Retaken by another worker, which now owns the outcome
+        # Let the user submit again rather than wait forever
+        UserTask.objects.filter(id=request.user_task_id, status=REVIEW_STATUS).update(
+            status="active"
+        )
+        refresh_path_progress([request.user_task.learning_path_id])
+        invalidate_users([request.user_task.user_id])
+    enqueue_notification(
+        request.user_task.user.telegram_id,
+        f"⚠️ We could not review your proof for *{request.user_task.task.title}*. "
+        f"Please submit it again.",
+    )
+
+
+def _grade_batch(agent, requests):
+    """Grades for a batch, calling the model once per distinct proof
+
+    Proofs graded before come from the cache in one query, and identical
+    proofs within the batch share the grade of the first.
+    """
+    for request in requests:
+        if not request.content_hash:  # Queued before proofs were hashed
+            request.content_hash = proof_hash(request.kind, request.proof)
+    keys = [(r.user_task.task_id, r.content_hash) for r in requests]
+    cached = {
+        (proof.task_id, proof.content_hash): proof
+        for proof in GradedProof.objects.filter(
+            task_id__in={task_id for task_id, _ in keys},
+            content_hash__in={content_hash for _, content_hash in keys},
+        )
+    }
+    firsts = {}
+    for request, key in zip(requests, keys):
+        if key not in cached:
+            firsts.setdefault(key, request)
+    fresh = dict(zip(firsts, grade_requests(agent, list(firsts.values()))))
+
+    grades = []
+    for request, key in zip(requests, keys):
+        if key in cached:
+            proof = cached[key]
+            GradedProof.objects.filter(id=proof.id).update(hits=F("hits") + 1)
+            grade = _reused_grade(
+                proof.grade,
+                proof.first_user_id,
+                proof.first_user_task_id,
+                request.user_task,
+            )
+        elif firsts[key] is not request and fresh[key] is not None:
+            first = firsts[key].user_task
+            grade = _reused_grade(
+                fresh[key], first.user_id, first.id, request.user_task
+            )
+        else:
+            grade = fresh[key]
+        grades.append(grade)
+    return grades
+
+
+def process_grading_queue(agent, limit=BATCH_LIMIT):
+    """Grade one micro-batch of queued proofs; returns counts for metrics"""
+    started = time.monotonic()
+    requests = _claim_batch(limit)
+    if not requests:
+        return {"graded": 0, "failed": 0, "seconds": 0.0}
+
+    grades = _grade_batch(agent, requests)
+    graded = failed = 0
+    for request, grade in zip(requests, grades):
+        try:
+            if grade is None:
+                raise ValueError("Model returned no usable grade")
+            if _apply_grade(agent, request, grade):
+                graded += 1
+        except Exception as e:
+            logger.error(f"Grading request {request.id} failed: {e}")
+            _retry_or_fail(request, str(e))
+            failed += 1
+
+    seconds = time.monotonic() - started
+    logger.info(
+        f"Graded {graded} proofs ({failed} failed) in {seconds:.2f}s, "
+        f"{graded / seconds if seconds else 0:.1f}/s"
+    )
+    return {"graded": graded, "failed": failed, "seconds": seconds}
+
+
+def grading_metrics():
+    """Queue depth and last-hour throughput from two index range scans"""
+    hour_ago = timezone.now() - timedelta(hours=1)
+    metrics = GradingRequest.objects.filter(status__in=("queued", "grading")).aggregate(
+        queued=Count("id", filter=Q(status="queued")),
+        grading=Count("id", filter=Q(status="grading")),
+    )
+    metrics.update(
+        GradingRequest.objects.filter(
+            status__in=("graded", "failed"), created_at__gte=hour_ago
+        ).aggregate(
+            graded_last_hour=Count("id", filter=Q(status="graded")),
+            failed_last_hour=Count("id", filter=Q(status="failed")),
+        )
+    )
+    metrics["graded_per_minute"] = round(metrics["graded_last_hour"] / 60, 2)
+    return metrics
+
+
+def grading_status(request):
+    """Serialize a grading request for the polling endpoint"""
+    data = {
+        "grading_id": str(request.id),
+        "user_task_id": request.user_task_id,
+        "status": request.status,
+    }
+    if request.status == "graded":
+        data["result"] = request.result
+    elif request.status == "failed":
+        data["error"] = request.error
+    return data
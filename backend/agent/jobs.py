@@ -0,0 +1,94 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from .models import PathJob, UserTask
+from .notifications import notify_path_ready
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "PATH_JOB_WORKERS", 4),
+    thread_name_prefix="path-job",
+)
+# Seconds a job may stay queued or running before it is reported failed
+PATH_JOB_TIMEOUT = getattr(settings, "PATH_JOB_TIMEOUT", 600)
+STALE_JOB_ERROR = "Path generation did not finish; please try again"
+
+
+def submit_path_job(user, topic, agent):
+    """Queue learning path generation and return the job immediately"""
+    job = PathJob.objects.create(user=user, topic=topic)
+    _executor.submit(_run_path_job, job.id, agent)
+    return job
+
+
+def _run_path_job(job_id, agent):
+    """Generate the path for a queued job on a worker thread"""
+    close_old_connections()
+    try:
+        job = PathJob.objects.select_related("user").get(id=job_id)
+        job.status = "running"
+        job.save(update_fields=["status", "updated_at"])
+
+        result = agent.create_personalized_path(job.user.telegram_id, job.topic)
+        if not result["success"]:
+            job.status = "failed"
+            job.error = result["error"]
+            job.save(update_fields=["status", "error", "updated_at"])
+            return
+
+        job.status = "completed"
+        job.learning_path_id = result["path_id"]
+        job.save(update_fields=["status", "learning_path", "updated_at"])
+
+        notify_path_ready(job.user.telegram_id, job.learning_path, result["tasks"])
+    except Exception as e:
+        logger.error(f"Path job {job_id} failed: {e}")
+        PathJob.objects.filter(id=job_id).update(status="failed", error=str(e))
+    finally:
+        close_old_connections()
+
+
+def fail_if_stale(job):
+    """Fail a job left queued or running past PATH_JOB_TIMEOUT
+
+    Jobs live on an in-process executor, so a restart or deploy loses them;
+    without this the client would poll their last status forever.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=PATH_JOB_TIMEOUT)
+    if job.status not in ("queued", "running") or job.updated_at >= cutoff:
+        return job
+    # Conditional, in case the worker moved the job on since it was read
+    failed = PathJob.objects.filter(
+        id=job.id, status=job.status, updated_at__lt=cutoff
+    ).update(status="failed", error=STALE_JOB_ERROR, updated_at=now)
+    if failed:
+        job.status = "failed"
+        job.error = STALE_JOB_ERROR
+        job.updated_at = now
+    return job
+
+
+def get_job_status(job):
+    """Serialize job state for the polling endpoint"""
+    job = fail_if_stale(job)
+    data = {
+        "job_id": str(job.id),
+        "status": job.status,
+        "topic": job.topic,
+    }
+    if job.status == "completed" and job.learning_path_id:
+        first_task = (
+            UserTask.objects.filter(learning_path_id=job.learning_path_id)
+            .order_by("order", "id")
+            .first()
+        )
+        data["path_id"] = job.learning_path_id
+        data["first_task_id"] = first_task.id if first_task else None
+    elif job.status == "failed":
+        data["error"] = job.error
+    return data
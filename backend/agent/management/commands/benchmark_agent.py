@@ -0,0 +1,80 @@
+import time
+import uuid
+from statistics import mean, median
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from agent.ai_core import LearnEarnAIAgent
+from agent.llm import LLMClient, StubBackend
+from agent.models import User, UserTask
+from agent.views import get_user_paths
+
+
+class Command(BaseCommand):
+    help = "Benchmark agent flows offline against the stub LLM backend"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=10)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="Simulated model round-trip time in seconds",
+        )
+
+    def handle(self, *args, **options):
+        agent = LearnEarnAIAgent(llm=LLMClient(StubBackend(options["latency"])))
+        path_timings = []
+        lesson_timings = []
+        path_list_queries = []
+        request_factory = RequestFactory()
+
+        # Everything is rolled back and no notifications are sent
+        with override_settings(TESTING=True), transaction.atomic():
+            user = User.objects.create(
+                telegram_id=f"benchmark-{uuid.uuid4().hex[:8]}",
+                interests={"primary": "DeFi"},
+            )
+            for _ in range(options["iterations"]):
+                start = time.perf_counter()
+                result = agent.create_personalized_path(user.telegram_id, "DeFi")
+                path_timings.append(time.perf_counter() - start)
+                if not result["success"]:
+                    self.stderr.write(f"Path creation failed: {result['error']}")
+                    continue
+
+                learning_task = (
+                    UserTask.objects.filter(
+                        learning_path_id=result["path_id"], task__task_type="learning"
+                    )
+                    .values_list("task_id", flat=True)
+                    .first()
+                )
+                start = time.perf_counter()
+                agent.generate_lesson_content(learning_task)
+                lesson_timings.append(time.perf_counter() - start)
+
+                # Listing cost should not grow with the number of paths
+                with CaptureQueriesContext(connection) as queries:
+                    get_user_paths(request_factory.get("/"), user.telegram_id)
+                path_list_queries.append(len(queries))
+            transaction.set_rollback(True)
+
+        self._report("create_personalized_path", path_timings)
+        self._report("generate_lesson_content", lesson_timings)
+        if path_list_queries:
+            self.stdout.write(
+                f"get_user_paths: queries for 1..{len(path_list_queries)} paths "
+                f"min={min(path_list_queries)} max={max(path_list_queries)}"
+            )
+
+    def _report(self, name, timings):
+        if not timings:
+            return
+        ordered = sorted(timings)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        self.stdout.write(
+            f"{name}: n={len(timings)} mean={mean(timings) * 1000:.1f}ms "
+            f"p50={median(timings) * 1000:.1f}ms p95={p95 * 1000:.1f}ms"
+        )
@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from agent.ai_core import LearnEarnAIAgent
+from agent.grading import BATCH_LIMIT, grading_metrics, process_grading_queue
+
+
+class Command(BaseCommand):
+    help = "Grade queued social proofs and submissions in micro-batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Seconds between polls of an empty queue; 0 drains it once",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=BATCH_LIMIT, help="Proofs per micro-batch"
+        )
+
+    def handle(self, *args, **options):
+        agent = LearnEarnAIAgent()
+        while True:
+            result = process_grading_queue(agent, options["limit"])
+            if result["graded"] or result["failed"]:
+                metrics = grading_metrics()
+                self.stdout.write(
+                    f"Graded {result['graded']} ({result['failed']} failed) "
+                    f"in {result['seconds']:.2f}s; {metrics['queued']} queued"
+                )
+                continue
+            if not options["interval"]:
+                break
+            close_old_connections()
+            time.sleep(options["interval"])
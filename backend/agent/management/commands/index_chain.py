@@ -0,0 +1,53 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from agent.chain_indexer import run_indexer_pass
+from agent.models import ChainCheckpoint
+
+
+class Command(BaseCommand):
+    help = "Follow new blocks and complete transaction tasks without tx hashes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chain", action="append", help="Chain to index (default: all)"
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Seconds between passes; 0 runs a single pass",
+        )
+        parser.add_argument(
+            "--max-blocks", type=int, help="Blocks to scan per pass at most"
+        )
+        parser.add_argument(
+            "--from-block",
+            type=int,
+            help="Restart scanning at this block (applies to every --chain)",
+        )
+
+    def handle(self, *args, **options):
+        chains = options["chain"] or ["gnosis", "rootstock"]
+        if options["from_block"] is not None:
+            for chain in chains:
+                ChainCheckpoint.objects.update_or_create(
+                    chain=chain, defaults={"block_number": options["from_block"] - 1}
+                )
+
+        while True:
+            for chain in chains:
+                result = run_indexer_pass(chain, max_blocks=options["max_blocks"])
+                if result["success"] and result["to_block"] < result["from_block"]:
+                    self.stdout.write(f"{chain}: no new confirmed blocks")
+                elif result["success"]:
+                    self.stdout.write(
+                        f"{chain}: blocks {result['from_block']}-{result['to_block']}, "
+                        f"{result['verified']} tasks verified"
+                    )
+                else:
+                    self.stderr.write(f"{chain}: {result['error']}")
+            if not options["interval"]:
+                break
+            close_old_connections()
+            time.sleep(options["interval"])
@@ -0,0 +1,181 @@
+import io
+import time
+import uuid
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from statistics import median
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import reverse
+from agent.models import Task, User, UserTask, VerifiedTransaction
+from web3agent.asgi import application as asgi_application
+from web3agent.wsgi import application as wsgi_application
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test verify_task through the ASGI and WSGI applications against "
+        "a simulated slow RPC node"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.5,
+            help="Simulated RPC round-trip time in seconds",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=8,
+            help="WSGI worker threads, as in a threaded gunicorn worker",
+        )
+
+    def handle(self, *args, **options):
+        count = options["requests"]
+        prefix = f"load-{uuid.uuid4().hex[:8]}"
+        quest = Task.objects.create(
+            title=f"Load test {prefix}",
+            description="Any transaction",
+            task_type="quest",
+            verification_type="transaction",
+            xp_reward=10,
+        )
+        users = User.objects.bulk_create(
+            [User(telegram_id=f"{prefix}-{i}") for i in range(2 * count)]
+        )
+        user_tasks = UserTask.objects.bulk_create(
+            [UserTask(user=user, task=quest, status="active") for user in users]
+        )
+        proofs = [
+            (
+                reverse("verify_task", kwargs={"user_task_id": user_task.id}),
+                json.dumps({"proof": {"transaction_hash": f"0x{user_task.id:064x}"}}),
+            )
+            for user_task in user_tasks
+        ]
+
+        # Every RPC request takes the same time, whichever path awaits it
+        async def slow_node(payload, chain, chain_provider):
+            await asyncio.sleep(options["latency"])
+            return [
+                {"id": 0, "result": {"from": "0x" + "1" * 40, "input": "0x"}},
+                {"id": 1, "result": {"blockNumber": "0x1", "status": "0x1"}},
+                {"id": 2, "result": "0x100"},
+            ]
+
+        try:
+            with override_settings(TESTING=True), mock.patch(
+                "agent.blockchain._apost", slow_node
+            ), mock.patch("agent.ai_core.random", return_value=1.0):
+                asgi = async_to_sync(self._run_asgi)(proofs[:count])
+                wsgi = self._run_wsgi(proofs[count:], options["threads"])
+        finally:
+            VerifiedTransaction.objects.filter(
+                tx_hash__in=[f"0x{user_task.id:064x}" for user_task in user_tasks]
+            ).delete()
+            User.objects.filter(telegram_id__startswith=prefix).delete()
+            quest.delete()
+
+        self._report("asgi (one event loop)", *asgi)
+        self._report(f"wsgi ({options['threads']} threads)", *wsgi)
+
+    async def _run_asgi(self, proofs):
+        async def timed(path, body):
+            start = time.perf_counter()
+            status = await _asgi_post(path, body)
+            return status, time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(timed(path, body) for path, body in proofs))
+        return results, time.perf_counter() - start
+
+    def _run_wsgi(self, proofs, threads):
+        def timed(proof):
+            start = time.perf_counter()
+            status = _wsgi_post(*proof)
+            return status, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(timed, proofs))
+        return results, time.perf_counter() - start
+
+    def _report(self, name, results, elapsed):
+        timings = sorted(timing for _, timing in results)
+        failed = sum(status != 200 for status, _ in results)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"{name}: n={len(results)} failed={failed} wall={elapsed:.2f}s "
+            f"rps={len(results) / elapsed:.1f} "
+            f"p50={median(timings) * 1000:.0f}ms p95={p95 * 1000:.0f}ms"
+        )
+
+
+async def _asgi_post(path, body):
+    """POST a JSON body through the ASGI application; returns the status"""
+    body = body.encode("utf-8")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # The client never disconnects; the handler cancels this when done
+        return await asyncio.get_running_loop().create_future()
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi_application(scope, receive, send)
+    return next(m["status"] for m in sent if m["type"] == "http.response.start")
+
+
+def _wsgi_post(path, body):
+    """POST a JSON body through the WSGI application; returns the status"""
+    body = body.encode("utf-8")
+    environ = {
+        "REQUEST_METHOD": "POST",
+        "PATH_INFO": path,
+        "SCRIPT_NAME": "",
+        "QUERY_STRING": "",
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": "localhost",
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.url_scheme": "http",
+        "wsgi.errors": io.StringIO(),
+    }
+    statuses = []
+    response = wsgi_application(
+        environ, lambda status, headers: statuses.append(status)
+    )
+    b"".join(response)
+    response.close()
+    return int(statuses[0].split()[0])
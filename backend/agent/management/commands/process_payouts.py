@@ -0,0 +1,42 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from agent.payouts import flush_payouts, stale_batches
+
+
+class Command(BaseCommand):
+    help = "Send queued token rewards as batched on-chain transfers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chain", action="append", help="Chain to flush (default: all)"
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Seconds between flushes; 0 runs a single flush",
+        )
+
+    def handle(self, *args, **options):
+        chains = options["chain"] or ["gnosis", "rootstock"]
+        while True:
+            for chain in chains:
+                result = flush_payouts(chain)
+                if result["success"]:
+                    self.stdout.write(
+                        f"{chain}: sent {result['payouts']} payouts "
+                        f"in {len(result['tx_hashes'])} txs"
+                    )
+                else:
+                    self.stderr.write(f"{chain}: {result['error']}")
+                for batch in stale_batches(chain):
+                    self.stderr.write(
+                        f"{chain}: batch {batch['batch_id']} has {batch['payouts']} "
+                        f"payouts sending since {batch['since']:%Y-%m-%d %H:%M}; "
+                        "reconcile against the chain before requeueing"
+                    )
+            if not options["interval"]:
+                break
+            close_old_connections()
+            time.sleep(options["interval"])
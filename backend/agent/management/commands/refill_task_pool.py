@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from agent.ai_core import LearnEarnAIAgent
+from agent.task_pool import refill_task_pool
+
+
+class Command(BaseCommand):
+    help = "Keep pre-generated task pool buckets above their low-water marks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Seconds between passes; 0 runs a single pass",
+        )
+
+    def handle(self, *args, **options):
+        agent = LearnEarnAIAgent()
+        while True:
+            created = refill_task_pool(agent)
+            self.stdout.write(f"Refilled task pool: {created} tasks created")
+            if not options["interval"]:
+                break
+            close_old_connections()
+            time.sleep(options["interval"])
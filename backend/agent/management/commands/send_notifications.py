@@ -0,0 +1,22 @@
+import asyncio
+from django.core.management.base import BaseCommand
+from agent.notifications import BATCH_LIMIT, run_worker
+
+
+class Command(BaseCommand):
+    help = "Send queued Telegram notifications within Telegram's rate limits"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Seconds between polls of an empty queue; 0 drains it once",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=BATCH_LIMIT, help="Messages per batch"
+        )
+
+    def handle(self, *args, **options):
+        sent = asyncio.run(run_worker(options["interval"], options["limit"]))
+        self.stdout.write(f"Sent {sent} notifications")
@@ -0,0 +1,34 @@
+import csv
+import json
+from django.core.management.base import BaseCommand
+from agent.bulk_verify import pending_quest_proofs, verify_proofs_bulk
+
+
+class Command(BaseCommand):
+    help = "Verify transaction proofs in bulk with batched JSON-RPC lookups"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--quest", type=int, required=True, help="Quest whose proofs to verify"
+        )
+        parser.add_argument(
+            "--file",
+            help="CSV of user_task_id,transaction_hash rows to verify instead of "
+            "the proofs submitted so far",
+        )
+        parser.add_argument("--chain", default="gnosis")
+
+    def handle(self, *args, **options):
+        if options["file"]:
+            with open(options["file"], newline="") as f:
+                proofs = [(int(row[0]), row[1].strip()) for row in csv.reader(f) if row]
+        else:
+            proofs = pending_quest_proofs(options["quest"])
+
+        verified = 0
+        for result in verify_proofs_bulk(
+            options["quest"], proofs, chain=options["chain"]
+        ):
+            verified += result["verified"]
+            self.stdout.write(json.dumps(result))
+        self.stderr.write(f"{verified}/{len(proofs)} proofs verified")
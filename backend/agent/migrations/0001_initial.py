@@ -0,0 +1,178 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Task",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("title", models.CharField(max_length=200)),
+                ("description", models.TextField()),
+                (
+                    "task_type",
+                    models.CharField(
+                        choices=[
+                            ("learning", "Learning"),
+                            ("practice", "Practice"),
+                            ("quest", "Quest"),
+                            ("advanced", "Advanced"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("xp_reward", models.IntegerField(default=0)),
+                ("token_reward", models.IntegerField(default=0)),
+                ("nft_reward", models.BooleanField(default=False)),
+                ("min_level", models.IntegerField(default=1)),
+                ("verification_type", models.CharField(max_length=50)),
+                ("verification_data", models.JSONField(default=dict)),
+                ("project", models.CharField(blank=True, max_length=100, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("supported_chains", models.JSONField(default=list)),
+                ("chain_specific_data", models.JSONField(default=dict)),
+                (
+                    "olas_service_id",
+                    models.CharField(blank=True, max_length=64, null=True),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="User",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("telegram_id", models.CharField(max_length=50, unique=True)),
+                ("wallet_addresses", models.JSONField(default=dict)),
+                ("preferred_chain", models.CharField(default="gnosis", max_length=20)),
+                ("xp_points", models.IntegerField(default=0)),
+                ("level", models.IntegerField(default=1)),
+                ("interests", models.JSONField(default=dict)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="LearningPath",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("topic", models.CharField(max_length=100)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("active", "Active"),
+                            ("completed", "Completed"),
+                            ("paused", "Paused"),
+                        ],
+                        default="active",
+                        max_length=20,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="learning_paths",
+                        to="agent.user",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="UserTask",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("active", "Active"),
+                            ("completed", "Completed"),
+                            ("verified", "Verified"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                ("verification_data", models.JSONField(default=dict)),
+                (
+                    "reward_chain",
+                    models.CharField(blank=True, max_length=20, null=True),
+                ),
+                (
+                    "reward_tx_hash",
+                    models.CharField(blank=True, max_length=66, null=True),
+                ),
+                ("verified_by_olas", models.BooleanField(default=False)),
+                (
+                    "learning_path",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="agent.learningpath",
+                    ),
+                ),
+                (
+                    "task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="agent.task"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="user_tasks",
+                        to="agent.user",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agent", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskContent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.IntegerField(default=1)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("generating", "Generating"),
+                            ("ready", "Ready"),
+                            ("stale", "Stale"),
+                        ],
+                        default="generating",
+                        max_length=20,
+                    ),
+                ),
+                ("lesson", models.TextField(blank=True)),
+                ("quiz", models.JSONField(default=list)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "task",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="content",
+                        to="agent.task",
+                    ),
+                ),
+            ],
+        ),
+    ]
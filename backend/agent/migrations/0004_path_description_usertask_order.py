@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agent", "0003_pathjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="learningpath",
+            name="description",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="usertask",
+            name="order",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
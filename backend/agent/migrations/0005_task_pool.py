@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agent", "0004_path_description_usertask_order"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskPoolDemand",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.CharField(max_length=40, unique=True)),
+                ("topic", models.CharField(max_length=100)),
+                ("level", models.IntegerField()),
+                (
+                    "task_type",
+                    models.CharField(
+                        choices=[
+                            ("learning", "Learning"),
+                            ("practice", "Practice"),
+                            ("quest", "Quest"),
+                            ("advanced", "Advanced"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("difficulty", models.CharField(blank=True, max_length=20)),
+                ("recent_requests", models.IntegerField(default=0)),
+                ("total_requests", models.IntegerField(default=0)),
+                ("last_requested_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="TaskPoolEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.CharField(db_index=True, max_length=40)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "task",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pool_entry",
+                        to="agent.task",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agent", "0006_rewardpayout"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VerifiedTransaction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("tx_hash", models.CharField(max_length=66, unique=True)),
+                ("chain", models.CharField(max_length=20)),
+                ("from_address", models.CharField(max_length=42)),
+                ("to_address", models.CharField(blank=True, max_length=42, null=True)),
+                ("status", models.IntegerField()),
+                ("block_number", models.BigIntegerField()),
+                ("is_final", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user_task",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="proof_transactions",
+                        to="agent.usertask",
+                    ),
+                ),
+            ],
+        ),
+    ]
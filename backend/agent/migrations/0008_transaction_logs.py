@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agent", "0007_verifiedtransaction"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="verifiedtransaction",
+            name="logs",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="verifiedtransaction",
+            name="selector",
+            field=models.CharField(blank=True, max_length=10),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:04
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_progress(apps, schema_editor):
+    LearningPath = apps.get_model("agent", "LearningPath")
+    UserTask = apps.get_model("agent", "UserTask")
+    path_tasks = (
+        UserTask.objects.filter(learning_path=OuterRef("pk"))
+        .order_by()
+        .values("learning_path")
+    )
+    LearningPath.objects.update(
+        task_count=Coalesce(
+            Subquery(path_tasks.annotate(n=Count("id")).values("n")), 0
+        ),
+        completed_task_count=Coalesce(
+            Subquery(
+                path_tasks.annotate(
+                    n=Count("id", filter=Q(status__in=["completed", "verified"]))
+                ).values("n")
+            ),
+            0,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agent", "0009_chaincheckpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="learningpath",
+            name="completed_task_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="learningpath",
+            name="task_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_progress, migrations.RunPython.noop),
+    ]
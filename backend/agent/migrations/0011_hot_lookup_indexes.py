@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agent", "0010_path_progress_counters"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["task_type", "min_level", "created_at"],
+                name="task_type_level_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="usertask",
+            index=models.Index(
+                fields=["user", "status"], name="usertask_user_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="usertask",
+            index=models.Index(
+                fields=["learning_path", "status"], name="usertask_path_status_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:10
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agent", "0012_xpledgerentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClaimBatch",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("wallet_address", models.CharField(max_length=42)),
+                ("chain", models.CharField(default="gnosis", max_length=20)),
+                (
+                    "amount",
+                    models.DecimalField(decimal_places=18, default=0, max_digits=36),
+                ),
+                ("task_count", models.PositiveIntegerField(default=0)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("sending", "Sending"),
+                            ("sent", "Sent"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("tx_hash", models.CharField(blank=True, max_length=66, null=True)),
+                ("attempts", models.IntegerField(default=0)),
+                ("error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="claims",
+                        to="agent.user",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="usertask",
+            name="claim_batch",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="user_tasks",
+                to="agent.claimbatch",
+            ),
+        ),
+    ]
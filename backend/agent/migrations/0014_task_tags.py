@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agent", "0013_claimbatch"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="tags",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
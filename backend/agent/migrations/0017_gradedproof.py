@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agent", "0016_gradingrequest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="gradingrequest",
+            name="content_hash",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.CreateModel(
+            name="GradedProof",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("content_hash", models.CharField(max_length=64)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("social_proof", "Social proof"),
+                            ("submission", "Submission"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("grade", models.JSONField(default=dict)),
+                ("hits", models.IntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "first_user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="agent.user"
+                    ),
+                ),
+                (
+                    "first_user_task",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="agent.usertask",
+                    ),
+                ),
+                (
+                    "task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="graded_proofs",
+                        to="agent.task",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("task", "content_hash"),
+                        name="graded_proof_task_hash_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agent", "0017_gradedproof"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="verifiedtransaction",
+            name="tx_hash",
+            field=models.CharField(max_length=66),
+        ),
+        migrations.AddConstraint(
+            model_name="verifiedtransaction",
+            constraint=models.UniqueConstraint(
+                fields=("chain", "tx_hash"), name="verified_tx_chain_hash_uniq"
+            ),
+        ),
+    ]
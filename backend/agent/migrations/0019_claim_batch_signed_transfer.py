@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agent", "0018_verified_transaction_chain_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="claimbatch",
+            name="raw_tx",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="claimbatch",
+            name="sending_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agent", "0021_badge_mint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="rewardpayout",
+            name="sending_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,6 @@
+import uuid
 from django.db import models
+from django.utils import timezone
 
 
 class User(models.Model):
@@ -26,6 +28,7 @@ class LearningPath(models.Model):
         User, on_delete=models.CASCADE, related_name="learning_paths"
     )
     topic = models.CharField(max_length=100)
+    description = models.TextField(blank=True)
     status = models.CharField(
         max_length=20,
         choices=[
@@ -35,6 +38,9 @@ class LearningPath(models.Model):
         ],
         default="active",
     )
+    # Denormalized progress, kept current by agent.progress
+    task_count = models.PositiveIntegerField(default=0)
+    completed_task_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -73,8 +79,18 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     supported_chains = models.JSONField(default=list)  # ['gnosis', 'rootstock']
     chain_specific_data = models.JSONField(default=dict)
+    tags = models.JSONField(default=list, blank=True)  # ['defi', 'nft']
     olas_service_id = models.CharField(max_length=64, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Level-appropriate tasks of a type, newest first
+            models.Index(
+                fields=["task_type", "min_level", "created_at"],
+                name="task_type_level_created_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.title} ({self.task_type})"
 
@@ -87,13 +103,370 @@ class UserTask(models.Model):
     learning_path = models.ForeignKey(
         LearningPath, on_delete=models.CASCADE, null=True, blank=True
     )
+    order = models.PositiveIntegerField(default=0)  # Position within the path
     status = models.CharField(max_length=20, choices=Task.STATUS, default="pending")
     started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     verification_data = models.JSONField(default=dict)
     reward_chain = models.CharField(max_length=20, null=True, blank=True)
     reward_tx_hash = models.CharField(max_length=66, null=True, blank=True)
+    # Set when the reward is paid through claim_tokens
+    claim_batch = models.ForeignKey(
+        "ClaimBatch",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="user_tasks",
+    )
     verified_by_olas = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "status"], name="usertask_user_status_idx"),
+            models.Index(
+                fields=["learning_path", "status"], name="usertask_path_status_idx"
+            ),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.task}"
+
+
+class TaskContent(models.Model):
+    """Generated lesson and quiz content for a learning task"""
+
+    STATUS = [
+        ("generating", "Generating"),
+        ("ready", "Ready"),
+        ("stale", "Stale"),
+    ]
+
+    task = models.OneToOneField(Task, on_delete=models.CASCADE, related_name="content")
+    version = models.IntegerField(default=1)
+    status = models.CharField(max_length=20, choices=STATUS, default="generating")
+    lesson = models.TextField(blank=True)
+    quiz = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.task} content v{self.version} ({self.status})"
+
+
+class PathJob(models.Model):
+    """Background job that generates a learning path"""
+
+    STATUS = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="path_jobs")
+    topic = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS, default="queued")
+    learning_path = models.ForeignKey(
+        LearningPath, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Path job {self.id} ({self.status})"
+
+
+class TaskPoolEntry(models.Model):
+    """Pre-generated task waiting in a (topic, level, task_type) bucket"""
+
+    task = models.OneToOneField(
+        Task, on_delete=models.CASCADE, related_name="pool_entry"
+    )
+    bucket = models.CharField(max_length=40, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Pooled {self.task} [{self.bucket[:8]}]"
+
+
+class TaskPoolDemand(models.Model):
+    """Observed demand for a task pool bucket, used to size refills"""
+
+    bucket = models.CharField(max_length=40, unique=True)
+    topic = models.CharField(max_length=100)
+    level = models.IntegerField()
+    task_type = models.CharField(max_length=20, choices=Task.TYPES)
+    difficulty = models.CharField(max_length=20, blank=True)
+    recent_requests = models.IntegerField(default=0)  # Decays on each refill
+    total_requests = models.IntegerField(default=0)
+    last_requested_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.topic} L{self.level} {self.task_type} demand"
+
+
+class RewardPayout(models.Model):
+    """Token reward queued for a batched on-chain transfer"""
+
+    STATUS = [
+        ("queued", "Queued"),
+        ("sending", "Sending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="payouts")
+    user_task = models.ForeignKey(
+        UserTask, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    wallet_address = models.CharField(max_length=42)
+    chain = models.CharField(max_length=20, default="gnosis")
+    amount = models.DecimalField(max_digits=36, decimal_places=18)
+    status = models.CharField(max_length=20, choices=STATUS, default="queued")
+    batch_id = models.UUIDField(null=True, blank=True)
+    tx_hash = models.CharField(max_length=66, null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sending_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.amount} to {self.wallet_address} on {self.chain} ({self.status})"
+
+
+class ClaimBatch(models.Model):
+    """One claim_tokens payout covering every reward pending at claim time
+
+    The id doubles as the idempotency key: a claim is sent at most once, and
+    retrying it returns the original transfer. The signed transfer is stored
+    before it is broadcast, so a retry re-sends the same transaction.
+    """
+
+    STATUS = [
+        ("pending", "Pending"),
+        ("sending", "Sending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="claims")
+    wallet_address = models.CharField(max_length=42)
+    chain = models.CharField(max_length=20, default="gnosis")
+    amount = models.DecimalField(max_digits=36, decimal_places=18, default=0)
+    task_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS, default="pending")
+    tx_hash = models.CharField(max_length=66, null=True, blank=True)
+    raw_tx = models.TextField(blank=True)  # Signed transfer, set before sending
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sending_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Claim {self.id} of {self.amount} by {self.user} ({self.status})"
+
+
+class BadgeMint(models.Model):
+    """NFT badge minted for a user reaching a level, at most once per level
+
+    Sent like a ClaimBatch: the signed mint is stored before it is broadcast,
+    and a retry re-sends that same transaction.
+    """
+
+    STATUS = ClaimBatch.STATUS
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="badges")
+    level = models.IntegerField()
+    wallet_address = models.CharField(max_length=42)
+    chain = models.CharField(max_length=20, default="gnosis")
+    token_uri = models.CharField(max_length=200)
+    status = models.CharField(max_length=20, choices=STATUS, default="pending")
+    tx_hash = models.CharField(max_length=66, null=True, blank=True)
+    raw_tx = models.TextField(blank=True)  # Signed mint, set before sending
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sending_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "level"], name="badge_mint_user_level_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Level {self.level} badge for {self.user} ({self.status})"
+
+
+class VerifiedTransaction(models.Model):
+    """On-chain transaction indexed while verifying a proof"""
+
+    tx_hash = models.CharField(max_length=66)
+    chain = models.CharField(max_length=20)
+    from_address = models.CharField(max_length=42)
+    to_address = models.CharField(max_length=42, null=True, blank=True)
+    status = models.IntegerField()  # Receipt status, 1 = success
+    block_number = models.BigIntegerField()
+    selector = models.CharField(max_length=10, blank=True)  # Calldata selector
+    # Receipt logs as {address, topics, data}; None for rows indexed before
+    # logs were stored, which are refetched on next lookup
+    logs = models.JSONField(null=True, blank=True)
+    is_final = models.BooleanField(default=False)  # Confirmation depth reached
+    user_task = models.ForeignKey(
+        UserTask,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="proof_transactions",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # The same hash on another chain is a different transaction
+            models.UniqueConstraint(
+                fields=["chain", "tx_hash"], name="verified_tx_chain_hash_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tx_hash} on {self.chain}"
+
+
+class ChainCheckpoint(models.Model):
+    """Last block the chain indexer has fully processed"""
+
+    chain = models.CharField(max_length=20, unique=True)
+    block_number = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.chain} at block {self.block_number}"
+
+
+class XPLedgerEntry(models.Model):
+    """Append-only record of every XP change"""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="xp_ledger")
+    user_task = models.ForeignKey(
+        UserTask, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    amount = models.IntegerField()
+    reason = models.CharField(max_length=50)  # Verification type or source
+    balance = models.IntegerField()  # User's XP after this entry
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.amount:+d} XP to {self.user} ({self.reason})"
+
+
+class Notification(models.Model):
+    """Telegram message queued for the rate-limited notification worker"""
+
+    STATUS = [
+        ("queued", "Queued"),
+        ("sending", "Sending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    chat_id = models.CharField(max_length=50)
+    text = models.TextField()
+    parse_mode = models.CharField(max_length=20, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS, default="queued")
+    batch_id = models.UUIDField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's due-message scan
+            models.Index(
+                fields=["status", "next_attempt_at"],
+                name="notification_status_due_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Notification to {self.chat_id} ({self.status})"
+
+
+class GradingRequest(models.Model):
+    """Social proof or submission awaiting review by the grading worker"""
+
+    KINDS = [
+        ("social_proof", "Social proof"),
+        ("submission", "Submission"),
+    ]
+
+    STATUS = [
+        ("queued", "Queued"),
+        ("grading", "Grading"),
+        ("graded", "Graded"),
+        ("failed", "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user_task = models.ForeignKey(
+        UserTask, on_delete=models.CASCADE, related_name="grading_requests"
+    )
+    kind = models.CharField(max_length=20, choices=KINDS)
+    proof = models.JSONField(default=dict)  # {"proof_link"} or {"submission"}
+    content_hash = models.CharField(max_length=64, blank=True)  # Normalized proof
+    status = models.CharField(max_length=20, choices=STATUS, default="queued")
+    batch_id = models.UUIDField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    result = models.JSONField(default=dict)  # {"passed", "score", "feedback"}
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)  # Last worker claim
+    graded_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "created_at"], name="grading_status_created_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Grading of {self.user_task} ({self.status})"
+
+
+class GradedProof(models.Model):
+    """Grade of a normalized proof for a task, reused for identical proofs"""
+
+    task = models.ForeignKey(
+        Task, on_delete=models.CASCADE, related_name="graded_proofs"
+    )
+    content_hash = models.CharField(max_length=64)
+    kind = models.CharField(max_length=20, choices=GradingRequest.KINDS)
+    grade = models.JSONField(default=dict)  # {"passed", "score", "feedback"}
+    # First submitter, so the same proof from someone else is flagged
+    first_user = models.ForeignKey(User, on_delete=models.CASCADE)
+    first_user_task = models.ForeignKey(
+        UserTask, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    hits = models.IntegerField(default=0)  # Grades served without a model call
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["task", "content_hash"], name="graded_proof_task_hash_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Graded proof {self.content_hash[:8]} for {self.task}"
@@ -0,0 +1,221 @@
+import time
+import uuid
+import asyncio
+import logging
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from telegram import Bot
+from telegram.error import RetryAfter
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = getattr(settings, "NOTIFICATION_MAX_ATTEMPTS", 5)
+BATCH_LIMIT = getattr(settings, "NOTIFICATION_BATCH_LIMIT", 100)
+# Seconds a claimed batch may stay "sending" before another worker retakes it
+SEND_TIMEOUT = getattr(settings, "NOTIFICATION_SEND_TIMEOUT", 300)
+# Telegram allows about 30 messages a second overall and one per chat
+GLOBAL_RATE = getattr(settings, "TELEGRAM_GLOBAL_RATE", 30)
+CHAT_RATE = getattr(settings, "TELEGRAM_CHAT_RATE", 1)
+MAX_CHAT_BUCKETS = 10000
+
+
+def enqueue_notification(chat_id, text, parse_mode="Markdown"):
+    """Queue a message for the notification worker; never blocks on Telegram"""
+    # Skip if in testing or no token
+    if not settings.TELEGRAM_BOT_TOKEN or getattr(settings, "TESTING", False):
+        return None
+    if not chat_id or not text:
+        logger.warning("Invalid notification parameters")
+        return None
+    return Notification.objects.create(
+        chat_id=str(chat_id), text=text, parse_mode=parse_mode
+    )
+
+
+def notify_new_task(user_telegram_id, task):
+    """Queue the "new task available" message for a user"""
+    return enqueue_notification(
+        user_telegram_id,
+        f"🎯 *New Task Available!*\n\n"
+        f"**{task.title}**\n"
+        f"📍 {task.description[:100]}...\n\n"
+        f"🏆 Reward: {task.xp_reward} XP"
+        f"{f' + {task.token_reward} LEARN' if task.token_reward else ''}\n"
+        f"🔗 [Open in App]({settings.WEBAPP_URL}/task/{task.id})",
+    )
+
+
+def notify_path_ready(user_telegram_id, learning_path, tasks):
+    """Queue the "path is ready" message listing the path's tasks"""
+    task_lines = "\n".join(f"• {t['title']}" for t in tasks)
+    return enqueue_notification(
+        user_telegram_id,
+        f"🧭 Your {learning_path.topic} path is ready!\n"
+        f"{task_lines}\n"
+        f"[Open Path]({settings.WEBAPP_URL}/path/{learning_path.id})",
+    )
+
+
+class TokenBucket:
+    """Token bucket for one event loop; ``reserve`` returns the wait needed
+
+    Tokens are reserved ahead, so callers that go negative queue up behind
+    each other in call order.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+
+class RateLimiter:
+    """Global and per-chat token buckets in front of every send"""
+
+    def __init__(self, global_rate=GLOBAL_RATE, chat_rate=CHAT_RATE):
+        self.chat_rate = chat_rate
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_buckets = {}
+
+    def reserve(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= MAX_CHAT_BUCKETS:
+                # Idle buckets are full anyway; dropping them loses nothing
+                self.chat_buckets.clear()
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, 1)
+        return max(bucket.reserve(), self.global_bucket.reserve())
+
+    async def acquire(self, chat_id):
+        delay = self.reserve(chat_id)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+_bot = None
+
+
+def get_bot():
+    """Process-wide async bot client; initialized by the worker's event loop"""
+    global _bot
+    if _bot is None and settings.TELEGRAM_BOT_TOKEN:
+        _bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
+    return _bot
+
+
+def _claim_batch(limit):
+    """Move due queued messages to "sending" under a fresh batch id
+
+    A claim holds its rows for SEND_TIMEOUT: next_attempt_at is pushed out
+    that far, so rows left "sending" by a worker that died come due again.
+    """
+    now = timezone.now()
+    due = Notification.objects.filter(
+        status__in=("queued", "sending"), next_attempt_at__lte=now
+    )
+    ids = list(
+        due.order_by("next_attempt_at", "id").values_list("id", flat=True)[:limit]
+    )
+    if not ids:
+        return []
+    # The batch id keeps concurrent workers from sending the same row
+    batch_id = uuid.uuid4()
+    due.filter(id__in=ids).update(
+        status="sending",
+        batch_id=batch_id,
+        attempts=F("attempts") + 1,
+        next_attempt_at=now + timedelta(seconds=SEND_TIMEOUT),
+    )
+    return list(Notification.objects.filter(batch_id=batch_id).order_by("id"))
+
+
+def _record_results(results):
+    """Write sent rows in one UPDATE and reschedule the rest with backoff"""
+    now = timezone.now()
+    sent = [notification.id for notification, error, _ in results if error is None]
+    Notification.objects.filter(id__in=sent).update(status="sent", sent_at=now)
+    for notification, error, retry_after in results:
+        if error is None:
+            continue
+        rows = Notification.objects.filter(id=notification.id)
+        if retry_after is not None:
+            # Rate limited: try again when Telegram says, without a strike
+            rows.update(
+                status="queued",
+                attempts=F("attempts") - 1,
+                next_attempt_at=now + timedelta(seconds=retry_after),
+                error=error,
+            )
+        elif notification.attempts >= MAX_ATTEMPTS:
+            rows.update(status="failed", error=error)
+        else:
+            rows.update(
+                status="queued",
+                next_attempt_at=now + timedelta(seconds=2**notification.attempts),
+                error=error,
+            )
+    return len(sent)
+
+
+async def _send(bot, limiter, notification):
+    await limiter.acquire(notification.chat_id)
+    try:
+        await bot.send_message(
+            chat_id=notification.chat_id,
+            text=notification.text,
+            parse_mode=notification.parse_mode or None,
+            disable_web_page_preview=True,
+        )
+        return notification, None, None
+    except RetryAfter as e:
+        retry_after = e.retry_after
+        if isinstance(retry_after, timedelta):
+            retry_after = retry_after.total_seconds()
+        return notification, str(e), retry_after
+    except Exception as e:
+        logger.error(f"Telegram notification {notification.id} failed: {e}")
+        return notification, str(e), None
+
+
+async def flush_notifications(bot, limiter, limit=BATCH_LIMIT):
+    """Send one batch of due messages; returns (claimed, sent)"""
+    notifications = await sync_to_async(_claim_batch)(limit)
+    if not notifications:
+        return 0, 0
+    results = await asyncio.gather(
+        *(_send(bot, limiter, notification) for notification in notifications)
+    )
+    sent = await sync_to_async(_record_results)(results)
+    return len(notifications), sent
+
+
+async def run_worker(interval=0, limit=BATCH_LIMIT, bot=None):
+    """Drain the queue; with an interval, keep polling for new messages"""
+    bot = bot or get_bot()
+    if bot is None:
+        raise RuntimeError("TELEGRAM_BOT_TOKEN is not configured")
+    limiter = RateLimiter()
+    total = 0
+    async with bot:
+        while True:
+            claimed, sent = await flush_notifications(bot, limiter, limit)
+            total += sent
+            if claimed:
+                continue
+            if not interval:
+                return total
+            await sync_to_async(close_old_connections)()
+            await asyncio.sleep(interval)
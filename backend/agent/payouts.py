@@ -0,0 +1,91 @@
+import uuid
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Count, F, Min, Sum
+from django.utils import timezone
+from web3 import Web3
+from .blockchain import send_token_batch
+from .models import RewardPayout
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = getattr(settings, "PAYOUT_MAX_ATTEMPTS", 5)
+BATCH_LIMIT = getattr(settings, "PAYOUT_BATCH_LIMIT", 500)
+# Seconds after which a batch still "sending" is reported for reconciliation
+SEND_TIMEOUT = getattr(settings, "PAYOUT_SEND_TIMEOUT", 600)
+
+
+def queue_token_reward(user, wallet_address, amount, chain="gnosis", user_task=None):
+    """Queue a token reward for the next batched payout on its chain"""
+    return RewardPayout.objects.create(
+        user=user,
+        user_task=user_task,
+        wallet_address=Web3.to_checksum_address(wallet_address),
+        chain=chain,
+        amount=amount,
+    )
+
+
+def flush_payouts(chain="gnosis", chain_provider=None, limit=BATCH_LIMIT):
+    """Send queued payouts for a chain as batched transfers"""
+    ids = list(
+        RewardPayout.objects.filter(chain=chain, status="queued")
+        .order_by("id")
+        .values_list("id", flat=True)[:limit]
+    )
+    if not ids:
+        return {"success": True, "payouts": 0, "tx_hashes": []}
+
+    # Claim the rows under a batch id so concurrent flushers never overlap
+    batch_id = uuid.uuid4()
+    RewardPayout.objects.filter(id__in=ids, status="queued").update(
+        status="sending",
+        batch_id=batch_id,
+        sending_at=timezone.now(),
+        attempts=F("attempts") + 1,
+    )
+    payouts = RewardPayout.objects.filter(batch_id=batch_id)
+
+    # Several rewards for the same wallet go out as one transfer
+    transfers = [
+        (row["wallet_address"], row["total"])
+        for row in payouts.values("wallet_address")
+        .annotate(total=Sum("amount"))
+        .order_by("wallet_address")
+    ]
+
+    tx_hashes = []
+    try:
+        for tx_hash, sent in send_token_batch(transfers, chain, chain_provider):
+            payouts.filter(wallet_address__in=[wallet for wallet, _ in sent]).update(
+                status="sent", tx_hash=tx_hash, sent_at=timezone.now()
+            )
+            tx_hashes.append(tx_hash)
+    except Exception as e:
+        logger.error(f"Payout batch {batch_id} on {chain} failed: {e}")
+        # Only rows whose transaction was never sent go back on the queue
+        unsent = payouts.filter(status="sending")
+        unsent.filter(attempts__gte=MAX_ATTEMPTS).update(status="failed", error=str(e))
+        unsent.update(status="queued", batch_id=None, sending_at=None, error=str(e))
+        return {"success": False, "error": str(e), "tx_hashes": tx_hashes}
+
+    logger.info(f"Sent {len(ids)} payouts on {chain} in {len(tx_hashes)} txs")
+    return {"success": True, "payouts": len(ids), "tx_hashes": tx_hashes}
+
+
+def stale_batches(chain="gnosis"):
+    """Batches left "sending" past SEND_TIMEOUT, oldest first
+
+    A flusher that died mid-batch may or may not have broadcast its transfers,
+    so these are only reported: requeueing them blindly could pay twice.
+    """
+    cutoff = timezone.now() - timedelta(seconds=SEND_TIMEOUT)
+    return list(
+        RewardPayout.objects.filter(
+            chain=chain, status="sending", sending_at__lt=cutoff
+        )
+        .values("batch_id")
+        .annotate(payouts=Count("id"), since=Min("sending_at"))
+        .order_by("since")
+    )
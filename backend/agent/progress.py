@@ -0,0 +1,57 @@
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from .models import LearningPath, UserTask
+
+COMPLETED_STATUSES = ("completed", "verified")
+
+
+def refresh_path_progress(path_ids):
+    """Recount total and finished tasks of learning paths in one UPDATE"""
+    path_ids = {path_id for path_id in path_ids if path_id}
+    if not path_ids:
+        return
+    path_tasks = (
+        UserTask.objects.filter(learning_path=OuterRef("pk"))
+        .order_by()
+        .values("learning_path")
+    )
+    LearningPath.objects.filter(id__in=path_ids).update(
+        task_count=Coalesce(
+            Subquery(path_tasks.annotate(n=Count("id")).values("n")), 0
+        ),
+        completed_task_count=Coalesce(
+            Subquery(
+                path_tasks.annotate(
+                    n=Count("id", filter=Q(status__in=COMPLETED_STATUSES))
+                ).values("n")
+            ),
+            0,
+        ),
+    )
+
+
+# Saves through the ORM keep counters current; bulk writes call
+# refresh_path_progress themselves
+
+
+@receiver(post_init, sender=UserTask)
+def _remember_status(sender, instance, **kwargs):
+    # Read from __dict__ so deferred fields are not loaded
+    instance._saved_status = instance.__dict__.get("status")
+
+
+@receiver(post_save, sender=UserTask)
+def _track_status_change(sender, instance, created, update_fields, **kwargs):
+    if update_fields is not None and "status" not in update_fields:
+        return
+    status = instance.__dict__.get("status")
+    if instance.learning_path_id and (created or status != instance._saved_status):
+        refresh_path_progress([instance.learning_path_id])
+    instance._saved_status = status
+
+
+@receiver(post_delete, sender=UserTask)
+def _track_removal(sender, instance, **kwargs):
+    refresh_path_progress([instance.learning_path_id])
@@ -0,0 +1,90 @@
+import re
+import copy
+import time
+import random
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def task_fingerprint(topic, level, task_type, difficulty=None):
+    """Normalized key for the inputs a task generation prompt depends on"""
+    normalized_topic = re.sub(r"[^a-z0-9]+", " ", str(topic).lower()).strip()
+    raw = f"{normalized_topic}|{level}|{task_type}|{difficulty or ''}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class TaskTemplateCache:
+    """In-process LRU/TTL cache of generated task templates
+
+    Each key holds a pool of up to ``pool_size`` templates. While the pool is
+    filling every request is a miss and generates a new variant; once full,
+    requests are served a random template with no model call.
+    """
+
+    def __init__(self, max_keys=1024, ttl=6 * 60 * 60, pool_size=5):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self.pool_size = pool_size
+        self._entries = OrderedDict()  # key -> (created_at, [templates])
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_generate(self, key, generate):
+        """Return a cached template for key, or generate and store a new one"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry and len(entry[1]) >= self.pool_size:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(random.choice(entry[1]))
+            self.misses += 1
+
+        # Generate outside the lock so other keys are not blocked on the model
+        template = generate()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = (time.monotonic(), [])
+                self._entries[key] = entry
+            if len(entry[1]) < self.pool_size:
+                entry[1].append(copy.deepcopy(template))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return template
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "keys": len(self._entries),
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+task_template_cache = TaskTemplateCache(
+    max_keys=getattr(settings, "TASK_TEMPLATE_CACHE_KEYS", 1024),
+    ttl=getattr(settings, "TASK_TEMPLATE_CACHE_TTL", 6 * 60 * 60),
+    pool_size=getattr(settings, "TASK_TEMPLATE_POOL_SIZE", 5),
+)
@@ -0,0 +1,178 @@
+import re
+import logging
+import threading
+import numpy as np
+from .models import Task, UserTask
+from .view_cache import QUESTS, current_version
+
+logger = logging.getLogger(__name__)
+
+# Topic tags derived from quest and interest text when none are given
+TOPIC_KEYWORDS = {
+    "defi": ("defi", "dex", "swap", "liquidity", "lending", "yield", "amm"),
+    "staking": ("stake", "staking", "validator", "validators"),
+    "nft": ("nft", "nfts", "collectible", "collectibles", "erc721"),
+    "dao": ("dao", "daos", "governance", "vote", "voting", "proposal"),
+    "wallet": ("wallet", "wallets", "metamask", "seed", "safe"),
+    "bridge": ("bridge", "bridging", "crosschain", "cross-chain"),
+    "security": ("security", "scam", "scams", "phishing", "audit"),
+    "development": ("solidity", "contract", "contracts", "deploy", "developer"),
+    "basics": ("blockchain", "gas", "transaction", "transactions", "token"),
+    "ai": ("ai", "agent", "agents", "olas"),
+}
+
+_keyword_topics = {
+    keyword: topic for topic, keywords in TOPIC_KEYWORDS.items() for keyword in keywords
+}
+
+# Weights of the ranking terms; interest match dominates
+TOPIC_WEIGHT = 1.0
+LEVEL_WEIGHT = 0.3  # Prefer quests close to the user's level
+REWARD_WEIGHT = 0.2
+RECENCY_WEIGHT = 0.1
+LEVEL_SPAN = 5  # Levels below the user's at which the level term reaches 0
+
+
+def text_tags(*texts):
+    """Topic tags mentioned in free text"""
+    tags = set()
+    for text in texts:
+        for word in re.findall(r"[a-z0-9-]+", str(text or "").lower()):
+            topic = _keyword_topics.get(word)
+            if topic:
+                tags.add(topic)
+    return tags
+
+
+class QuestIndex:
+    """Quests as column arrays for vectorized top-k ranking
+
+    Built from one query over all quests; rows are in creation order, so the
+    recency term is the row position.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.ids = np.array([row["id"] for row in rows], dtype=np.int64)
+        self.min_levels = np.array([row["min_level"] for row in rows], dtype=np.int32)
+
+        quest_tags = [
+            {str(tag).lower() for tag in row["tags"] or ()}
+            | text_tags(row["title"], row["description"], row["project"])
+            for row in rows
+        ]
+        self.vocabulary = {
+            tag: i for i, tag in enumerate(sorted(set().union(*quest_tags)))
+        }
+        self.topics = np.zeros((len(rows), len(self.vocabulary)), dtype=np.float32)
+        for i, tags in enumerate(quest_tags):
+            for tag in tags:
+                self.topics[i, self.vocabulary[tag]] = 1.0
+        # Unit rows, so a dot product with a unit interest vector is a cosine
+        norms = np.linalg.norm(self.topics, axis=1, keepdims=True)
+        np.divide(self.topics, norms, out=self.topics, where=norms > 0)
+
+        # Quests without supported chains run on any chain
+        chains = sorted({c for row in rows for c in row["supported_chains"] or ()})
+        any_chain = np.array([not row["supported_chains"] for row in rows])
+        self.chain_masks = {
+            chain: any_chain
+            | np.array([chain in (row["supported_chains"] or ()) for row in rows])
+            for chain in chains
+        }
+        self.any_chain = any_chain
+
+        rewards = np.log1p(
+            np.array([max(row["token_reward"], 0) for row in rows], dtype=np.float32)
+        )
+        if len(rows) and rewards.max():
+            rewards /= rewards.max()
+        self.rewards = rewards
+        self.recency = np.arange(len(rows), dtype=np.float32) / max(len(rows) - 1, 1)
+
+    def interest_vector(self, interests):
+        """Unit vector over the tag vocabulary for a user's interests"""
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        words = {
+            word
+            for value in interests
+            for word in re.findall(r"[a-z0-9-]+", str(value).lower())
+        }
+        for tag in text_tags(*interests) | words:
+            if tag in self.vocabulary:
+                vector[self.vocabulary[tag]] = 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def top_k(self, level, chain, interests, taken, count):
+        """Row positions of the best ``count`` quests, best first"""
+        if not self.rows or count <= 0:
+            return []
+        mask = self.min_levels <= level
+        mask &= self.chain_masks.get(chain, self.any_chain)
+        if taken:
+            mask &= ~np.isin(self.ids, np.fromiter(taken, dtype=np.int64))
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return []
+
+        scores = (
+            TOPIC_WEIGHT * (self.topics[candidates] @ self.interest_vector(interests))
+            + LEVEL_WEIGHT
+            * np.clip(1 - (level - self.min_levels[candidates]) / LEVEL_SPAN, 0, 1)
+            + REWARD_WEIGHT * self.rewards[candidates]
+            + RECENCY_WEIGHT * self.recency[candidates]
+        )
+        if len(candidates) > count:
+            best = np.argpartition(-scores, count - 1)[:count]
+        else:
+            best = np.arange(len(candidates))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return candidates[best].tolist()
+
+
+_index = None  # (quest catalogue version, QuestIndex)
+_index_lock = threading.Lock()
+
+
+def get_quest_index():
+    """Process-wide quest index, rebuilt when the quest catalogue changes"""
+    global _index
+    version = current_version(QUESTS)
+    index = _index
+    if index and index[0] == version:
+        return index[1]
+    with _index_lock:
+        if _index and _index[0] == version:
+            return _index[1]
+        rows = list(
+            Task.objects.filter(task_type="quest")
+            .order_by("created_at", "id")
+            .values(
+                "id",
+                "title",
+                "description",
+                "project",
+                "tags",
+                "min_level",
+                "supported_chains",
+                "xp_reward",
+                "token_reward",
+                "nft_reward",
+            )
+        )
+        _index = (version, QuestIndex(rows))
+        logger.info(f"Built quest index over {len(rows)} quests")
+        return _index[1]
+
+
+def recommend_quests(user, count=3):
+    """Best quests for a user by interests, level, chain and reward
+
+    Quests the user already has, in any status, are excluded.
+    """
+    index = get_quest_index()
+    taken = set(UserTask.objects.filter(user=user).values_list("task_id", flat=True))
+    interests = [value for value in (user.interests or {}).values() if value]
+    positions = index.top_k(user.level, user.preferred_chain, interests, taken, count)
+    return [index.rows[i] for i in positions]
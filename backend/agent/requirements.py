@@ -0,0 +1,250 @@
+import re
+import json
+import logging
+import operator
+import threading
+from collections import OrderedDict
+from eth_abi import decode
+from eth_utils import keccak
+
+logger = logging.getLogger(__name__)
+
+MATCHER_CACHE_SIZE = 4096  # Compiled matchers kept per process
+
+OPERATORS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+}
+
+_PARAM_RE = re.compile(r"^\s*([\w\[\]]+)(\s+indexed)?(?:\s+(\w+))?\s*$")
+
+
+class RequirementError(ValueError):
+    """Raised when a task's requirements cannot be compiled"""
+
+
+def _canonical_type(abi_type):
+    if abi_type in ("uint", "int"):
+        return f"{abi_type}256"
+    if abi_type.startswith("tuple") or abi_type.startswith("("):
+        raise RequirementError("Tuple arguments are not supported")
+    return abi_type
+
+
+def _parse_event(event):
+    """(name, [(type, indexed, name)]) from a signature string or event ABI"""
+    if "abi" in event:
+        abi = event["abi"]
+        inputs = [
+            (_canonical_type(i["type"]), i.get("indexed", False), i.get("name") or "")
+            for i in abi.get("inputs", [])
+        ]
+        return abi["name"], inputs
+
+    match = re.match(r"^\s*(\w+)\s*\((.*)\)\s*$", event.get("signature", ""))
+    if not match:
+        raise RequirementError("Event needs a signature or an abi")
+    inputs = []
+    for position, param in enumerate(filter(None, match.group(2).split(","))):
+        parsed = _PARAM_RE.match(param)
+        if not parsed:
+            raise RequirementError(f"Cannot parse event parameter '{param.strip()}'")
+        abi_type, indexed, name = parsed.groups()
+        inputs.append((_canonical_type(abi_type), bool(indexed), name or str(position)))
+    return match.group(1), inputs
+
+
+def _normalize_value(abi_type, value):
+    """Bring an expected or decoded value to the form values are compared in"""
+    if abi_type == "address":
+        return str(value).lower()
+    if abi_type.startswith(("uint", "int")):
+        return int(value, 0) if isinstance(value, str) else int(value)
+    if abi_type == "bool":
+        return bool(value)
+    if isinstance(value, bytes):
+        return "0x" + value.hex()
+    if abi_type.startswith("bytes"):
+        return str(value).lower()
+    return value
+
+
+def _is_hashed(abi_type):
+    """Indexed dynamic values (string, bytes, arrays) are logged as their hash"""
+    return abi_type in ("string", "bytes") or abi_type.endswith("]")
+
+
+def _topic_value(abi_type, topic):
+    """Decode an indexed argument from its 32-byte topic"""
+    if abi_type == "address":
+        return "0x" + topic[-40:]
+    if abi_type.startswith("uint"):
+        return int(topic, 16)
+    if abi_type.startswith("int"):
+        value = int(topic, 16)
+        return value - (1 << 256) if value >> 255 else value
+    if abi_type == "bool":
+        return int(topic, 16) != 0
+    if abi_type.startswith("bytes") and not _is_hashed(abi_type):
+        # bytesN is left-aligned in its topic
+        return topic[: 2 + 2 * int(abi_type[5:])]
+    return topic
+
+
+def _topic_hash(abi_type, expected):
+    if abi_type == "string":
+        return "0x" + keccak(text=expected).hex()
+    return "0x" + keccak(hexstr=expected).hex()
+
+
+class EventMatcher:
+    """Matches receipt logs against one compiled event requirement"""
+
+    __slots__ = ("address", "topic0", "topic_checks", "data_types", "data_checks")
+
+    def __init__(self, event):
+        name, inputs = _parse_event(event)
+        signature = f"{name}({','.join(abi_type for abi_type, _, _ in inputs)})"
+        self.topic0 = "0x" + keccak(text=signature).hex()
+        self.address = event["address"].lower() if event.get("address") else None
+
+        positions = {}
+        topic_index = 1
+        self.data_types = []
+        for abi_type, indexed, arg_name in inputs:
+            if indexed:
+                positions[arg_name] = ("topic", topic_index, abi_type)
+                topic_index += 1
+            else:
+                positions[arg_name] = ("data", len(self.data_types), abi_type)
+                self.data_types.append(abi_type)
+
+        self.topic_checks = []
+        self.data_checks = []
+        for arg_name, conditions in event.get("args", {}).items():
+            if arg_name not in positions:
+                raise RequirementError(f"Event {name} has no argument '{arg_name}'")
+            source, index, abi_type = positions[arg_name]
+            if not isinstance(conditions, dict):
+                conditions = {"eq": conditions}
+            for op_name, expected in conditions.items():
+                if op_name not in OPERATORS:
+                    raise RequirementError(f"Unknown operator '{op_name}'")
+                expected = _normalize_value(abi_type, expected)
+                if source == "topic":
+                    if _is_hashed(abi_type):
+                        if op_name not in ("eq", "ne"):
+                            raise RequirementError(
+                                f"Only eq/ne apply to indexed '{arg_name}'"
+                            )
+                        expected = _topic_hash(abi_type, expected)
+                    self.topic_checks.append(
+                        (index, abi_type, OPERATORS[op_name], expected)
+                    )
+                else:
+                    self.data_checks.append(
+                        (index, abi_type, OPERATORS[op_name], expected)
+                    )
+
+    def matches(self, log):
+        topics = log["topics"]
+        if not topics or topics[0] != self.topic0:
+            return False
+        if self.address and log["address"] != self.address:
+            return False
+        for index, abi_type, op, expected in self.topic_checks:
+            if index >= len(topics):
+                return False
+            if not op(_topic_value(abi_type, topics[index]), expected):
+                return False
+        if self.data_checks:
+            try:
+                values = decode(self.data_types, bytes.fromhex(log["data"][2:]))
+            except Exception:
+                return False
+            for index, abi_type, op, expected in self.data_checks:
+                if not op(_normalize_value(abi_type, values[index]), expected):
+                    return False
+        return True
+
+
+class RequirementMatcher:
+    """A task's requirements compiled once for repeated evaluation
+
+    Supported requirements:
+      to_address: contract or wallet the transaction was sent to
+      selector: called function, as "0x12345678" or "transfer(address,uint256)"
+      events: logs that must appear in the receipt, each with a "signature"
+        such as "Swap(address indexed sender, uint256 amountIn)" or an
+        event "abi", an optional emitting "address" and optional "args"
+        conditions like {"amountIn": {"gte": "1000"}}
+    """
+
+    def __init__(self, requirements):
+        requirements = requirements or {}
+        to_address = requirements.get("to_address")
+        self.to_address = to_address.lower() if to_address else None
+
+        selector = requirements.get("selector")
+        if selector and "(" in selector:
+            selector = "0x" + keccak(text=selector.replace(" ", "")).hex()[:8]
+        if selector and not re.match(r"^0x[0-9a-fA-F]{8}$", selector):
+            raise RequirementError(f"Invalid function selector '{selector}'")
+        self.selector = selector.lower() if selector else None
+
+        events = requirements.get("events", [])
+        if "event" in requirements:
+            events = [requirements["event"], *events]
+        self.events = [EventMatcher(event) for event in events]
+
+    def check(self, tx):
+        """Reason an indexed transaction fails the requirements, or None"""
+        if tx.status != 1:
+            return "Transaction failed"
+        if self.to_address and (tx.to_address or "") != self.to_address:
+            return "Wrong recipient address"
+        if self.selector and tx.selector != self.selector:
+            return "Wrong contract function called"
+        for event in self.events:
+            if not any(event.matches(log) for log in tx.logs or ()):
+                return "Required event not found in transaction logs"
+        return None
+
+
+_matchers = OrderedDict()  # task id -> (requirements json, matcher)
+_matchers_lock = threading.Lock()
+
+
+def compile_requirements(requirements):
+    """Compile requirements into a matcher, raising RequirementError if invalid"""
+    if isinstance(requirements, RequirementMatcher):
+        return requirements
+    try:
+        return RequirementMatcher(requirements)
+    except RequirementError:
+        raise
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise RequirementError(f"Invalid requirements: {e}") from e
+
+
+def get_task_matcher(task):
+    """Compiled matcher for a task, recompiled only when its requirements change"""
+    requirements = (task.verification_data or {}).get("requirements", {})
+    key = json.dumps(requirements, sort_keys=True, default=str)
+    with _matchers_lock:
+        cached = _matchers.get(task.id)
+        if cached and cached[0] == key:
+            _matchers.move_to_end(task.id)
+            return cached[1]
+
+    matcher = compile_requirements(requirements)
+    with _matchers_lock:
+        _matchers[task.id] = (key, matcher)
+        _matchers.move_to_end(task.id)
+        while len(_matchers) > MATCHER_CACHE_SIZE:
+            _matchers.popitem(last=False)
+    return matcher
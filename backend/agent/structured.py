@@ -0,0 +1,297 @@
+import re
+import json
+from django.core.cache import cache
+
+
+class SchemaError(ValueError):
+    """Raised when model output does not match its response schema"""
+
+
+def _strict(properties):
+    """Object schema in the strict form structured outputs require"""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+FEEDBACK = {"type": "string"}
+SCORE = {"type": "integer", "minimum": 0, "maximum": 10}
+QUESTION = _strict(
+    {
+        "question": {"type": "string"},
+        "options": {
+            "type": "array",
+            "items": {"type": "string"},
+            "minItems": 2,
+            "maxItems": 6,
+        },
+        "correct_answer": {"type": "string"},
+    }
+)
+
+# Response schemas by name; the name is sent along with the schema
+SCHEMAS = {
+    "task": _strict(
+        {
+            "title": {"type": "string"},
+            "description": {"type": "string"},
+            "verification_type": {
+                "type": "string",
+                "enum": ["quiz", "transaction", "social_proof"],
+            },
+            "xp_reward": {"type": "integer", "minimum": 1},
+            "token_reward": {"type": "integer", "minimum": 0},
+        }
+    ),
+    "quiz": _strict({"questions": {"type": "array", "items": QUESTION, "minItems": 1}}),
+    "social_proof_grade": _strict({"valid": {"type": "boolean"}, "feedback": FEEDBACK}),
+    "submission_grade": _strict({"score": SCORE, "feedback": FEEDBACK}),
+    "social_proof_grades": _strict(
+        {
+            "results": {
+                "type": "array",
+                "items": _strict(
+                    {
+                        "id": {"type": "integer"},
+                        "valid": {"type": "boolean"},
+                        "feedback": FEEDBACK,
+                    }
+                ),
+            }
+        }
+    ),
+    "submission_grades": _strict(
+        {
+            "results": {
+                "type": "array",
+                "items": _strict(
+                    {"id": {"type": "integer"}, "score": SCORE, "feedback": FEEDBACK}
+                ),
+            }
+        }
+    ),
+}
+
+
+def response_format(name):
+    """OpenAI ``response_format`` asking for output matching a named schema"""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "schema": SCHEMAS[name], "strict": True},
+    }
+
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "null": type(None),
+}
+
+
+def _is_type(value, name):
+    if isinstance(value, bool) and name in ("integer", "number"):
+        return False
+    return isinstance(value, _TYPES[name])
+
+
+def validate(value, schema, path="$"):
+    """Check value against the subset of JSON Schema used in SCHEMAS"""
+    types = schema.get("type")
+    if types:
+        types = [types] if isinstance(types, str) else types
+        if not any(_is_type(value, name) for name in types):
+            raise SchemaError(f"{path}: expected {' or '.join(types)}")
+    if "enum" in schema and value not in schema["enum"]:
+        raise SchemaError(f"{path}: must be one of {schema['enum']}")
+    if "minimum" in schema and value < schema["minimum"]:
+        raise SchemaError(f"{path}: must be at least {schema['minimum']}")
+    if "maximum" in schema and value > schema["maximum"]:
+        raise SchemaError(f"{path}: must be at most {schema['maximum']}")
+
+    if isinstance(value, dict):
+        for key in schema.get("required", ()):
+            if key not in value:
+                raise SchemaError(f"{path}: missing {key!r}")
+        properties = schema.get("properties", {})
+        if schema.get("additionalProperties") is False:
+            extra = set(value) - set(properties)
+            if extra:
+                raise SchemaError(f"{path}: unexpected {sorted(extra)}")
+        for key, subschema in properties.items():
+            if key in value:
+                validate(value[key], subschema, f"{path}.{key}")
+    elif isinstance(value, list):
+        if len(value) < schema.get("minItems", 0):
+            raise SchemaError(f"{path}: needs at least {schema['minItems']} items")
+        if "maxItems" in schema and len(value) > schema["maxItems"]:
+            raise SchemaError(f"{path}: allows at most {schema['maxItems']} items")
+        if "items" in schema:
+            for i, item in enumerate(value):
+                validate(item, schema["items"], f"{path}[{i}]")
+    return value
+
+
+def check_quiz(quiz):
+    """Reject questions whose correct answer is not one of their options"""
+    for i, question in enumerate(quiz["questions"]):
+        if question["correct_answer"] not in question["options"]:
+            raise SchemaError(f"$.questions[{i}]: correct_answer is not an option")
+
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL)
+
+
+class JSONStreamParser:
+    """Tolerant JSON parser for model output that may arrive in chunks
+
+    ``feed`` returns the value parsed so far, closing any strings, objects
+    and arrays the text leaves open, so callers can use a partial reply
+    while it streams. Prose or code fences around the JSON, trailing
+    commas and a reply cut off mid-value are all tolerated.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._start = None  # Offset of the first "{" or "["
+
+    def feed(self, chunk):
+        self.text += chunk
+        return self.value()
+
+    def value(self):
+        """Best-effort parse of the text so far, None if there is no JSON yet"""
+        text = self.text
+        if "```" in text:
+            text = _FENCE.search(text).group(1)
+            self._start = None
+        if self._start is None:
+            starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+            if not starts:
+                return None
+            self._start = min(starts)
+        try:
+            return json.JSONDecoder().raw_decode(text, self._start)[0]
+        except json.JSONDecodeError:
+            pass
+        try:
+            return json.loads(_close(text[self._start :]))
+        except json.JSONDecodeError:
+            return None
+
+
+def _close(text):
+    """Close whatever a cut-off reply leaves open
+
+    Falls back to the longest prefix that ends on a complete value, so a
+    reply cut off mid-key or mid-literal loses only that member.
+    """
+    out = []
+    stack = []  # [closer, expecting_key] per open container
+    in_string = escaped = False
+    safe = ("", [])  # (text, closers) of the last complete prefix
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                if not (stack and stack[-1][1]):  # A value, not a key
+                    safe = ("".join(out), [closer for closer, _ in stack])
+            continue
+        if char == '"':
+            in_string = True
+        elif char == ":" and stack:
+            stack[-1][1] = False
+        elif char == ",":
+            safe = ("".join(out), [closer for closer, _ in stack])
+            if stack and stack[-1][0] == "}":
+                stack[-1][1] = True
+        elif char in "{[":
+            out.append(char)
+            stack.append(["}", True] if char == "{" else ["]", False])
+            safe = ("".join(out), [closer for closer, _ in stack])
+            continue
+        elif char in "}]":
+            while out and (out[-1].isspace() or out[-1] == ","):
+                out.pop()  # Trailing comma
+            if not stack:
+                break
+            out.append(stack.pop()[0])
+            safe = ("".join(out), [closer for closer, _ in stack])
+            if not stack:
+                break  # Anything after the outermost value is not JSON
+            continue
+        out.append(char)
+
+    closers = "".join(reversed([closer for closer, _ in stack]))
+    if in_string and not (stack and stack[-1][1]):
+        candidate = "".join(out[:-1] if escaped else out) + '"' + closers
+    else:
+        candidate = "".join(out).rstrip().rstrip(",") + closers
+    try:
+        json.loads(candidate)
+        return candidate
+    except json.JSONDecodeError:
+        return safe[0].rstrip().rstrip(",") + "".join(reversed(safe[1]))
+
+
+def parse_json(text):
+    """Parse a complete model reply tolerantly; raises SchemaError if no JSON"""
+    parser = JSONStreamParser()
+    value = parser.feed(text or "")
+    if value is None:
+        raise SchemaError("Reply contains no JSON")
+    return value
+
+
+OUTCOMES = ("clean", "repaired", "retried", "failed")
+
+
+def _stats_key(schema, outcome):
+    return f"structured_output:{schema}:{outcome}"
+
+
+def record_outcome(schema, outcome):
+    """Count how a structured reply was obtained
+
+    ``clean`` parsed as is, ``repaired`` needed the tolerant parser,
+    ``retried`` needed a repair call and ``failed`` never validated.
+    Counters live in the shared cache, so workers and web processes add up.
+    """
+    key = _stats_key(schema, outcome)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:  # Evicted between add and incr
+        cache.set(key, 1, None)
+
+
+def structured_output_stats():
+    """Outcome counts per schema and the overall failure rate"""
+    keys = {
+        _stats_key(schema, outcome): (schema, outcome)
+        for schema in SCHEMAS
+        for outcome in OUTCOMES
+    }
+    counts = cache.get_many(keys)
+    by_schema = {}
+    for key, count in counts.items():
+        schema, outcome = keys[key]
+        by_schema.setdefault(schema, dict.fromkeys(OUTCOMES, 0))[outcome] = count
+    replies = sum(counts.values())
+    failed = sum(outcomes["failed"] for outcomes in by_schema.values())
+    return {
+        "schemas": by_schema,
+        "replies": replies,
+        "failure_rate": round(failed / replies, 3) if replies else 0.0,
+    }
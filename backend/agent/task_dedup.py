@@ -0,0 +1,141 @@
+import re
+import logging
+import threading
+import numpy as np
+from django.conf import settings
+from .models import Task, UserTask
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = getattr(settings, "TASK_DEDUP_DIMENSIONS", 512)
+THRESHOLD = getattr(settings, "TASK_DEDUP_THRESHOLD", 0.9)  # Cosine similarity
+
+
+def embed(texts, dimensions=DIMENSIONS):
+    """Hashed character trigram vectors of texts as unit rows
+
+    Trigram hashes are computed with array arithmetic over the UTF-8 bytes,
+    so they are stable across processes, unlike hash().
+    """
+    vectors = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for row, text in enumerate(texts):
+        normalized = " ".join(re.findall(r"[a-z0-9]+", str(text).lower()))
+        codes = np.frombuffer(f" {normalized} ".encode("utf-8"), dtype=np.uint8)
+        codes = codes.astype(np.uint64)
+        if len(codes) < 3:
+            continue
+        trigrams = codes[:-2] * 65536 + codes[1:-1] * 256 + codes[2:]
+        buckets = ((trigrams * np.uint64(2654435761)) >> np.uint64(12)) % np.uint64(
+            dimensions
+        )
+        vectors[row] = np.bincount(buckets.astype(np.intp), minlength=dimensions)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def task_text(title, description):
+    return f"{title} {description}"
+
+
+class TaskEmbeddingIndex:
+    """Embeddings of AI-generated tasks, grouped by (task_type, min_level)
+
+    ``sync`` indexes tasks created by any process since the last lookup with
+    one query on the primary key. Vectors are stored as float16 to keep
+    large tables in memory.
+    """
+
+    def __init__(self, dimensions=DIMENSIONS):
+        self.dimensions = dimensions
+        self.max_id = 0
+        self._groups = {}  # (task_type, min_level) -> group code
+        self._size = 0
+        self._ids = np.zeros(1024, dtype=np.int64)
+        self._group_codes = np.zeros(1024, dtype=np.int32)
+        self._vectors = np.zeros((1024, dimensions), dtype=np.float16)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self, needed):
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self._ids = np.resize(self._ids, capacity)
+        self._group_codes = np.resize(self._group_codes, capacity)
+        vectors = np.zeros((capacity, self.dimensions), dtype=np.float16)
+        vectors[: self._size] = self._vectors[: self._size]
+        self._vectors = vectors
+
+    def add(self, rows):
+        """Index (id, task_type, min_level, title, description) rows"""
+        if not rows:
+            return
+        vectors = embed([task_text(row[3], row[4]) for row in rows], self.dimensions)
+        with self._lock:
+            start = self._size
+            self._grow(start + len(rows))
+            for offset, (task_id, task_type, min_level, _, _) in enumerate(rows):
+                group = self._groups.setdefault(
+                    (task_type, min_level), len(self._groups)
+                )
+                self._ids[start + offset] = task_id
+                self._group_codes[start + offset] = group
+            self._vectors[start : start + len(rows)] = vectors
+            self._size = start + len(rows)
+            self.max_id = max(self.max_id, max(row[0] for row in rows))
+
+    def sync(self):
+        """Index AI tasks created since the last sync"""
+        self.add(
+            list(
+                Task.objects.filter(id__gt=self.max_id, project__isnull=True)
+                .order_by("id")
+                .values_list("id", "task_type", "min_level", "title", "description")
+            )
+        )
+
+    def similar(self, title, description, task_type, level, threshold=THRESHOLD):
+        """Ids of indexed tasks at or above the threshold, most similar first"""
+        vector = embed([task_text(title, description)], self.dimensions)[0]
+        with self._lock:
+            group = self._groups.get((task_type, level))
+            if group is None:
+                return []
+            rows = np.flatnonzero(self._group_codes[: self._size] == group)
+            scores = self._vectors[rows].astype(np.float32) @ vector
+            ids = self._ids[rows]
+        matches = np.flatnonzero(scores >= threshold)
+        order = matches[np.argsort(-scores[matches], kind="stable")]
+        return ids[order].tolist()
+
+
+task_index = TaskEmbeddingIndex()
+_sync_lock = threading.Lock()
+
+
+def find_similar_task(title, description, task_type, level, user=None):
+    """An existing AI task close enough to reuse, or None
+
+    Tasks the user already has are skipped, so a follow-up is never a
+    repeat of something the user has already seen.
+    """
+    with _sync_lock:
+        task_index.sync()
+    candidates = task_index.similar(title, description, task_type, level)
+    if not candidates:
+        return None
+    if user is not None:
+        seen = set(
+            UserTask.objects.filter(user=user, task_id__in=candidates).values_list(
+                "task_id", flat=True
+            )
+        )
+        candidates = [task_id for task_id in candidates if task_id not in seen]
+    # Deleted tasks stay in the index; skip them
+    tasks = Task.objects.in_bulk(candidates)
+    return next((tasks[i] for i in candidates if i in tasks), None)
@@ -0,0 +1,154 @@
+import math
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from .concurrency import run_concurrently
+from .models import TaskPoolDemand, TaskPoolEntry
+from .prompt_cache import task_fingerprint
+
+logger = logging.getLogger(__name__)
+
+MIN_SIZE = getattr(settings, "TASK_POOL_MIN_SIZE", 2)
+MAX_SIZE = getattr(settings, "TASK_POOL_MAX_SIZE", 20)
+HEADROOM = getattr(settings, "TASK_POOL_HEADROOM", 1.5)  # Target per recent request
+IDLE_DAYS = getattr(settings, "TASK_POOL_IDLE_DAYS", 7)  # Stop refilling after
+
+# A single thread tops up buckets found empty on the request path
+_refill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-pool")
+_refilling = set()
+_refilling_lock = threading.Lock()
+
+
+def take_pooled_task(level, topic, task_type, difficulty=None, agent=None):
+    """Pop a ready task from its bucket, or return None if the bucket is empty
+
+    Passing the agent schedules a background refill when the bucket is empty.
+    """
+    bucket = task_fingerprint(topic, level, task_type, difficulty)
+    _record_demand(bucket, topic, level, task_type, difficulty)
+
+    while True:
+        entry = (
+            TaskPoolEntry.objects.filter(bucket=bucket)
+            .select_related("task")
+            .order_by("id")
+            .first()
+        )
+        if entry is None:
+            if agent is not None:
+                schedule_refill(bucket, agent)
+            return None
+        # Deleting the entry is the claim; losing a race just means retrying
+        deleted, _ = TaskPoolEntry.objects.filter(id=entry.id).delete()
+        if deleted:
+            return entry.task
+
+
+def return_pooled_task(task, level, topic, task_type, difficulty=None):
+    """Put a taken task back in its bucket when the caller could not use it"""
+    bucket = task_fingerprint(topic, level, task_type, difficulty)
+    TaskPoolEntry.objects.get_or_create(task=task, defaults={"bucket": bucket})
+
+
+def _record_demand(bucket, topic, level, task_type, difficulty):
+    """Count a request against the bucket's demand"""
+    changes = {
+        "recent_requests": F("recent_requests") + 1,
+        "total_requests": F("total_requests") + 1,
+        "last_requested_at": timezone.now(),
+    }
+    if TaskPoolDemand.objects.filter(bucket=bucket).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            TaskPoolDemand.objects.create(
+                bucket=bucket,
+                topic=topic,
+                level=level,
+                task_type=task_type,
+                difficulty=difficulty or "",
+                recent_requests=1,
+                total_requests=1,
+            )
+    except IntegrityError:
+        TaskPoolDemand.objects.filter(bucket=bucket).update(**changes)
+
+
+def target_size(demand):
+    """Low-water mark for a bucket given its recent demand"""
+    return min(MAX_SIZE, max(MIN_SIZE, math.ceil(demand.recent_requests * HEADROOM)))
+
+
+def refill_bucket(demand, agent):
+    """Top a bucket back up to its target size and return tasks created"""
+    missing = (
+        target_size(demand) - TaskPoolEntry.objects.filter(bucket=demand.bucket).count()
+    )
+
+    if missing > 0:
+        task_data_list = run_concurrently(
+            [
+                partial(
+                    agent._request_task_data,
+                    demand.level,
+                    demand.topic,
+                    demand.task_type,
+                    demand.difficulty or None,
+                )
+                for _ in range(missing)
+            ]
+        )
+        with transaction.atomic():
+            for task_data in task_data_list:
+                task = agent._save_ai_task(demand.level, task_data, demand.task_type)
+                # A reused near-duplicate may already wait in a bucket
+                TaskPoolEntry.objects.get_or_create(
+                    task=task, defaults={"bucket": demand.bucket}
+                )
+        logger.info(f"Added {missing} tasks to pool bucket {demand.bucket[:8]}")
+
+    # Halve recent demand so the target follows the current request rate
+    TaskPoolDemand.objects.filter(pk=demand.pk).update(
+        recent_requests=F("recent_requests") / 2
+    )
+    return max(missing, 0)
+
+
+def refill_task_pool(agent):
+    """Refill every bucket that has seen demand recently"""
+    active_since = timezone.now() - timedelta(days=IDLE_DAYS)
+    created = 0
+    for demand in TaskPoolDemand.objects.filter(last_requested_at__gte=active_since):
+        try:
+            created += refill_bucket(demand, agent)
+        except Exception as e:
+            logger.error(f"Failed to refill pool bucket {demand.bucket[:8]}: {e}")
+    return created
+
+
+def schedule_refill(bucket, agent):
+    """Refill a bucket in the background unless a refill is already queued"""
+    with _refilling_lock:
+        if bucket in _refilling:
+            return
+        _refilling.add(bucket)
+    _refill_executor.submit(_refill_in_background, bucket, agent)
+
+
+def _refill_in_background(bucket, agent):
+    close_old_connections()
+    try:
+        demand = TaskPoolDemand.objects.get(bucket=bucket)
+        refill_bucket(demand, agent)
+    except Exception as e:
+        logger.error(f"Background refill of pool bucket {bucket[:8]} failed: {e}")
+    finally:
+        with _refilling_lock:
+            _refilling.discard(bucket)
+        close_old_connections()
@@ -1,3 +1,2455 @@
-from django.test import TestCase
+import os
+import json
+import time
+import asyncio
+import threading
+import uuid
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from . import views
+from . import bulk_verify, chain_indexer, jobs, payouts, task_pool
+from .ai_core import LearnEarnAIAgent
+from . import tx_index
+from .blockchain import (
+    MultiChainProvider,
+    NonceManager,
+    RPCError,
+    aissue_token_reward,
+    arebroadcast_transaction,
+    get_chain_provider,
+)
+from .concurrency import run_concurrently
+from .content_store import get_lesson_content, invalidate_lesson_content
+from .progress import refresh_path_progress
+from .prompt_cache import TaskTemplateCache, task_fingerprint, task_template_cache
+from .requirements import RequirementError, compile_requirements, get_task_matcher
+import rlp
+from eth_abi import encode
+from eth_account import Account
+from openai import error as openai_error
+from web3 import Web3
+from web3.datastructures import AttributeDict
+from .llm import LLMClient, LLMError, StubBackend
+from .models import (
+    BadgeMint,
+    ChainCheckpoint,
+    ClaimBatch,
+    GradingRequest,
+    LearningPath,
+    Notification,
+    PathJob,
+    RewardPayout,
+    Task,
+    TaskContent,
+    TaskPoolDemand,
+    TaskPoolEntry,
+    User,
+    UserTask,
+    VerifiedTransaction,
+)
 
-# Create your tests here.
+# Most queries a single request may run. Raise a budget only for a
+# deliberate change, never to make an N+1 pass. Views behind the view cache
+# are measured cold, including the query that resolves the user for it.
+QUERY_BUDGETS = {
+    "health_check": 0,
+    "onboard_user": 5,
+    "get_user_profile": 2,
+    "update_wallet": 2,
+    "create_learning_path": 2,
+    "get_path_job": 1,
+    "get_user_paths": 3,
+    # First request generates the lesson; later ones are served from cache
+    "get_current_task": 10,
+    "get_task_content": 8,
+    "stream_task_content": 8,  # Same work as get_task_content, streamed
+    "start_task": 3,
+    "verify_task": 8,  # Grading cache lookup, then queues the proof for the worker
+    "get_grading_status": 1,
+    "grading_metrics": 2,
+    "get_available_quests": 4,  # Includes building the quest index
+    "assign_quest": 3,
+    "claim_tokens": 6,  # Includes the row lock
+    # The fixture user has a wallet, so the claim check runs and the mint
+    # record is created (in a savepoint) and taken for sending
+    "claim_nft": 9,
+    "create_project_quest": 1,
+    "verify_quest_proofs": 2,
+    "get_learning_path": 2,
+}
+
+EXPLAINED_STATEMENTS = ("SELECT", "UPDATE", "DELETE")
+
+
+def explain(sql):
+    """Query plan rows for a captured statement"""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f"EXPLAIN {sql}")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def full_scans(plan):
+    """Plan steps that read a whole app table without an index"""
+    if connection.vendor != "sqlite":
+        # Other planners legitimately scan tiny test tables; record only
+        return []
+    return [
+        step
+        for step in plan
+        if step.startswith("SCAN agent_") and " USING " not in step
+    ]
+
+
+def read_stream(response):
+    """Body of a streaming response, whether its content is sync or async"""
+    if not response.is_async:
+        return b"".join(response.streaming_content)
+
+    async def read():
+        return b"".join([chunk async for chunk in response.streaming_content])
+
+    return async_to_sync(read)()
+
+
+def queue_job_without_running(user, topic, agent):
+    return PathJob.objects.create(user=user, topic=topic)
+
+
+@override_settings(TESTING=True)
+class ViewQueryPlanTests(TestCase):
+    """Query counts and plans for every endpoint in agent/urls.py"""
+
+    plans = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            telegram_id="1001",
+            level=3,
+            interests={"primary": "DeFi"},
+            wallet_addresses={"gnosis": "0x" + "1" * 40},
+        )
+        cls.path = LearningPath.objects.create(user=cls.user, topic="DeFi")
+        cls.learning = Task.objects.create(
+            title="What is a DEX",
+            description="Read the lesson",
+            task_type="learning",
+            verification_type="quiz",
+        )
+        cls.practice = Task.objects.create(
+            title="Share your swap",
+            description="Post a screenshot",
+            task_type="practice",
+            verification_type="social_proof",
+            xp_reward=20,
+        )
+        cls.quest = Task.objects.create(
+            title="Provide liquidity",
+            description="Add liquidity",
+            task_type="quest",
+            verification_type="transaction",
+            token_reward=5,
+            project="dex",
+        )
+        cls.current = UserTask.objects.create(
+            user=cls.user, task=cls.learning, learning_path=cls.path, order=1
+        )
+        cls.social = UserTask.objects.create(
+            user=cls.user,
+            task=cls.practice,
+            learning_path=cls.path,
+            order=2,
+            status="active",
+        )
+        cls.job = PathJob.objects.create(user=cls.user, topic="DeFi")
+
+    def setUp(self):
+        # Lesson content is cached across requests; every test starts cold
+        cache.clear()
+        stub_llm = LLMClient(StubBackend())
+        for patcher in (
+            mock.patch.object(views.ai_agent, "llm", stub_llm),
+            mock.patch("agent.ai_core.random", return_value=1.0),
+            mock.patch("agent.views.submit_path_job", queue_job_without_running),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @classmethod
+    def tearDownClass(cls):
+        # QUERY_PLAN_REPORT=path writes every recorded plan for review
+        report = os.environ.get("QUERY_PLAN_REPORT")
+        if report:
+            with open(report, "w") as f:
+                json.dump(cls.plans, f, indent=2)
+        super().tearDownClass()
+
+    def call(self, name, kwargs=None, data=None):
+        """Request an endpoint and return (response, captured queries)"""
+        url = reverse(name, kwargs=kwargs)
+        with CaptureQueriesContext(connection) as queries:
+            if data is None:
+                response = self.client.get(url)
+            else:
+                response = self.client.post(
+                    url, json.dumps(data), content_type="application/json"
+                )
+            if response.streaming:
+                read_stream(response)
+        return response, queries.captured_queries
+
+    def assertEfficient(self, name, queries):
+        plans = [
+            {"sql": query["sql"], "plan": explain(query["sql"])}
+            for query in queries
+            if query["sql"].lstrip().upper().startswith(EXPLAINED_STATEMENTS)
+        ]
+        self.plans[name] = plans
+        report = json.dumps(plans, indent=2)
+        self.assertLessEqual(
+            len(queries), QUERY_BUDGETS[name], f"{name} ran too many queries:\n{report}"
+        )
+        for entry in plans:
+            self.assertEqual(
+                full_scans(entry["plan"]),
+                [],
+                f"{name} scans a table:\n{entry['sql']}\n{entry['plan']}",
+            )
+
+    def check(self, name, kwargs=None, data=None, status=200):
+        response, queries = self.call(name, kwargs, data)
+        self.assertEqual(response.status_code, status, getattr(response, "content", ""))
+        self.assertEfficient(name, queries)
+        return response
+
+    def test_health_check(self):
+        self.check("health_check")
+
+    def test_onboard_user(self):
+        self.check(
+            "onboard_user", data={"telegram_id": "2002", "interest": "NFTs"}, status=202
+        )
+
+    def test_get_user_profile(self):
+        self.check("get_user_profile", {"telegram_id": self.user.telegram_id})
+
+    def test_update_wallet(self):
+        self.check(
+            "update_wallet",
+            data={"telegram_id": self.user.telegram_id, "wallet_address": "0xabc"},
+        )
+
+    def test_create_learning_path(self):
+        self.check(
+            "create_learning_path",
+            data={"telegram_id": self.user.telegram_id, "topic": "DAOs"},
+            status=202,
+        )
+
+    def test_get_path_job(self):
+        self.check("get_path_job", {"job_id": self.job.id})
+
+    def test_get_user_paths(self):
+        self.check("get_user_paths", {"telegram_id": self.user.telegram_id})
+
+    def test_get_current_task(self):
+        self.check("get_current_task", {"telegram_id": self.user.telegram_id})
+
+    def test_get_task_content(self):
+        self.check("get_task_content", {"task_id": self.learning.id})
+
+    def test_stream_task_content(self):
+        self.check("stream_task_content", {"task_id": self.learning.id})
+
+    def test_start_task(self):
+        self.check("start_task", {"user_task_id": self.current.id}, data={})
+
+    def test_verify_task(self):
+        self.check(
+            "verify_task",
+            {"user_task_id": self.social.id},
+            data={"proof": {"proof_link": "https://example.com/post/1"}},
+        )
+
+    def test_get_grading_status(self):
+        grading = GradingRequest.objects.create(
+            user_task=self.social, kind="social_proof", proof={"proof_link": "x"}
+        )
+        self.check("get_grading_status", {"grading_id": grading.id})
+
+    def test_grading_metrics(self):
+        self.check("grading_metrics")
+
+    def test_get_available_quests(self):
+        self.check("get_available_quests", {"telegram_id": self.user.telegram_id})
+
+    def test_assign_quest(self):
+        self.check(
+            "assign_quest",
+            {"quest_id": self.quest.id, "telegram_id": self.user.telegram_id},
+            data={},
+        )
+
+    def test_claim_tokens(self):
+        # No verified rewards yet, so nothing is sent
+        self.check(
+            "claim_tokens", {"telegram_id": self.user.telegram_id}, data={}, status=400
+        )
+
+    def test_claim_nft(self):
+        # No chain is configured under test, so the mint itself fails
+        self.check(
+            "claim_nft", {"telegram_id": self.user.telegram_id}, data={}, status=400
+        )
+
+    def test_create_project_quest(self):
+        self.check(
+            "create_project_quest",
+            data={
+                "title": "Bridge",
+                "description": "Bridge to Gnosis",
+                "project": "bridge",
+                "verification_type": "transaction",
+                "verification_data": {"requirements": {"to_address": "0x" + "2" * 40}},
+            },
+        )
+
+    def test_verify_quest_proofs(self):
+        self.check("verify_quest_proofs", {"quest_id": self.quest.id}, data={})
+
+    def test_get_learning_path(self):
+        self.check("get_learning_path", {"path_id": self.path.id})
+
+    def test_every_url_is_covered(self):
+        from .urls import urlpatterns
+
+        self.assertEqual(
+            sorted(pattern.name for pattern in urlpatterns), sorted(QUERY_BUDGETS)
+        )
+
+
+@override_settings(TESTING=True)
+class QueryCountScalingTests(TestCase):
+    """List endpoints must not issue more queries as a user's data grows"""
+
+    def setUp(self):
+        self.user = User.objects.create(telegram_id="3003", level=5)
+
+    def add_paths(self, count):
+        task = Task.objects.create(
+            title="Intro", description="Read", task_type="learning"
+        )
+        for i in range(count):
+            path = LearningPath.objects.create(user=self.user, topic=f"Topic {i}")
+            UserTask.objects.bulk_create(
+                [
+                    UserTask(user=self.user, task=task, learning_path=path, order=n)
+                    for n in range(3)
+                ]
+            )
+            Task.objects.create(
+                title=f"Quest {i}", description="Do it", task_type="quest"
+            )
+        return path
+
+    def count_queries(self, name, **kwargs):
+        # Measure the database path, not the view cache
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse(name, kwargs=kwargs))
+        return len(queries)
+
+    def test_listings_do_not_grow_with_rows(self):
+        path = self.add_paths(1)
+        endpoints = {
+            "get_user_paths": {"telegram_id": self.user.telegram_id},
+            "get_available_quests": {"telegram_id": self.user.telegram_id},
+            "get_learning_path": {"path_id": path.id},
+        }
+        before = {
+            name: self.count_queries(name, **kwargs)
+            for name, kwargs in endpoints.items()
+        }
+        self.add_paths(10)
+        after = {
+            name: self.count_queries(name, **kwargs)
+            for name, kwargs in endpoints.items()
+        }
+        self.assertEqual(before, after)
+
+
+@override_settings(TESTING=True)
+class ViewCacheTests(TestCase):
+    """Cached read endpoints: hits skip the database and writes invalidate"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(telegram_id="5005", level=2)
+        self.url = reverse(
+            "get_user_profile", kwargs={"telegram_id": self.user.telegram_id}
+        )
+
+    def get(self, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, headers=headers)
+        return response, len(queries)
+
+    def test_repeat_reads_skip_the_database(self):
+        first, _ = self.get()
+        second, queries = self.get()
+        self.assertEqual(queries, 0)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_unchanged_response_is_not_modified(self):
+        first, _ = self.get()
+        response, queries = self.get(if_none_match=first["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(queries, 0)
+
+    def test_saves_invalidate_cached_responses(self):
+        first, _ = self.get()
+        self.user.level = 4
+        self.user.save()
+        response, _ = self.get(if_none_match=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["level"], 4)
+
+    def test_bulk_xp_awards_invalidate_cached_responses(self):
+        from .xp_ledger import award_xp
+
+        self.get()
+        award_xp(self.user.id, 50, "test")
+        response, _ = self.get()
+        self.assertEqual(response.json()["xp_points"], 50)
+
+    def test_quest_catalogue_changes_invalidate_quest_listings(self):
+        url = reverse(
+            "get_available_quests", kwargs={"telegram_id": self.user.telegram_id}
+        )
+        self.assertEqual(self.client.get(url).json()["quests"], [])
+        Task.objects.create(
+            title="Bridge", description="Bridge", task_type="quest", min_level=1
+        )
+        self.assertEqual(len(self.client.get(url).json()["quests"]), 1)
+
+
+@override_settings(TESTING=True)
+class QuestRecommendationTests(TestCase):
+    """Quests are ranked for the user, not just listed newest first"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(
+            telegram_id="6006", level=3, interests={"primary": "DeFi"}
+        )
+
+    def quest(self, title, **fields):
+        return Task.objects.create(
+            title=title, description=title, task_type="quest", **fields
+        )
+
+    def recommended(self, count=3):
+        from .recommendations import recommend_quests
+
+        return [quest["title"] for quest in recommend_quests(self.user, count)]
+
+    def test_interests_outrank_recency(self):
+        self.quest("Swap on a DEX")
+        self.quest("Mint an NFT")
+        self.assertEqual(self.recommended(1), ["Swap on a DEX"])
+
+    def test_ineligible_and_taken_quests_are_excluded(self):
+        taken = self.quest("Provide liquidity")
+        UserTask.objects.create(user=self.user, task=taken, status="verified")
+        self.quest("Advanced lending", min_level=5)
+        self.quest("Rootstock swap", supported_chains=["rootstock"])
+        self.quest("Gnosis swap", supported_chains=["gnosis"])
+        self.quest("Join a DAO", tags=["dao"])
+        self.assertEqual(self.recommended(), ["Gnosis swap", "Join a DAO"])
+
+
+@override_settings(TESTING=True)
+class TaskDedupTests(TestCase):
+    """Near-duplicate AI tasks reuse the existing row"""
+
+    def setUp(self):
+        from . import task_dedup
+
+        patcher = mock.patch.object(
+            task_dedup, "task_index", task_dedup.TaskEmbeddingIndex()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.agent = views.ai_agent
+        self.user = User.objects.create(telegram_id="7007")
+
+    def save(self, title, task_type="learning", user=None):
+        task_data = {
+            "title": title,
+            "description": "Explain how decentralized exchanges work.",
+            "verification_type": "quiz",
+            "xp_reward": 15,
+            "verification_data": {},
+        }
+        return self.agent._save_ai_task(1, task_data, task_type, user=user)
+
+    def test_near_duplicates_reuse_the_existing_task(self):
+        first = self.save("What is a DEX?")
+        self.assertEqual(self.save("What is a DEX").id, first.id)
+        practice = self.save("What is a DEX?", task_type="practice")
+        self.assertNotEqual(practice.id, first.id)
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_tasks_the_user_has_are_not_reused(self):
+        first = self.save("What is a DEX?")
+        UserTask.objects.create(user=self.user, task=first)
+        self.assertNotEqual(self.save("What is a DEX?", user=self.user).id, first.id)
+
+
+class FakeBot:
+    """Async bot stand-in recording sent messages"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.sent = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def send_message(self, **kwargs):
+        if self.error:
+            raise self.error
+        self.sent.append(kwargs)
+
+
+@override_settings(TESTING=False, TELEGRAM_BOT_TOKEN="token")
+class NotificationQueueTests(TestCase):
+    """Handlers only enqueue; the worker sends and retries"""
+
+    def setUp(self):
+        self.user = User.objects.create(telegram_id="8008", level=2)
+        self.quest = Task.objects.create(
+            title="Bridge", description="Bridge", task_type="quest"
+        )
+
+    def run_worker(self, bot):
+        from .notifications import run_worker
+
+        return async_to_sync(run_worker)(bot=bot)
+
+    def test_handlers_enqueue_without_sending(self):
+        with mock.patch("agent.notifications.Bot") as bot:
+            self.client.post(
+                reverse(
+                    "assign_quest",
+                    kwargs={"quest_id": self.quest.id, "telegram_id": "8008"},
+                )
+            )
+        bot.assert_not_called()
+        self.assertEqual(Notification.objects.get().status, "queued")
+
+    def test_worker_sends_queued_messages(self):
+        from .notifications import notify_new_task
+
+        notify_new_task(self.user.telegram_id, self.quest)
+        bot = FakeBot()
+        self.assertEqual(self.run_worker(bot), 1)
+        self.assertEqual(bot.sent[0]["chat_id"], "8008")
+        self.assertEqual(Notification.objects.get().status, "sent")
+
+    def test_failed_sends_are_retried_later(self):
+        from .notifications import notify_new_task
+
+        notify_new_task(self.user.telegram_id, self.quest)
+        self.assertEqual(self.run_worker(FakeBot(ConnectionError("down"))), 0)
+        notification = Notification.objects.get()
+        self.assertEqual((notification.status, notification.attempts), ("queued", 1))
+        self.assertGreater(notification.next_attempt_at, notification.created_at)
+
+    def test_abandoned_sends_are_retaken_after_the_timeout(self):
+        notification = Notification.objects.create(
+            chat_id="8008",
+            text="Hi",
+            status="sending",
+            attempts=1,
+            next_attempt_at=timezone.now() + timedelta(minutes=1),
+        )
+        bot = FakeBot()
+        self.assertEqual(self.run_worker(bot), 0)
+
+        # The worker that claimed it died; its lease runs out
+        Notification.objects.update(
+            next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(self.run_worker(bot), 1)
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.attempts), ("sent", 2))
+
+    def test_rate_limiter_spaces_messages_to_one_chat(self):
+        from .notifications import RateLimiter
+
+        limiter = RateLimiter(global_rate=30, chat_rate=1)
+        delays = [limiter.reserve("8008") for _ in range(3)]
+        self.assertEqual([round(delay) for delay in delays], [0, 1, 2])
+        self.assertEqual(limiter.reserve("9009"), 0)
+
+
+@override_settings(TESTING=True)
+class GradingQueueTests(TestCase):
+    """verify_task queues proofs; the worker grades each distinct one once"""
+
+    def setUp(self):
+        self.user = User.objects.create(telegram_id="9009")
+        self.task = Task.objects.create(
+            title="Explain a DEX",
+            description="Write how a DEX works",
+            task_type="practice",
+            verification_type="submission",
+            xp_reward=20,
+        )
+        self.llm = LLMClient(StubBackend())
+        for patcher in (
+            mock.patch.object(views.ai_agent, "llm", self.llm),
+            mock.patch("agent.grading.random.random", return_value=1.0),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def verify(self, user_task, text):
+        response = self.client.post(
+            reverse("verify_task", kwargs={"user_task_id": user_task.id}),
+            json.dumps({"proof": {"submission": text}}),
+            content_type="application/json",
+        )
+        return response.json()
+
+    def submit(self, text="A DEX swaps tokens with a pool"):
+        user_task = UserTask.objects.create(
+            user=self.user, task=self.task, status="active"
+        )
+        return user_task, self.verify(user_task, text)
+
+    def test_proofs_are_accepted_without_a_model_call(self):
+        with mock.patch.object(self.llm.backend, "create") as create:
+            user_task, data = self.submit()
+        create.assert_not_called()
+        self.assertTrue(data["pending_review"])
+        user_task.refresh_from_db()
+        self.assertEqual(user_task.status, "completed")
+        # One review at a time per task
+        self.assertFalse(self.verify(user_task, "again")["success"])
+
+    def test_worker_grades_a_micro_batch_in_one_prompt(self):
+        from .grading import process_grading_queue
+
+        submitted = [self.submit(f"Answer {i}") for i in range(3)]
+        with mock.patch.object(
+            self.llm.backend, "create", wraps=self.llm.backend.create
+        ) as create:
+            result = process_grading_queue(views.ai_agent)
+        self.assertEqual(create.call_count, 1)
+        self.assertEqual(result["graded"], 3)
+
+        for user_task, data in submitted:
+            user_task.refresh_from_db()
+            grading = GradingRequest.objects.get(id=data["grading_id"])
+            expected = "verified" if grading.result["passed"] else "failed"
+            self.assertEqual(user_task.status, expected)
+            status = self.client.get(
+                reverse("get_grading_status", kwargs={"grading_id": grading.id})
+            ).json()
+            self.assertEqual(status["status"], "graded")
+
+    def test_items_missing_from_a_packed_reply_are_graded_alone(self):
+        from .grading import process_grading_queue
+
+        self.submit()
+        with mock.patch.object(views.ai_agent, "grade_proofs_packed", return_value=[]):
+            result = process_grading_queue(views.ai_agent)
+        self.assertEqual(result["graded"], 1)
+
+    def test_repeat_proofs_are_graded_from_the_cache(self):
+        from .grading import process_grading_queue
+
+        first, _ = self.submit("A DEX swaps tokens  with a pool")
+        twin, _ = self.submit("A DEX swaps tokens with a pool")
+        with mock.patch.object(
+            self.llm.backend, "create", wraps=self.llm.backend.create
+        ) as create:
+            process_grading_queue(views.ai_agent)
+            self.assertEqual(create.call_count, 1)  # Once for both copies
+
+            # Someone else's copy is failed at once and flagged
+            other = User.objects.create(telegram_id="9010")
+            user_task = UserTask.objects.create(
+                user=other, task=self.task, status="active"
+            )
+            data = self.verify(user_task, "A DEX swaps tokens with a pool\n")
+            self.assertEqual(create.call_count, 1)
+        self.assertNotIn("pending_review", data)
+        grading = GradingRequest.objects.get(id=data["grading_id"])
+        self.assertEqual(grading.status, "graded")
+        self.assertEqual(grading.result["duplicate_of"], first.id)
+        self.assertFalse(grading.result["passed"])
+        user_task.refresh_from_db()
+        self.assertEqual(user_task.status, "failed")
+        self.assertEqual(user_task.verification_data["duplicate_of"], first.id)
+        self.assertNotIn(
+            "duplicate_of", GradingRequest.objects.get(user_task=twin).result
+        )
+
+    def test_copies_of_a_passed_proof_only_pass_for_the_same_user(self):
+        from .grading import process_grading_queue
+
+        first, _ = self.submit()
+        with mock.patch.object(
+            views.ai_agent,
+            "grade_proofs_packed",
+            return_value=[{"passed": True, "score": 90, "feedback": "Clear"}],
+        ):
+            process_grading_queue(views.ai_agent)
+        first.refresh_from_db()
+        self.assertEqual(first.status, "verified")
+
+        # A resubmission by the same user reuses the passing grade
+        again, data = self.submit()
+        self.assertTrue(
+            GradingRequest.objects.get(id=data["grading_id"]).result["passed"]
+        )
+        again.refresh_from_db()
+        self.assertEqual(again.status, "verified")
+
+        # The same text from another user does not pass
+        other = UserTask.objects.create(
+            user=User.objects.create(telegram_id="9011"),
+            task=self.task,
+            status="active",
+        )
+        data = self.verify(other, "A DEX swaps tokens with a pool")
+        grading = GradingRequest.objects.get(id=data["grading_id"])
+        self.assertEqual(
+            (grading.result["passed"], grading.result["score"]), (False, 0)
+        )
+        other.refresh_from_db()
+        self.assertEqual(other.status, "failed")
+        self.assertEqual(User.objects.get(telegram_id="9011").xp_points, 0)
+
+    def test_requests_abandoned_mid_grading_are_reclaimed(self):
+        from .grading import process_grading_queue
+
+        self.submit()
+        GradingRequest.objects.update(
+            status="grading", attempts=1, claimed_at=timezone.now()
+        )
+        self.assertEqual(process_grading_queue(views.ai_agent)["graded"], 0)
+
+        # The worker that claimed it died and the timeout has passed
+        GradingRequest.objects.update(claimed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(process_grading_queue(views.ai_agent)["graded"], 1)
+        grading = GradingRequest.objects.get()
+        self.assertEqual((grading.status, grading.attempts), ("graded", 2))
+
+    def lose_claim(self, grade_batch):
+        """Grade with grade_batch while another worker retakes the batch"""
+
+        def grade_then_lose_claim(agent, requests):
+            grades = grade_batch(agent, requests)
+            GradingRequest.objects.update(batch_id=uuid.uuid4())
+            return grades
+
+        return mock.patch("agent.grading._grade_batch", grade_then_lose_claim)
+
+    def test_grades_for_retaken_requests_are_dropped(self):
+        from . import grading
+
+        user_task, _ = self.submit()
+        with self.lose_claim(grading._grade_batch):
+            result = grading.process_grading_queue(views.ai_agent)
+
+        self.assertEqual(result["graded"], 0)
+        self.assertEqual(GradingRequest.objects.get().status, "grading")
+        user_task.refresh_from_db()
+        self.assertEqual(user_task.status, "completed")
+
+    def test_failures_for_retaken_requests_do_not_requeue_them(self):
+        from .grading import process_grading_queue
+
+        self.submit()
+        with self.lose_claim(lambda agent, requests: [None]):
+            process_grading_queue(views.ai_agent)
+
+        grading = GradingRequest.objects.get()
+        self.assertEqual(grading.status, "grading")
+        self.assertIsNotNone(grading.batch_id)
+
+    def test_links_are_normalized_before_hashing(self):
+        from .grading import proof_hash
+
+        hashes = {
+            proof_hash("social_proof", {"proof_link": link})
+            for link in (
+                "https://x.com/user/status/1",
+                "http://www.X.com/user/status/1/?utm_source=tg#reply",
+                "x.com/user/status/1",
+            )
+        }
+        self.assertEqual(len(hashes), 1)
+
+
+class StructuredOutputTests(TestCase):
+    """Model replies are parsed tolerantly, validated and repaired cheaply"""
+
+    def setUp(self):
+        cache.clear()
+        self.backend = StubBackend()
+        self.llm = LLMClient(self.backend)
+
+    def test_malformed_json_is_parsed_without_a_repair_call(self):
+        from .structured import parse_json
+
+        self.assertEqual(
+            parse_json('Sure!\n```json\n{"score": 8, "feedback": "ok",}\n```'),
+            {"score": 8, "feedback": "ok"},
+        )
+        # Cut off mid-member: the complete members survive
+        self.assertEqual(
+            parse_json('{"results": [{"id": 1, "score": 7}, {"id": 2, "sc'),
+            {"results": [{"id": 1, "score": 7}, {"id": 2}]},
+        )
+
+    def test_string_splitting_is_gone_from_submission_grading(self):
+        task = Task.objects.create(title="DEX", description="Explain a DEX")
+        agent = views.LearnEarnAIAgent(llm=self.llm)
+        with mock.patch.object(
+            self.backend,
+            "create",
+            return_value='Here you go: {"score": 9, "feedback": "Great. Score: 9"}',
+        ) as create:
+            grade = agent.grade_proof("submission", task, {"submission": "text"})
+        self.assertEqual(create.call_count, 1)
+        self.assertEqual(
+            grade, {"passed": True, "score": 9, "feedback": "Great. Score: 9"}
+        )
+
+    def test_invalid_replies_get_one_repair_call_and_are_counted(self):
+        from .llm import StructuredOutputError
+        from .structured import structured_output_stats
+
+        replies = [
+            '{"score": "eight", "feedback": "ok"}',
+            '{"score": 8, "feedback": "ok"}',
+        ]
+        with mock.patch.object(self.backend, "create", side_effect=replies) as create:
+            grade = self.llm.complete_structured([], "submission_grade")
+        self.assertEqual(grade, {"score": 8, "feedback": "ok"})
+        # The repair goes to the cheap model with the validation error
+        model, messages = create.call_args.args[:2]
+        self.assertEqual(model, self.llm.repair_model)
+        self.assertIn("$.score: expected integer", messages[-1]["content"])
+
+        with mock.patch.object(self.backend, "create", return_value="no JSON"):
+            with self.assertRaises(StructuredOutputError):
+                self.llm.complete_structured([], "submission_grade")
+        stats = structured_output_stats()
+        self.assertEqual(stats["schemas"]["submission_grade"]["retried"], 1)
+        self.assertEqual(stats["schemas"]["submission_grade"]["failed"], 1)
+        self.assertEqual(stats["failure_rate"], 0.5)
+
+    def test_quiz_answers_must_be_options(self):
+        from .structured import check_quiz
+
+        question = {"question": "Q", "options": ["A", "B"], "correct_answer": "C"}
+        quiz = {"questions": [question]}
+        repaired = {"questions": [{**question, "correct_answer": "A"}]}
+        with mock.patch.object(
+            self.backend,
+            "create",
+            side_effect=[json.dumps(quiz), json.dumps(repaired)],
+        ):
+            self.assertEqual(
+                self.llm.complete_structured([], "quiz", check=check_quiz), repaired
+            )
+
+
+class FlakyBackend:
+    """Raises the queued errors in turn, then answers"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.timeouts = []
+
+    def create(self, model, messages, timeout, **params):
+        self.timeouts.append(timeout)
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+class LLMClientTests(TestCase):
+    """Transient model failures are retried with backoff, others fail fast"""
+
+    messages = [{"role": "user", "content": "hi"}]
+
+    def setUp(self):
+        patcher = mock.patch("agent.llm.time.sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_transient_errors_are_retried(self):
+        backend = FlakyBackend(
+            openai_error.RateLimitError("slow down"),
+            openai_error.Timeout("timed out"),
+        )
+        client = LLMClient(backend, max_retries=3, backoff=1)
+        self.assertEqual(client.complete(self.messages), "ok")
+        self.assertEqual(len(backend.timeouts), 3)
+        # Full jitter: each delay is at most the doubling backoff
+        delays = [call.args[0] for call in self.sleep.call_args_list]
+        self.assertEqual(len(delays), 2)
+        self.assertLessEqual(delays[0], 1)
+        self.assertLessEqual(delays[1], 2)
+
+    def test_retries_are_bounded(self):
+        backend = FlakyBackend(*[openai_error.APIConnectionError("down")] * 5)
+        client = LLMClient(backend, max_retries=2)
+        with self.assertRaises(LLMError):
+            client.complete(self.messages)
+        self.assertEqual(len(backend.timeouts), 3)
+
+    def test_request_errors_are_not_retried(self):
+        backend = FlakyBackend(openai_error.InvalidRequestError("bad", "model"))
+        client = LLMClient(backend)
+        with self.assertRaises(openai_error.InvalidRequestError):
+            client.complete(self.messages)
+        self.assertEqual(len(backend.timeouts), 1)
+
+    def test_attempts_never_outlast_the_deadline(self):
+        backend = FlakyBackend()
+        LLMClient(backend, timeout=30, deadline=5).complete(self.messages)
+        self.assertLessEqual(backend.timeouts[0], 5)
+
+    def test_stub_backend_is_deterministic(self):
+        client = LLMClient(StubBackend())
+        self.assertEqual(client.complete(self.messages), client.complete(self.messages))
+
+
+class TaskTemplateCacheTests(TestCase):
+    """Task templates are reused per prompt fingerprint once a pool fills"""
+
+    def generator(self):
+        calls = []
+
+        def generate():
+            calls.append(1)
+            return {"title": f"Task {len(calls)}"}
+
+        return generate, calls
+
+    def test_pool_fills_before_templates_are_served(self):
+        templates = TaskTemplateCache(pool_size=2)
+        generate, calls = self.generator()
+        for _ in range(5):
+            template = templates.get_or_generate("key", generate)
+        self.assertEqual(len(calls), 2)
+        self.assertIn(template["title"], ["Task 1", "Task 2"])
+        self.assertEqual(templates.stats()["hits"], 3)
+
+    def test_served_templates_are_copies(self):
+        templates = TaskTemplateCache(pool_size=1)
+        generate, _ = self.generator()
+        templates.get_or_generate("key", generate)["title"] = "Changed"
+        self.assertEqual(templates.get_or_generate("key", generate)["title"], "Task 1")
+
+    def test_expired_and_least_recent_keys_are_evicted(self):
+        templates = TaskTemplateCache(max_keys=2, ttl=60, pool_size=1)
+        generate, calls = self.generator()
+        for key in ("a", "b", "c"):
+            templates.get_or_generate(key, generate)
+        self.assertEqual(templates.stats()["keys"], 2)
+        templates.get_or_generate("a", generate)  # Evicted, so generated again
+        self.assertEqual(len(calls), 4)
+
+        with mock.patch("agent.prompt_cache.time.monotonic", return_value=1e12):
+            templates.get_or_generate("a", generate)
+        self.assertEqual(len(calls), 5)
+
+    def test_fingerprint_ignores_topic_formatting(self):
+        self.assertEqual(
+            task_fingerprint("DeFi  Lending!", 2, "quest"),
+            task_fingerprint("defi lending", 2, "quest"),
+        )
+        self.assertNotEqual(
+            task_fingerprint("defi", 2, "quest"), task_fingerprint("defi", 3, "quest")
+        )
+
+
+@override_settings(TESTING=True)
+class TaskPoolTests(TestCase):
+    """Path tasks come from pre-generated buckets sized by demand"""
+
+    def setUp(self):
+        task_template_cache.clear()
+        self.agent = LearnEarnAIAgent(llm=LLMClient(StubBackend()))
+        self.bucket = task_fingerprint("DeFi", 1, "learning", "beginner")
+        patcher = mock.patch("agent.task_pool.schedule_refill")
+        self.schedule_refill = patcher.start()
+        self.addCleanup(patcher.stop)
+        # Distinct tasks, so none is reused as a near-duplicate of another
+        patcher = mock.patch.object(
+            self.agent,
+            "_request_task_data",
+            side_effect=lambda *args: {
+                "title": uuid.uuid4().hex,
+                "description": uuid.uuid4().hex,
+                "verification_type": "quiz",
+                "verification_data": {},
+                "xp_reward": 10,
+            },
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def take(self):
+        return task_pool.take_pooled_task(1, "DeFi", "learning", "beginner", self.agent)
+
+    def test_empty_bucket_schedules_a_refill(self):
+        self.assertIsNone(self.take())
+        self.schedule_refill.assert_called_once_with(self.bucket, self.agent)
+        demand = TaskPoolDemand.objects.get(bucket=self.bucket)
+        self.assertEqual((demand.recent_requests, demand.total_requests), (1, 1))
+
+    def test_refill_tops_up_to_demand_and_decays_it(self):
+        for _ in range(4):
+            self.take()
+        demand = TaskPoolDemand.objects.get(bucket=self.bucket)
+        self.assertEqual(task_pool.target_size(demand), 6)
+
+        self.assertEqual(task_pool.refill_bucket(demand, self.agent), 6)
+        self.assertEqual(TaskPoolEntry.objects.filter(bucket=self.bucket).count(), 6)
+        demand.refresh_from_db()
+        self.assertEqual(demand.recent_requests, 2)
+        # Already full: nothing is generated
+        with mock.patch.object(self.agent, "_request_task_data") as request:
+            self.assertEqual(task_pool.refill_bucket(demand, self.agent), 0)
+        request.assert_not_called()
+
+    def test_pooled_tasks_are_taken_oldest_first_and_once(self):
+        demand = TaskPoolDemand.objects.create(
+            bucket=self.bucket, topic="DeFi", level=1, task_type="learning"
+        )
+        task_pool.refill_bucket(demand, self.agent)
+        oldest = TaskPoolEntry.objects.order_by("id").first().task
+        self.assertEqual(self.take(), oldest)
+        self.assertFalse(TaskPoolEntry.objects.filter(task=oldest).exists())
+
+    def test_failed_path_returns_its_pooled_tasks(self):
+        user = User.objects.create(telegram_id="9191", level=1)
+        demand = TaskPoolDemand.objects.create(
+            bucket=self.bucket, topic="DeFi", level=1, task_type="learning"
+        )
+        task_pool.refill_bucket(demand, self.agent)
+        pooled = TaskPoolEntry.objects.filter(bucket=self.bucket).count()
+
+        with mock.patch.object(
+            self.agent, "_get_task_data", side_effect=RuntimeError("model down")
+        ):
+            result = self.agent.create_personalized_path(user.telegram_id, "DeFi")
+
+        self.assertFalse(result["success"])
+        self.assertEqual(
+            TaskPoolEntry.objects.filter(bucket=self.bucket).count(), pooled
+        )
+
+    def test_target_size_is_bounded(self):
+        demand = TaskPoolDemand(recent_requests=0)
+        self.assertEqual(task_pool.target_size(demand), task_pool.MIN_SIZE)
+        demand.recent_requests = 1000
+        self.assertEqual(task_pool.target_size(demand), task_pool.MAX_SIZE)
+
+
+class TaskPoolRefillSchedulingTests(TestCase):
+    """A bucket found empty by many requests is refilled once at a time"""
+
+    def test_queued_refill_is_not_queued_again(self):
+        with mock.patch.object(task_pool, "_refill_executor") as executor:
+            task_pool.schedule_refill("bucket", None)
+            task_pool.schedule_refill("bucket", None)
+        executor.submit.assert_called_once()
+        task_pool._refilling.discard("bucket")
+
+
+class FakeEth:
+    """web3.eth with real signing; sends are recorded instead of broadcast"""
+
+    account = Account
+
+    def __init__(self, pending_nonce=0):
+        self.pending_nonce = pending_nonce
+        self.count_reads = 0
+        self.errors = []
+        self.sent = []
+
+    def get_transaction_count(self, address, block_identifier):
+        self.count_reads += 1
+        return self.pending_nonce
+
+    def send_raw_transaction(self, raw_tx):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append(raw_tx)
+        return Web3.keccak(raw_tx)
+
+
+class FakeWeb3:
+    def __init__(self, pending_nonce=0):
+        self.eth = FakeEth(pending_nonce)
+
+
+def transfer_tx():
+    return {
+        "to": "0x" + "2" * 40,
+        "value": 0,
+        "gas": 21000,
+        "gasPrice": 1,
+        "chainId": 100,
+    }
+
+
+def tx_nonce(raw_tx):
+    return int.from_bytes(rlp.decode(raw_tx)[0], "big")
+
+
+class ChainProviderTests(TestCase):
+    """RPC connections open lazily and fail over between configured URLs"""
+
+    def setUp(self):
+        self.healthy = {"http://a": True, "http://b": True}
+        self.checks = []
+        env = {"CONNECTION_CONFIGS_CONFIG_GNOSIS_LEDGER_RPC": "http://a, http://b"}
+        with mock.patch.dict(os.environ, env):
+            self.provider = MultiChainProvider()
+        patcher = mock.patch.object(self.provider, "_is_healthy", self.is_healthy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def is_healthy(self, web3):
+        url = web3.provider.endpoint_uri
+        self.checks.append(url)
+        return self.healthy[url]
+
+    def active_url(self):
+        return self.provider.get_web3("gnosis").provider.endpoint_uri
+
+    def test_connections_open_on_first_use(self):
+        self.assertEqual(self.provider._connections, {})
+        self.assertEqual(self.active_url(), "http://a")
+        self.assertEqual(list(self.provider._connections), ["http://a"])
+
+    def test_health_checks_are_reused_within_the_ttl(self):
+        self.active_url()
+        self.active_url()
+        self.assertEqual(self.checks, ["http://a"])
+
+    def test_unhealthy_endpoint_fails_over_to_the_next(self):
+        self.active_url()
+        self.healthy["http://a"] = False
+        self.provider.mark_unhealthy("gnosis")
+        self.assertEqual(self.active_url(), "http://b")
+        self.assertEqual(self.provider.get_rpc_session("gnosis")[0], "http://b")
+
+        # The next check starts from the endpoint now in use
+        self.healthy["http://a"] = True
+        self.provider.mark_unhealthy("gnosis")
+        self.assertEqual(self.active_url(), "http://b")
+
+    def test_no_healthy_endpoint_raises(self):
+        self.healthy = {"http://a": False, "http://b": False}
+        with self.assertRaises(ConnectionError):
+            self.active_url()
+
+    def test_provider_is_shared_per_process(self):
+        self.assertIs(get_chain_provider(), get_chain_provider())
+
+
+TX_HASH = "0x" + "ab" * 32
+
+
+def fake_chain(block_number=100, head_block=200):
+    """Chain provider whose web3 knows TX_HASH, mined at ``block_number``"""
+    eth = mock.Mock(block_number=head_block)
+    eth.get_transaction.return_value = AttributeDict(
+        {"from": "0x" + "1" * 40, "to": "0x" + "2" * 40, "input": b""}
+    )
+    eth.get_transaction_receipt.return_value = AttributeDict(
+        {"blockNumber": block_number, "status": 1, "logs": []}
+    )
+    provider = mock.Mock()
+    provider.get_web3.return_value.eth = eth
+    return provider
+
+
+class TransactionIndexTests(TestCase):
+    """Verified transactions are indexed per chain and prove one task each"""
+
+    def setUp(self):
+        tx_index._block_numbers.clear()
+        user = User.objects.create(telegram_id="9009")
+        task = Task.objects.create(title="Swap", description="Swap")
+        self.first, self.second = [
+            UserTask.objects.create(user=user, task=task) for _ in range(2)
+        ]
+
+    def test_final_transactions_are_served_without_rpc(self):
+        chain = fake_chain()
+        record = tx_index.lookup_transaction(TX_HASH.upper()[2:], "gnosis", chain)
+        self.assertEqual((record.tx_hash, record.is_final), (TX_HASH, True))
+
+        chain = fake_chain()
+        self.assertEqual(tx_index.lookup_transaction(TX_HASH, "gnosis", chain), record)
+        chain.get_web3.assert_not_called()
+
+    def test_unconfirmed_transactions_are_fetched_again(self):
+        tx_index.lookup_transaction(TX_HASH, "gnosis", fake_chain(block_number=195))
+        tx_index._block_numbers.clear()
+        record = tx_index.lookup_transaction(TX_HASH, "gnosis", fake_chain())
+        self.assertTrue(record.is_final)
+        self.assertEqual(VerifiedTransaction.objects.count(), 1)
+
+    def test_records_from_another_chain_are_a_miss(self):
+        tx_index.lookup_transaction(TX_HASH, "rootstock", fake_chain())
+        chain = fake_chain()
+        record = tx_index.lookup_transaction(TX_HASH, "gnosis", chain)
+        chain.get_web3.assert_called_with("gnosis")
+        self.assertEqual(record.chain, "gnosis")
+        self.assertEqual(VerifiedTransaction.objects.count(), 2)
+
+    def test_a_transaction_proves_one_task_per_chain(self):
+        for chain in ("gnosis", "rootstock"):
+            tx_index.lookup_transaction(TX_HASH, chain, fake_chain())
+        self.assertTrue(tx_index.claim_transaction(TX_HASH, self.first, "gnosis"))
+        self.assertTrue(tx_index.claim_transaction(TX_HASH, self.first, "gnosis"))
+        self.assertFalse(tx_index.claim_transaction(TX_HASH, self.second, "gnosis"))
+        self.assertEqual(tx_index.find_proof_owner(TX_HASH, "gnosis"), self.first.id)
+        # The same hash on another chain is a different transaction
+        self.assertIsNone(tx_index.find_proof_owner(TX_HASH, "rootstock"))
+        self.assertTrue(tx_index.claim_transaction(TX_HASH, self.second, "rootstock"))
+
+
+class NonceManagerTests(TestCase):
+    """Payout transactions get consecutive nonces from one manager"""
+
+    def setUp(self):
+        self.account = Account.create()
+        self.web3 = FakeWeb3(pending_nonce=7)
+        self.nonces = NonceManager(self.web3, self.account.address)
+
+    def test_sends_signed_transactions_with_consecutive_nonces(self):
+        hashes = [self.nonces.send(transfer_tx(), self.account.key) for _ in range(3)]
+        sent = self.web3.eth.sent
+        self.assertEqual([tx_nonce(raw) for raw in sent], [7, 8, 9])
+        self.assertEqual(hashes, [Web3.keccak(raw) for raw in sent])
+        for raw in sent:
+            self.assertEqual(Account.recover_transaction(raw), self.account.address)
+        # The chain is asked once; later nonces are counted locally
+        self.assertEqual(self.web3.eth.count_reads, 1)
+
+    def test_failed_send_resyncs_from_the_chain(self):
+        self.nonces.send(transfer_tx(), self.account.key)
+        self.web3.eth.errors.append(ValueError("nonce too low"))
+        with self.assertRaises(ValueError):
+            self.nonces.send(transfer_tx(), self.account.key)
+
+        self.web3.eth.pending_nonce = 12
+        self.nonces.send(transfer_tx(), self.account.key)
+        self.assertEqual([tx_nonce(raw) for raw in self.web3.eth.sent], [7, 12])
+        self.assertEqual(self.web3.eth.count_reads, 2)
+
+    def test_signs_transactions_for_the_caller_to_send(self):
+        signed = [self.nonces.sign(transfer_tx(), self.account.key) for _ in range(2)]
+        self.assertEqual([tx_nonce(raw) for raw in signed], [7, 8])
+        for raw in signed:
+            self.assertEqual(Account.recover_transaction(raw), self.account.address)
+        self.assertEqual(self.web3.eth.sent, [])
+
+    def test_async_token_reward_broadcasts_the_signed_transfer(self):
+        broadcast = []
+        signed = []
+
+        async def arpc(method, params, chain, chain_provider):
+            broadcast.append(params[0])
+            return Web3.to_hex(Web3.keccak(hexstr=params[0]))
+
+        async def on_signed(raw_tx, tx_hash):
+            signed.append((raw_tx, tx_hash))
+
+        context = (Web3(), {}, self.nonces, self.account.key)
+        for patcher in (
+            mock.patch("agent.blockchain._send_context", return_value=context),
+            mock.patch(
+                "agent.blockchain._token_transfer_txs",
+                return_value=iter([(transfer_tx(), None)]),
+            ),
+            mock.patch("agent.blockchain.arpc", arpc),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        result = async_to_sync(aissue_token_reward)(
+            "0x" + "2" * 40, 5, "gnosis", mock.Mock(), on_signed=on_signed
+        )
+
+        raw_tx = Web3.to_bytes(hexstr=broadcast[0])
+        self.assertEqual(tx_nonce(raw_tx), 7)
+        self.assertEqual(Account.recover_transaction(raw_tx), self.account.address)
+        self.assertEqual(signed, [(broadcast[0], result["tx_hash"])])
+
+
+class PayoutQueueTests(TestCase):
+    """Queued rewards are paid in batches, each reward exactly once"""
+
+    def setUp(self):
+        self.user = User.objects.create(telegram_id="7007")
+        self.wallets = ["0x" + "a" * 40, "0x" + "b" * 40]
+        for wallet, amount in [(self.wallets[0], 5), (self.wallets[0], 3)]:
+            payouts.queue_token_reward(self.user, wallet, amount)
+        payouts.queue_token_reward(self.user, self.wallets[1], 2)
+        self.batches = []
+
+    def send_token_batch(self, transfers, chain, chain_provider, fail_after=None):
+        self.batches.append(transfers)
+        for i, transfer in enumerate(transfers):
+            if i == fail_after:
+                raise ConnectionError("rpc down")
+            yield f"0x{len(self.batches)}{i}", [transfer]
+
+    def flush(self, **kwargs):
+        with mock.patch(
+            "agent.payouts.send_token_batch",
+            lambda *args: self.send_token_batch(*args, **kwargs),
+        ):
+            return payouts.flush_payouts("gnosis")
+
+    def test_rewards_per_wallet_are_summed_and_paid_once(self):
+        result = self.flush()
+        self.assertEqual(result["payouts"], 3)
+        self.assertEqual(
+            [(wallet.lower(), total) for wallet, total in self.batches[0]],
+            [(self.wallets[0], 8), (self.wallets[1], 2)],
+        )
+        self.assertEqual(self.flush()["payouts"], 0)
+        self.assertEqual(len(self.batches), 1)
+        self.assertFalse(RewardPayout.objects.exclude(status="sent").exists())
+
+    def test_only_unsent_rewards_are_requeued_after_a_failure(self):
+        result = self.flush(fail_after=1)
+        self.assertFalse(result["success"])
+        self.assertEqual(
+            sorted(RewardPayout.objects.values_list("status", flat=True)),
+            ["queued", "sent", "sent"],
+        )
+
+        self.flush()
+        self.assertEqual(
+            [(wallet.lower(), total) for wallet, total in self.batches[1]],
+            [(self.wallets[1], 2)],
+        )
+        self.assertFalse(RewardPayout.objects.exclude(status="sent").exists())
+
+    def test_rewards_fail_after_max_attempts(self):
+        for _ in range(payouts.MAX_ATTEMPTS):
+            self.flush(fail_after=0)
+        self.assertEqual(
+            set(RewardPayout.objects.values_list("status", flat=True)), {"failed"}
+        )
+        self.assertEqual(self.flush()["payouts"], 0)
+
+    def test_batches_left_sending_by_a_crash_are_reported(self):
+        batch_id = uuid.uuid4()
+        RewardPayout.objects.filter(wallet_address__iexact=self.wallets[0]).update(
+            status="sending",
+            batch_id=batch_id,
+            sending_at=timezone.now() - timedelta(seconds=payouts.SEND_TIMEOUT + 1),
+        )
+        # A batch still within its timeout may be in flight
+        RewardPayout.objects.filter(wallet_address__iexact=self.wallets[1]).update(
+            status="sending", batch_id=uuid.uuid4(), sending_at=timezone.now()
+        )
+
+        stderr = StringIO()
+        call_command(
+            "process_payouts", chain=["gnosis"], stdout=StringIO(), stderr=stderr
+        )
+
+        self.assertEqual(
+            [(b["batch_id"], b["payouts"]) for b in payouts.stale_batches("gnosis")],
+            [(batch_id, 2)],
+        )
+        self.assertIn(f"batch {batch_id} has 2 payouts sending", stderr.getvalue())
+        self.assertEqual(stderr.getvalue().count("batch "), 1)
+
+
+class RunConcurrentlyTests(TestCase):
+    """Model calls fan out across the LLM pool and come back in order"""
+
+    def test_calls_run_at_once_and_return_in_order(self):
+        # Each call waits for the others, so sequential execution times out
+        barrier = threading.Barrier(3, timeout=5)
+
+        def call(value):
+            barrier.wait()
+            return value
+
+        results = run_concurrently([lambda v=v: call(v) for v in "abc"])
+        self.assertEqual(results, ["a", "b", "c"])
+
+    def test_first_error_is_raised_once_every_call_finished(self):
+        finished = threading.Event()
+
+        def fail():
+            raise ValueError("bad task")
+
+        def slow():
+            time.sleep(0.1)
+            finished.set()
+
+        with self.assertRaisesMessage(ValueError, "bad task"):
+            run_concurrently([fail, slow])
+        self.assertTrue(finished.is_set())
+
+
+@override_settings(TESTING=True)
+class PathCreationTests(TestCase):
+    """Path tasks are generated concurrently and written in one transaction"""
+
+    def setUp(self):
+        cache.clear()
+        task_template_cache.clear()
+        self.user = User.objects.create(telegram_id="3003")
+        self.agent = LearnEarnAIAgent(llm=LLMClient(StubBackend()))
+        # Empty pool buckets would otherwise refill on a background thread
+        patcher = mock.patch("agent.task_pool.schedule_refill")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_tasks_follow_the_type_progression(self):
+        result = self.agent.create_personalized_path(self.user.telegram_id, "DeFi")
+        self.assertTrue(result["success"], result)
+        user_tasks = UserTask.objects.filter(learning_path_id=result["path_id"])
+        self.assertEqual(
+            list(user_tasks.order_by("order").values_list("task__task_type", "order")),
+            [("learning", 1), ("practice", 2), ("quest", 3)],
+        )
+
+    def test_failed_generation_leaves_no_path(self):
+        calls = []
+
+        def request_task_data(level, topic, task_type, difficulty=None):
+            calls.append(task_type)
+            if task_type == "quest":
+                raise ValueError("model down")
+            return {"title": task_type, "description": task_type}
+
+        with mock.patch.object(
+            self.agent, "_request_task_data", side_effect=request_task_data
+        ):
+            result = self.agent.create_personalized_path(self.user.telegram_id, "DeFi")
+        self.assertEqual(result, {"success": False, "error": "model down"})
+        self.assertEqual(sorted(calls), ["learning", "practice", "quest"])
+        self.assertFalse(LearningPath.objects.exists())
+        self.assertFalse(Task.objects.exists())
+
+
+class FakePathAgent:
+    """Creates a one-task path, or fails the way the real agent can"""
+
+    def __init__(self, error=None, crash=False):
+        self.error = error
+        self.crash = crash
+
+    def create_personalized_path(self, telegram_id, topic):
+        if self.crash:
+            raise RuntimeError("worker crashed")
+        if self.error:
+            return {"success": False, "error": self.error}
+        user = User.objects.get(telegram_id=telegram_id)
+        path = LearningPath.objects.create(user=user, topic=topic)
+        task = Task.objects.create(title="Intro", description="Intro")
+        user_task = UserTask.objects.create(
+            user=user, task=task, learning_path=path, order=1
+        )
+        return {
+            "success": True,
+            "path_id": path.id,
+            "tasks": [{"id": user_task.id, "title": task.title}],
+        }
+
+
+@override_settings(TESTING=True)
+class PathJobTests(TestCase):
+    """Paths are generated by a background job the client polls"""
+
+    def setUp(self):
+        self.user = User.objects.create(telegram_id="2002")
+        # The worker closes connections between jobs; keep the test transaction
+        patcher = mock.patch("agent.jobs.close_old_connections")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_job(self, agent):
+        with mock.patch.object(jobs, "_executor") as executor:
+            job = jobs.submit_path_job(self.user, "DeFi", agent)
+        self.assertEqual(job.status, "queued")
+        executor.submit.assert_called_once_with(jobs._run_path_job, job.id, agent)
+        jobs._run_path_job(job.id, agent)
+        job.refresh_from_db()
+        return job
+
+    def test_completed_job_points_at_the_path(self):
+        job = self.run_job(FakePathAgent())
+        status = jobs.get_job_status(job)
+        self.assertEqual(status["status"], "completed")
+        self.assertEqual(status["path_id"], job.learning_path_id)
+        self.assertEqual(
+            status["first_task_id"],
+            UserTask.objects.get(learning_path_id=job.learning_path_id).id,
+        )
+
+    def test_failed_generation_fails_the_job(self):
+        job = self.run_job(FakePathAgent(error="model down"))
+        self.assertEqual(
+            jobs.get_job_status(job),
+            {
+                "job_id": str(job.id),
+                "status": "failed",
+                "topic": "DeFi",
+                "error": "model down",
+            },
+        )
+
+    def test_crashed_worker_fails_the_job(self):
+        job = self.run_job(FakePathAgent(crash=True))
+        self.assertEqual((job.status, job.error), ("failed", "worker crashed"))
+
+    def test_jobs_lost_by_a_restart_fail_after_the_timeout(self):
+        queued = PathJob.objects.create(user=self.user, topic="DeFi")
+        running = PathJob.objects.create(user=self.user, topic="NFTs", status="running")
+        self.assertEqual(jobs.get_job_status(queued)["status"], "queued")
+
+        PathJob.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        for job in (queued, running):
+            job.refresh_from_db()
+            status = jobs.get_job_status(job)
+            self.assertEqual(
+                (status["status"], status["error"]), ("failed", jobs.STALE_JOB_ERROR)
+            )
+            job.refresh_from_db()
+            self.assertEqual(job.status, "failed")
+
+
+class FakeLessonAgent:
+    """Counts lesson generations; each one takes ``delay`` seconds"""
+
+    def __init__(self, delay=0.0, success=True):
+        self.delay = delay
+        self.success = success
+        self.calls = 0
+
+    def generate_lesson_content(self, task_id):
+        self.calls += 1
+        time.sleep(self.delay)
+        if not self.success:
+            return {"success": False, "error": "model down"}
+        return {"success": True, "lesson": f"Lesson {self.calls}", "quiz": []}
+
+
+class LessonContentTests(TestCase):
+    """Lessons are generated once and then served from the store"""
+
+    def setUp(self):
+        cache.clear()
+        self.task = Task.objects.create(
+            title="What is gas?", description="Gas basics", task_type="learning"
+        )
+
+    def test_lesson_is_generated_once(self):
+        agent = FakeLessonAgent()
+        first = get_lesson_content(self.task, agent)
+        cache.clear()  # Later reads fall back to the stored row
+        second = get_lesson_content(self.task, agent)
+        self.assertEqual(agent.calls, 1)
+        self.assertEqual(first["lesson"], second["lesson"])
+        self.assertEqual(TaskContent.objects.get(task=self.task).status, "ready")
+
+    def test_generation_running_elsewhere_is_reported_pending(self):
+        TaskContent.objects.create(task=self.task, status="generating")
+        agent = FakeLessonAgent()
+        result = get_lesson_content(self.task, agent)
+        self.assertTrue(result["pending"])
+        self.assertEqual(agent.calls, 0)
+
+    def test_abandoned_generation_is_retaken(self):
+        TaskContent.objects.create(task=self.task, status="generating")
+        TaskContent.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        agent = FakeLessonAgent()
+        self.assertTrue(get_lesson_content(self.task, agent)["success"])
+        self.assertEqual(agent.calls, 1)
+
+    def test_failed_generation_is_released(self):
+        result = get_lesson_content(self.task, FakeLessonAgent(success=False))
+        self.assertFalse(result["success"])
+        self.assertEqual(TaskContent.objects.get(task=self.task).status, "stale")
+        agent = FakeLessonAgent()
+        self.assertTrue(get_lesson_content(self.task, agent)["success"])
+        self.assertEqual(agent.calls, 1)
+
+    def test_invalidated_lesson_is_regenerated(self):
+        agent = FakeLessonAgent()
+        get_lesson_content(self.task, agent)
+        with mock.patch("agent.content_store.invalidate") as invalidate_views:
+            self.assertTrue(invalidate_lesson_content(self.task.id))
+        invalidate_views.assert_called_once()
+        content = TaskContent.objects.get(task=self.task)
+        self.assertEqual((content.status, content.version), ("stale", 2))
+
+        self.assertEqual(get_lesson_content(self.task, agent)["lesson"], "Lesson 2")
+        self.assertEqual(agent.calls, 2)
+        self.assertFalse(invalidate_lesson_content(self.task.id + 1))
+
+    def test_lesson_invalidated_while_generating_is_not_published(self):
+        agent = FakeLessonAgent()
+        generate = agent.generate_lesson_content
+
+        def generate_then_invalidate(task_id):
+            result = generate(task_id)
+            invalidate_lesson_content(task_id)
+            return result
+
+        agent.generate_lesson_content = generate_then_invalidate
+        self.assertEqual(get_lesson_content(self.task, agent)["lesson"], "Lesson 1")
+        self.assertEqual(TaskContent.objects.get(task=self.task).status, "stale")
+        self.assertEqual(get_lesson_content(self.task, agent)["lesson"], "Lesson 2")
+
+
+class ConcurrentLessonContentTests(TransactionTestCase):
+    """Concurrent first reads in one process share a single generation"""
+
+    def setUp(self):
+        cache.clear()
+        self.task = Task.objects.create(
+            title="What is gas?", description="Gas basics", task_type="learning"
+        )
+
+    def test_concurrent_first_reads_generate_once(self):
+        agent = FakeLessonAgent(delay=0.2)
+        results = []
+
+        def read():
+            try:
+                results.append(get_lesson_content(self.task, agent))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=read) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(agent.calls, 1)
+        self.assertEqual({result["lesson"] for result in results}, {"Lesson 1"})
+
+
+SENDER = "0x" + "1" * 40
+POOL = "0x" + "3" * 40
+
+
+def swap_log(sender=SENDER, amount=1000, pool=POOL, memo="hello"):
+    """Indexed receipt log for Swap(address indexed, uint256, string indexed)"""
+    return {
+        "address": pool,
+        "topics": [
+            "0x" + Web3.keccak(text="Swap(address,uint256,string)").hex(),
+            "0x" + "0" * 24 + sender[2:],
+            "0x" + Web3.keccak(text=memo).hex(),
+        ],
+        "data": "0x" + encode(["uint256"], [amount]).hex(),
+    }
+
+
+def indexed_tx(**fields):
+    fields = {
+        "status": 1,
+        "to_address": POOL,
+        "selector": "0xa9059cbb",
+        "logs": [swap_log()],
+        **fields,
+    }
+    return VerifiedTransaction(tx_hash=TX_HASH, **fields)
+
+
+class RequirementMatcherTests(TestCase):
+    """Task requirements compile to matchers over indexed transactions"""
+
+    swap = "Swap(address indexed sender, uint256 amountIn, string indexed memo)"
+
+    def check(self, requirements, **fields):
+        return compile_requirements(requirements).check(indexed_tx(**fields))
+
+    def test_recipient_and_selector(self):
+        requirements = {"to_address": POOL, "selector": "transfer(address, uint256)"}
+        self.assertIsNone(self.check(requirements))
+        self.assertEqual(
+            self.check(requirements, to_address=SENDER), "Wrong recipient address"
+        )
+        self.assertEqual(
+            self.check(requirements, selector="0x095ea7b3"),
+            "Wrong contract function called",
+        )
+        self.assertEqual(self.check(requirements, status=0), "Transaction failed")
+
+    def test_event_topics_and_data(self):
+        requirements = {
+            "event": {
+                "signature": self.swap,
+                "address": POOL,
+                "args": {
+                    "sender": SENDER,
+                    "amountIn": {"gte": "1000", "lt": 5000},
+                    "memo": "hello",
+                },
+            }
+        }
+        self.assertIsNone(self.check(requirements))
+        missing = "Required event not found in transaction logs"
+        for log in (
+            swap_log(amount=999),
+            swap_log(sender="0x" + "4" * 40),
+            swap_log(pool=SENDER),
+            swap_log(memo="bye"),
+        ):
+            self.assertEqual(self.check(requirements, logs=[log]), missing)
+        self.assertEqual(self.check(requirements, logs=[]), missing)
+
+    def test_event_abi(self):
+        abi = {
+            "name": "Swap",
+            "inputs": [
+                {"type": "address", "name": "sender", "indexed": True},
+                {"type": "uint", "name": "amountIn"},
+                {"type": "string", "name": "memo", "indexed": True},
+            ],
+        }
+        requirements = {"events": [{"abi": abi, "args": {"amountIn": 1000}}]}
+        self.assertIsNone(self.check(requirements))
+
+    def test_invalid_requirements_are_rejected(self):
+        for requirements in (
+            {"selector": "0x1234"},
+            {"event": {"signature": "Swap("}},
+            {"event": {"signature": self.swap, "args": {"amount": 1}}},
+            {"event": {"signature": self.swap, "args": {"amountIn": {"in": [1]}}}},
+            {"event": {"signature": self.swap, "args": {"memo": {"gt": "a"}}}},
+            {"event": {"signature": "Swap((uint256,uint256) pair)"}},
+        ):
+            with self.assertRaises(RequirementError):
+                compile_requirements(requirements)
+
+    def test_task_matchers_are_cached_until_requirements_change(self):
+        task = Task.objects.create(
+            title="Swap",
+            description="Swap",
+            verification_data={"requirements": {"to_address": POOL}},
+        )
+        matcher = get_task_matcher(task)
+        self.assertIs(get_task_matcher(task), matcher)
+
+        task.verification_data = {"requirements": {"to_address": SENDER}}
+        self.assertIsNot(get_task_matcher(task), matcher)
+        self.assertEqual(get_task_matcher(task).to_address, SENDER)
+
+
+def rpc_tx(sender="0x" + "1" * 40):
+    """JSON-RPC transaction and receipt for a successful plain transfer"""
+    tx = {"from": sender, "to": "0x" + "2" * 40, "input": "0x"}
+    receipt = {"blockNumber": "0x64", "status": "0x1", "logs": []}
+    return tx, receipt
+
+
+@override_settings(TESTING=True)
+class BulkVerifyTests(TestCase):
+    """Quest proofs are checked with batched RPC and applied in bulk"""
+
+    def setUp(self):
+        tx_index._block_numbers.clear()
+        self.quest = Task.objects.create(
+            title="Bridge",
+            description="Bridge to Gnosis",
+            task_type="quest",
+            verification_type="transaction",
+            xp_reward=10,
+        )
+        self.user_tasks = [
+            UserTask.objects.create(
+                user=User.objects.create(telegram_id=f"1010{i}"),
+                task=self.quest,
+                status="active",
+            )
+            for i in range(3)
+        ]
+        self.batches = []
+
+        def rpc_batch(calls, chain, chain_provider):
+            self.batches.append(calls)
+            return [part for _ in calls[::2] for part in rpc_tx()]
+
+        patcher = mock.patch("agent.tx_index.rpc_batch", side_effect=rpc_batch)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.provider = fake_chain()
+
+    def verify(self, proofs, quest=None):
+        return list(
+            bulk_verify.verify_proofs_bulk(
+                (quest or self.quest).id, proofs, chain_provider=self.provider
+            )
+        )
+
+    def test_proofs_share_one_batched_rpc_request(self):
+        proofs = [(ut.id, f"0x{ut.id:064x}") for ut in self.user_tasks]
+        results = self.verify(proofs)
+
+        self.assertEqual([r["verified"] for r in results], [True] * 3)
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(len(self.batches[0]), 6)
+        for user_task in self.user_tasks:
+            user_task.refresh_from_db()
+            self.assertEqual(user_task.status, "verified")
+            self.assertEqual(
+                VerifiedTransaction.objects.get(
+                    tx_hash=f"0x{user_task.id:064x}"
+                ).user_task_id,
+                user_task.id,
+            )
+
+    def test_transaction_claimed_during_the_lookup_is_not_credited_twice(self):
+        first, other = self.user_tasks[:2]
+        lookup = bulk_verify.lookup_transactions_bulk
+
+        # Another proof binds the hash after its owner was read
+        def lookup_then_claim(tx_hashes, *args):
+            records = list(lookup(tx_hashes, *args))
+            self.assertTrue(tx_index.claim_transaction(TX_HASH, other))
+            return records
+
+        with mock.patch(
+            "agent.bulk_verify.lookup_transactions_bulk", lookup_then_claim
+        ):
+            results = self.verify([(first.id, TX_HASH)])
+
+        self.assertFalse(results[0]["verified"])
+        self.assertEqual(results[0]["reason"], "Transaction already used as proof")
+        first.refresh_from_db()
+        self.assertEqual(first.status, "active")
+        self.assertEqual(User.objects.get(id=first.user_id).xp_points, 0)
+        self.assertEqual(tx_index.find_proof_owner(TX_HASH), other.id)
+
+    def test_tasks_of_other_quests_are_not_found(self):
+        other = Task.objects.create(
+            title="Swap",
+            description="Swap",
+            task_type="quest",
+            verification_type="transaction",
+        )
+        results = self.verify([(self.user_tasks[0].id, TX_HASH)], quest=other)
+
+        self.assertEqual(results[0]["reason"], "Task not found")
+        self.user_tasks[0].refresh_from_db()
+        self.assertEqual(self.user_tasks[0].status, "active")
+
+    def test_tasks_without_transaction_verification_are_not_found(self):
+        self.quest.verification_type = "quiz"
+        self.quest.save()
+        results = self.verify([(self.user_tasks[0].id, TX_HASH)])
+
+        self.assertEqual(results[0]["reason"], "Task not found")
+
+    def test_closed_tasks_are_rejected(self):
+        failed = self.user_tasks[0]
+        failed.status = "failed"
+        failed.verification_data = {"transaction_hash": TX_HASH}
+        failed.save()
+        results = self.verify([(failed.id, TX_HASH)])
+
+        self.assertEqual(results[0]["reason"], "Task is not open")
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, "failed")
+        self.assertEqual(bulk_verify.pending_quest_proofs(self.quest.id), [])
+
+    def test_errors_while_streaming_end_the_body_with_an_error_line(self):
+        def results(*args, **kwargs):
+            yield {"user_task_id": 1, "verified": True}
+            raise RuntimeError("RPC node went away")
+
+        with mock.patch("agent.views.verify_proofs_bulk", results):
+            response = self.client.post(
+                reverse("verify_quest_proofs", kwargs={"quest_id": self.quest.id}),
+                data=json.dumps({"proofs": []}),
+                content_type="application/json",
+            )
+            lines = b"".join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(lines[0])["user_task_id"], 1)
+        self.assertEqual(json.loads(lines[-1]), {"error": "RPC node went away"})
+
+
+@override_settings(TESTING=True)
+class ChainIndexerTests(TestCase):
+    """Block scans complete open transaction tasks sent by watched wallets"""
+
+    def setUp(self):
+        tx_index._block_numbers.clear()
+        user = User.objects.create(
+            telegram_id="1212", wallet_addresses={"gnosis": SENDER}
+        )
+        quest = Task.objects.create(
+            title="Bridge",
+            description="Bridge to Gnosis",
+            task_type="quest",
+            verification_type="transaction",
+            verification_data={"requirements": {"to_address": POOL}},
+            xp_reward=10,
+        )
+        self.user_task = UserTask.objects.create(user=user, task=quest, status="active")
+        self.blocks = {}  # block number -> (hash, from, to) transactions
+        self.missing = set()  # block numbers the node does not serve yet
+        self.requested = []  # block numbers fetched
+        self.receipts = []  # tx hashes whose receipts were fetched
+
+        def rpc_batch(calls, chain, chain_provider):
+            results = []
+            for method, params in calls:
+                if method == "eth_getBlockByNumber":
+                    number = int(params[0], 16)
+                    self.requested.append(number)
+                    results.append(self.block(number))
+                else:
+                    self.receipts.append(params[0])
+                    results.append(rpc_tx()[1])
+            return results
+
+        patcher = mock.patch("agent.chain_indexer.rpc_batch", side_effect=rpc_batch)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.provider = fake_chain(head_block=200)
+
+    def block(self, number):
+        if number in self.missing:
+            return None
+        transactions = [
+            {"hash": tx_hash, "from": sender, "to": to, "input": "0x"}
+            for tx_hash, sender, to in self.blocks.get(number, [])
+        ]
+        timestamp = hex(int(timezone.now().timestamp()))
+        return {"timestamp": timestamp, "transactions": transactions}
+
+    def scan(self, from_block, to_block):
+        index = chain_indexer.build_task_index("gnosis")
+        return chain_indexer.scan_range(
+            "gnosis", from_block, to_block, index, 200, self.provider
+        )
+
+    def test_range_scan_completes_tasks_sent_by_the_wallet(self):
+        stranger = "0x" + "5" * 40
+        self.blocks[101] = [("0x" + "aa" * 32, stranger, POOL)]
+        self.blocks[102] = [(TX_HASH, SENDER, POOL)]
+
+        self.assertEqual(self.scan(100, 103), 1)
+        self.assertEqual(self.requested, [100, 101, 102, 103])
+        self.assertEqual(self.receipts, [TX_HASH])
+        self.user_task.refresh_from_db()
+        self.assertEqual(self.user_task.status, "verified")
+        self.assertEqual(
+            VerifiedTransaction.objects.get(tx_hash=TX_HASH).user_task_id,
+            self.user_task.id,
+        )
+
+    def test_wallet_seen_only_in_logs_does_not_complete_the_task(self):
+        # A transfer to the wallet names it in a log topic, but it was not sent
+        self.blocks[101] = [(TX_HASH, "0x" + "5" * 40, POOL)]
+
+        self.assertEqual(self.scan(100, 103), 0)
+        self.assertEqual(self.receipts, [])
+        self.user_task.refresh_from_db()
+        self.assertEqual(self.user_task.status, "active")
+
+    def test_transactions_that_miss_the_requirements_are_skipped(self):
+        self.blocks[101] = [(TX_HASH, SENDER, "0x" + "5" * 40)]
+
+        self.assertEqual(self.scan(101, 101), 0)
+        self.user_task.refresh_from_db()
+        self.assertEqual(self.user_task.status, "active")
+
+    def test_first_pass_starts_at_the_confirmed_head(self):
+        result = chain_indexer.run_indexer_pass("gnosis", self.provider)
+
+        self.assertEqual(result["from_block"], 189)
+        self.assertEqual(result["to_block"], 188)
+        self.assertEqual(self.requested, [])
+        self.assertEqual(ChainCheckpoint.objects.get(chain="gnosis").block_number, 188)
+
+    def test_passes_resume_from_the_checkpoint(self):
+        ChainCheckpoint.objects.create(chain="gnosis", block_number=90)
+        self.missing.add(96)
+
+        with mock.patch("agent.chain_indexer.BLOCK_CHUNK", 5):
+            failed = chain_indexer.run_indexer_pass("gnosis", self.provider, 20)
+            self.assertFalse(failed["success"])
+            # The chunk before the missing block is kept
+            self.assertEqual(
+                ChainCheckpoint.objects.get(chain="gnosis").block_number, 95
+            )
+
+            self.missing.clear()
+            self.requested.clear()
+            result = chain_indexer.run_indexer_pass("gnosis", self.provider, 20)
+
+        self.assertTrue(result["success"])
+        self.assertEqual((result["from_block"], result["to_block"]), (96, 115))
+        self.assertEqual(self.requested, list(range(96, 116)))
+        self.assertEqual(ChainCheckpoint.objects.get(chain="gnosis").block_number, 115)
+
+
+class PathProgressTests(TestCase):
+    """Learning path counters follow their tasks without per-task queries"""
+
+    def setUp(self):
+        self.user = User.objects.create(telegram_id="1313")
+        self.task = Task.objects.create(title="Read", description="Read")
+        self.paths = [
+            LearningPath.objects.create(user=self.user, topic=f"Topic {i}")
+            for i in range(3)
+        ]
+
+    def test_many_paths_and_tasks_refresh_in_one_query(self):
+        # bulk_create skips the signals, leaving the counters stale
+        UserTask.objects.bulk_create(
+            UserTask(
+                user=self.user,
+                task=self.task,
+                learning_path=path,
+                order=order,
+                status="verified" if order % 3 == 0 else "active",
+            )
+            for path in self.paths
+            for order in range(30)
+        )
+        with self.assertNumQueries(1):
+            refresh_path_progress(path.id for path in self.paths)
+
+        for path in self.paths:
+            path.refresh_from_db()
+            self.assertEqual((path.task_count, path.completed_task_count), (30, 10))
+
+    def test_saves_and_deletes_keep_counters_current(self):
+        path = self.paths[0]
+        user_task = UserTask.objects.create(
+            user=self.user, task=self.task, learning_path=path
+        )
+        user_task.status = "completed"
+        user_task.save()
+        path.refresh_from_db()
+        self.assertEqual((path.task_count, path.completed_task_count), (1, 1))
+
+        user_task.delete()
+        path.refresh_from_db()
+        self.assertEqual((path.task_count, path.completed_task_count), (0, 0))
+
+
+class LessonStreamTests(TestCase):
+    """Lessons stream as server-sent events and are stored once finished"""
+
+    def setUp(self):
+        cache.clear()
+        self.task = Task.objects.create(
+            title="What is a DEX?", description="DEX basics", task_type="learning"
+        )
+        self.llm = LLMClient(StubBackend())
+        patcher = mock.patch.object(views.ai_agent, "llm", self.llm)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def stream(self):
+        response = self.client.get(
+            reverse("stream_task_content", kwargs={"task_id": self.task.id})
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = []
+        for block in read_stream(response).decode().strip().split("\n\n"):
+            event, data = block.split("\n")
+            events.append((event[len("event: ") :], json.loads(data[len("data: ") :])))
+        return events
+
+    def test_lesson_is_streamed_then_stored(self):
+        events = self.stream()
+        names = [event for event, _ in events]
+        self.assertGreater(names.count("lesson"), 1)
+        self.assertEqual(names.count("quiz"), 1)
+        self.assertEqual(names[-1], "done")
+        lesson = "".join(data["delta"] for event, data in events if event == "lesson")
+
+        content = TaskContent.objects.get(task=self.task)
+        self.assertEqual((content.status, content.lesson), ("ready", lesson))
+        self.task.refresh_from_db()
+        self.assertEqual(len(self.task.verification_data["answers"]), 3)
+
+        # Later reads, streamed or not, come from the store
+        with mock.patch.object(self.llm, "astream") as astream, mock.patch.object(
+            self.llm, "complete"
+        ) as complete:
+            events = self.stream()
+            response = self.client.get(
+                reverse("get_task_content", kwargs={"task_id": self.task.id})
+            )
+        astream.assert_not_called()
+        complete.assert_not_called()
+        self.assertEqual(events[0], ("lesson", {"delta": lesson}))
+        self.assertEqual(response.json()["lesson"], lesson)
+
+    def test_failed_stream_releases_the_lesson(self):
+        with mock.patch.object(
+            views.ai_agent, "generate_quiz", side_effect=ValueError("bad quiz")
+        ):
+            events = self.stream()
+        self.assertEqual(events[-1], ("error", {"error": "bad quiz"}))
+        self.assertEqual(TaskContent.objects.get(task=self.task).status, "stale")
+
+    def test_failed_async_read_releases_the_lesson_before_returning(self):
+        from .content_store import _release, aget_lesson_content
+
+        released = []
+
+        def release(content):
+            _release(content)
+            released.append(content.task_id)
+
+        async def read():
+            result = await aget_lesson_content(self.task, views.ai_agent)
+            # Before the event loop runs anything else, e.g. a GC-time close
+            return result, list(released)
+
+        with mock.patch.object(
+            views.ai_agent, "generate_quiz", side_effect=ValueError("bad quiz")
+        ), mock.patch("agent.content_store._release", release):
+            result, released_on_return = async_to_sync(read)()
+        self.assertEqual(result, {"success": False, "error": "bad quiz"})
+        self.assertEqual(released_on_return, [self.task.id])
+        self.assertEqual(TaskContent.objects.get(task=self.task).status, "stale")
+
+
+@override_settings(TESTING=True)
+class ClaimTokensTests(TestCase):
+    """claim_tokens costs the same for any number of rewards and pays once"""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            telegram_id="4004", wallet_addresses={"gnosis": "0x" + "4" * 40}
+        )
+        self.task = Task.objects.create(
+            title="Swap",
+            description="Swap tokens",
+            task_type="practice",
+            token_reward=5,
+        )
+        patcher = mock.patch(
+            "agent.claims.aissue_token_reward",
+            return_value={"success": True, "tx_hash": "0x" + "a" * 64},
+        )
+        self.transfer = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add_rewards(self, count):
+        UserTask.objects.bulk_create(
+            [
+                UserTask(user=self.user, task=self.task, status="verified")
+                for _ in range(count)
+            ]
+        )
+
+    def claim(self):
+        url = reverse("claim_tokens", kwargs={"telegram_id": self.user.telegram_id})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, "{}", content_type="application/json")
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_rewards(self):
+        self.add_rewards(1)
+        _, few = self.claim()
+        self.add_rewards(20)
+        response, many = self.claim()
+        self.assertEqual(response.json()["tasks_claimed"], 20)
+        self.assertEqual(few, many)
+
+    def test_paid_rewards_are_not_claimed_again(self):
+        self.add_rewards(3)
+        response, _ = self.claim()
+        self.assertEqual(response.json()["tokens_claimed"], 15)
+        response, _ = self.claim()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.transfer.call_count, 1)
+
+    def test_failed_claim_is_retried_with_the_same_rewards(self):
+        self.add_rewards(2)
+        self.transfer.side_effect = ConnectionError("rpc down")
+        response, _ = self.claim()
+        self.assertEqual(response.status_code, 400)
+
+        self.transfer.side_effect = None
+        self.add_rewards(1)
+        response, _ = self.claim()
+        claim = ClaimBatch.objects.get()
+        self.assertEqual(response.json()["claim_id"], str(claim.id))
+        self.assertEqual((claim.status, claim.attempts, claim.amount), ("sent", 2, 10))
+        # The reward earned after the first claim waits for the next one
+        self.assertEqual(UserTask.objects.filter(claim_batch__isnull=True).count(), 1)
+
+    def test_retry_resends_the_signed_transfer(self):
+        self.add_rewards(2)
+
+        async def sign_then_fail(*args, on_signed, **kwargs):
+            await on_signed("0xf86b", "0x" + "b" * 64)
+            raise ConnectionError("rpc down")
+
+        self.transfer.side_effect = sign_then_fail
+        response, _ = self.claim()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ClaimBatch.objects.get().raw_tx, "0xf86b")
+
+        with mock.patch(
+            "agent.claims.arebroadcast_transaction", return_value="0x" + "b" * 64
+        ) as resend:
+            response, _ = self.claim()
+        resend.assert_called_once_with("0xf86b", "gnosis", None)
+        self.assertEqual(self.transfer.call_count, 1)
+        self.assertEqual(response.json()["tx_hash"], "0x" + "b" * 64)
+
+    def test_transfer_whose_nonce_was_reused_is_signed_again(self):
+        self.add_rewards(1)
+        ClaimBatch.objects.create(
+            user=self.user,
+            wallet_address=self.user.wallet_addresses["gnosis"],
+            amount=5,
+            task_count=1,
+            status="failed",
+            raw_tx="0xf86b",
+        )
+        with mock.patch(
+            "agent.claims.arebroadcast_transaction", return_value=None
+        ) as resend:
+            response, _ = self.claim()
+        self.assertEqual(resend.call_count, 1)
+        self.assertEqual(self.transfer.call_count, 1)
+        self.assertEqual(response.json()["tx_hash"], "0x" + "a" * 64)
+
+    def test_rebroadcast_outcomes(self):
+        raw_tx = "0xf86b"
+        tx_hash = Web3.to_hex(Web3.keccak(hexstr=raw_tx))
+
+        def resend(error, receipt=None):
+            async def arpc(method, params, chain, chain_provider):
+                if method == "eth_getTransactionReceipt":
+                    return receipt
+                if error:
+                    raise RPCError(error)
+                return tx_hash
+
+            with mock.patch("agent.blockchain.arpc", arpc):
+                return async_to_sync(arebroadcast_transaction)(raw_tx)
+
+        self.assertEqual(resend(None), tx_hash)
+        self.assertEqual(resend("already known"), tx_hash)
+        self.assertEqual(resend("nonce too low", receipt={"status": "0x1"}), tx_hash)
+        self.assertIsNone(resend("nonce too low"))
+        with self.assertRaises(RPCError):
+            resend("insufficient funds")
+
+    def test_abandoned_sending_claim_is_retaken_after_the_timeout(self):
+        self.add_rewards(1)
+        claim = ClaimBatch.objects.create(
+            user=self.user,
+            wallet_address=self.user.wallet_addresses["gnosis"],
+            amount=5,
+            task_count=1,
+            status="sending",
+            sending_at=timezone.now(),
+        )
+        UserTask.objects.update(claim_batch=claim)
+        response, _ = self.claim()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.transfer.call_count, 0)
+
+        ClaimBatch.objects.update(sending_at=timezone.now() - timedelta(hours=1))
+        response, _ = self.claim()
+        self.assertEqual(response.json()["claim_id"], str(claim.id))
+        self.assertEqual(self.transfer.call_count, 1)
+
+
+class BadgeMintTests(TestCase):
+    """claim_nft mints each level's badge once, however often it is called"""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            telegram_id="4114", level=3, wallet_addresses={"gnosis": "0x" + "4" * 40}
+        )
+        patcher = mock.patch(
+            "agent.claims.amint_nft_badge",
+            return_value={"success": True, "tx_hash": "0x" + "c" * 64},
+        )
+        self.mint = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def claim(self):
+        url = reverse("claim_nft", kwargs={"telegram_id": self.user.telegram_id})
+        return self.client.post(url, "{}", content_type="application/json")
+
+    def test_each_level_is_minted_once(self):
+        data = self.claim().json()
+        self.assertEqual(
+            (data["tx_hash"], data["token_uri"], data["level"]),
+            ("0x" + "c" * 64, "ipfs://badge/level_3_badge", 3),
+        )
+        response = self.claim()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.mint.call_count, 1)
+
+        User.objects.filter(id=self.user.id).update(level=4)
+        self.assertEqual(self.claim().json()["level"], 4)
+        self.assertEqual(self.mint.call_count, 2)
+        self.assertEqual(
+            list(BadgeMint.objects.order_by("level").values_list("level", "status")),
+            [(3, "sent"), (4, "sent")],
+        )
+
+    def test_retry_resends_the_signed_mint(self):
+        async def sign_then_fail(*args, on_signed, **kwargs):
+            await on_signed("0xf86b", "0x" + "d" * 64)
+            raise ConnectionError("rpc down")
+
+        self.mint.side_effect = sign_then_fail
+        self.assertEqual(self.claim().status_code, 400)
+        self.assertEqual(BadgeMint.objects.get().status, "failed")
+
+        with mock.patch(
+            "agent.claims.arebroadcast_transaction", return_value="0x" + "d" * 64
+        ):
+            data = self.claim().json()
+        self.assertEqual(data["tx_hash"], "0x" + "d" * 64)
+        self.assertEqual(self.mint.call_count, 1)
+
+    def test_mint_in_progress_is_not_sent_again(self):
+        BadgeMint.objects.create(
+            user=self.user,
+            level=3,
+            wallet_address=self.user.wallet_addresses["gnosis"],
+            token_uri="ipfs://badge/level_3_badge",
+            status="sending",
+            sending_at=timezone.now(),
+        )
+        self.assertEqual(self.claim().status_code, 409)
+        self.mint.assert_not_called()
+
+
+@override_settings(TESTING=True)
+class AsyncViewTests(TestCase):
+    """Async views wait on the chain without holding up other requests"""
+
+    def setUp(self):
+        task = Task.objects.create(
+            title="Swap",
+            description="Swap on a DEX",
+            task_type="quest",
+            verification_type="transaction",
+            xp_reward=10,
+        )
+        self.user_tasks = [
+            UserTask.objects.create(
+                user=User.objects.create(telegram_id=f"500{i}"),
+                task=task,
+                status="active",
+            )
+            for i in range(2)
+        ]
+        for patcher in (
+            mock.patch("agent.blockchain.get_chain_provider"),
+            mock.patch("agent.ai_core.random", return_value=1.0),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_slow_chain_lookups_overlap(self):
+        waiting = []
+        both_waiting = asyncio.Event()
+
+        async def slow_rpc_batch(calls, chain, chain_provider):
+            waiting.append(calls[0][1][0])
+            if len(waiting) == 2:
+                both_waiting.set()
+            # Answers only once both requests are waiting on the node
+            await asyncio.wait_for(both_waiting.wait(), 5)
+            tx = {"from": "0x" + "1" * 40, "to": "0x" + "2" * 40, "input": "0x"}
+            receipt = {"blockNumber": "0x1", "status": "0x1", "logs": []}
+            return [tx, receipt, "0x100"]
+
+        with mock.patch("agent.tx_index.arpc_batch", slow_rpc_batch):
+            responses = await asyncio.gather(
+                *(
+                    self.async_client.post(
+                        reverse("verify_task", kwargs={"user_task_id": user_task.id}),
+                        {"proof": {"transaction_hash": f"0x{i:064x}"}},
+                        content_type="application/json",
+                    )
+                    for i, user_task in enumerate(self.user_tasks, 1)
+                )
+            )
+
+        self.assertEqual(len(waiting), 2)
+        for response in responses:
+            self.assertEqual(response.json()["xp_earned"], 10)
+        self.assertEqual(await UserTask.objects.filter(status="verified").acount(), 2)
+
+    async def test_suggestions_do_not_hold_up_the_response(self):
+        release = threading.Event()
+        suggested = threading.Event()
+
+        def slow_suggestion(user):
+            release.wait(5)  # A model call, as far as the view can tell
+            suggested.set()
+
+        agent = LearnEarnAIAgent(llm=LLMClient(StubBackend()))
+        agent._suggest_next_task = slow_suggestion
+        agent._verify_by_type = lambda user_task, proof: {"success": True}
+        task = self.user_tasks[0].task
+        task.verification_type = "quiz"
+        await task.asave()
+
+        with mock.patch("agent.ai_core.random", return_value=0.0):
+            result = await agent.averify_task_completion(self.user_tasks[0].id, {})
+        self.assertEqual(result, {"success": True})
+        self.assertFalse(suggested.is_set())
+        release.set()
+        self.assertTrue(await asyncio.to_thread(suggested.wait, 5))
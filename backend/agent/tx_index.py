@@ -0,0 +1,227 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+from .blockchain import arpc_batch, get_chain_provider, rpc_batch
+from .models import VerifiedTransaction
+
+logger = logging.getLogger(__name__)
+
+# Blocks on top of a transaction before its indexed result is treated as final
+CONFIRMATION_DEPTHS = getattr(
+    settings, "TX_CONFIRMATION_DEPTHS", {"gnosis": 12, "rootstock": 12}
+)
+BLOCK_NUMBER_TTL = 3  # Seconds a fetched head block number is reused
+RPC_BATCH_SIZE = 100  # Transactions per JSON-RPC batch request
+RPC_CONCURRENCY = 4  # Batch requests in flight at once
+
+_block_numbers = {}
+
+
+def normalize_tx_hash(tx_hash):
+    tx_hash = str(tx_hash).strip().lower()
+    return tx_hash if tx_hash.startswith("0x") else f"0x{tx_hash}"
+
+
+def get_head_block(chain, web3):
+    """Latest block number for a chain, refreshed every few seconds"""
+    cached = _block_numbers.get(chain)
+    if cached and time.monotonic() - cached[0] < BLOCK_NUMBER_TTL:
+        return cached[1]
+    block_number = web3.eth.block_number
+    _block_numbers[chain] = (time.monotonic(), block_number)
+    return block_number
+
+
+def find_proof_owner(tx_hash, chain="gnosis"):
+    """Id of the user task that already used this transaction as proof"""
+    return (
+        VerifiedTransaction.objects.filter(
+            chain=chain, tx_hash=normalize_tx_hash(tx_hash)
+        )
+        .values_list("user_task_id", flat=True)
+        .first()
+    )
+
+
+def lookup_transaction(tx_hash, chain="gnosis", chain_provider=None):
+    """Indexed record for a transaction, fetched from the chain until final
+
+    Returns None when the chain does not know the transaction (yet).
+    """
+    tx_hash = normalize_tx_hash(tx_hash)
+    record = VerifiedTransaction.objects.filter(chain=chain, tx_hash=tx_hash).first()
+    if record and record.is_final and record.logs is not None:
+        return record
+
+    chain_provider = chain_provider or get_chain_provider()
+    web3 = chain_provider.get_web3(chain)
+    try:
+        tx = web3.eth.get_transaction(tx_hash)
+        tx_receipt = web3.eth.get_transaction_receipt(tx_hash)
+    except TransactionNotFound:
+        return None
+
+    depth = get_head_block(chain, web3) - tx_receipt.blockNumber
+    fields = {
+        "from_address": tx["from"].lower(),
+        "to_address": tx.to.lower() if tx.to else None,
+        "status": tx_receipt.status,
+        "block_number": tx_receipt.blockNumber,
+        "selector": _selector(Web3.to_hex(tx["input"])),
+        "logs": [
+            {
+                "address": log.address.lower(),
+                "topics": [Web3.to_hex(topic) for topic in log.topics],
+                "data": Web3.to_hex(log.data),
+            }
+            for log in tx_receipt.logs
+        ],
+        "is_final": depth >= CONFIRMATION_DEPTHS.get(chain, 12),
+    }
+    record, _ = VerifiedTransaction.objects.update_or_create(
+        chain=chain, tx_hash=tx_hash, defaults=fields
+    )
+    return record
+
+
+async def alookup_transaction(tx_hash, chain="gnosis", chain_provider=None):
+    """lookup_transaction for async callers: one batched RPC request, awaited"""
+    tx_hash = normalize_tx_hash(tx_hash)
+    record = await VerifiedTransaction.objects.filter(
+        chain=chain, tx_hash=tx_hash
+    ).afirst()
+    if record and record.is_final and record.logs is not None:
+        return record
+
+    tx, receipt, head_block = await arpc_batch(
+        [
+            ("eth_getTransactionByHash", [tx_hash]),
+            ("eth_getTransactionReceipt", [tx_hash]),
+            ("eth_blockNumber", []),
+        ],
+        chain,
+        chain_provider,
+    )
+    if not tx or not receipt:
+        return None
+    record = record_from_rpc(tx_hash, tx, receipt, chain, int(head_block, 16))
+    await sync_to_async(upsert_records)([record])
+    return record
+
+
+def claim_transaction(tx_hash, user_task, chain="gnosis"):
+    """Bind a transaction to the user task it proves; False if already taken"""
+    tx_hash = normalize_tx_hash(tx_hash)
+    claimed = VerifiedTransaction.objects.filter(
+        chain=chain, tx_hash=tx_hash, user_task__isnull=True
+    ).update(user_task=user_task)
+    return bool(claimed) or find_proof_owner(tx_hash, chain) == user_task.id
+
+
+def lookup_transactions_bulk(
+    tx_hashes,
+    chain="gnosis",
+    chain_provider=None,
+    batch_size=RPC_BATCH_SIZE,
+    concurrency=RPC_CONCURRENCY,
+):
+    """Yield (tx_hash, record or None) for every hash, in input order
+
+    Final transactions come from the index. The rest are fetched with
+    JSON-RPC batch requests (transaction and receipt per hash), several
+    batches in flight at once, and upserted into the index batch by batch.
+    """
+    chain_provider = chain_provider or get_chain_provider()
+    tx_hashes = [normalize_tx_hash(tx_hash) for tx_hash in tx_hashes]
+    known = {
+        record.tx_hash: record
+        for record in VerifiedTransaction.objects.filter(
+            chain=chain, tx_hash__in=tx_hashes, is_final=True, logs__isnull=False
+        )
+    }
+    pending = [tx_hash for tx_hash in dict.fromkeys(tx_hashes) if tx_hash not in known]
+    chunks = [pending[i : i + batch_size] for i in range(0, len(pending), batch_size)]
+    head_block = get_head_block(chain, chain_provider.get_web3(chain)) if pending else 0
+
+    def fetch(chunk):
+        calls = []
+        for tx_hash in chunk:
+            calls.append(("eth_getTransactionByHash", [tx_hash]))
+            calls.append(("eth_getTransactionReceipt", [tx_hash]))
+        results = rpc_batch(calls, chain, chain_provider)
+        return [
+            (tx_hash, results[2 * i], results[2 * i + 1])
+            for i, tx_hash in enumerate(chunk)
+        ]
+
+    position = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # map keeps chunk order, so results can be streamed as they resolve
+        for fetched in executor.map(fetch, chunks):
+            records = [
+                record_from_rpc(tx_hash, tx, receipt, chain, head_block)
+                for tx_hash, tx, receipt in fetched
+                if tx and receipt
+            ]
+            upsert_records(records)
+            for record in records:
+                known[record.tx_hash] = record
+            for tx_hash, _, _ in fetched:
+                known.setdefault(tx_hash, None)
+
+            while position < len(tx_hashes) and tx_hashes[position] in known:
+                yield tx_hashes[position], known[tx_hashes[position]]
+                position += 1
+
+    for tx_hash in tx_hashes[position:]:
+        yield tx_hash, known.get(tx_hash)
+
+
+def _selector(calldata):
+    """First four bytes of calldata as 0x-hex, empty for plain transfers"""
+    return calldata[:10].lower() if len(calldata) >= 10 else ""
+
+
+def record_from_rpc(tx_hash, tx, receipt, chain, head_block):
+    block_number = int(receipt["blockNumber"], 16)
+    return VerifiedTransaction(
+        tx_hash=tx_hash,
+        chain=chain,
+        from_address=tx["from"].lower(),
+        to_address=tx["to"].lower() if tx.get("to") else None,
+        status=int(receipt["status"], 16),
+        block_number=block_number,
+        selector=_selector(tx.get("input", "")),
+        logs=[
+            {
+                "address": log["address"].lower(),
+                "topics": [topic.lower() for topic in log["topics"]],
+                "data": log["data"],
+            }
+            for log in receipt.get("logs", [])
+        ],
+        is_final=head_block - block_number >= CONFIRMATION_DEPTHS.get(chain, 12),
+    )
+
+
+def upsert_records(records):
+    if records:
+        VerifiedTransaction.objects.bulk_create(
+            records,
+            update_conflicts=True,
+            unique_fields=["chain", "tx_hash"],
+            update_fields=[
+                "from_address",
+                "to_address",
+                "status",
+                "block_number",
+                "selector",
+                "logs",
+                "is_final",
+                "updated_at",
+            ],
+        )
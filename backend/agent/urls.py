@@ -18,6 +18,11 @@ urlpatterns = [
     path(
         "learning/paths/create/", views.start_learning_path, name="create_learning_path"
     ),
+    path(
+        "learning/paths/jobs/<uuid:job_id>/",
+        views.get_path_job,
+        name="get_path_job",
+    ),
     path(
         "learning/paths/user/<str:telegram_id>/",
         views.get_user_paths,
@@ -31,6 +36,12 @@ urlpatterns = [
     ),
     path("tasks/start/<int:user_task_id>/", views.start_task, name="start_task"),
     path("tasks/verify/<int:user_task_id>/", views.verify_task, name="verify_task"),
+    path(
+        "tasks/grading/<uuid:grading_id>/",
+        views.get_grading_status,
+        name="get_grading_status",
+    ),
+    path("tasks/grading/metrics/", views.get_grading_metrics, name="grading_metrics"),
     # Quest system
     path(
         "quests/available/<str:telegram_id>/",
@@ -57,10 +68,20 @@ urlpatterns = [
         views.create_project_quest,
         name="create_project_quest",
     ),
+    path(
+        "projects/quests/<int:quest_id>/verify/",
+        views.verify_quest_proofs,
+        name="verify_quest_proofs",
+    ),
     # Additional endpoints from original spec (if needed)
     path(
         "tasks/content/<int:task_id>/", views.get_task_content, name="get_task_content"
     ),
+    path(
+        "tasks/content/<int:task_id>/stream/",
+        views.stream_task_content,
+        name="stream_task_content",
+    ),
     path(
         "learning/paths/<int:path_id>/",
         views.get_learning_path,
@@ -0,0 +1,206 @@
+import uuid
+import hashlib
+import logging
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from .models import LearningPath, Task, User, UserTask
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS = getattr(settings, "VIEW_CACHE_ALIAS", "default")
+CACHE_TIMEOUT = getattr(settings, "VIEW_CACHE_TIMEOUT", 5 * 60)
+USER_ID_TIMEOUT = 24 * 60 * 60  # telegram_id -> user id never changes
+
+# Scopes shared by every user; per-user scopes are "user:<id>"
+QUESTS = "quests"  # The quest catalogue
+TASKS = "tasks"  # Titles, rewards and lessons of existing tasks
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(scope):
+    return f"view_cache:version:{scope}"
+
+
+def user_scope(user_id):
+    return f"user:{user_id}"
+
+
+def _versions(scopes):
+    """Current version token of each scope, creating missing ones
+
+    Versions are random tokens rather than counters, so a version evicted
+    from the cache can never come back with a value an old entry was
+    stored under.
+    """
+    keys = [_version_key(scope) for scope in scopes]
+    found = _cache().get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in found}
+    if missing:
+        _cache().set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def current_version(scope):
+    """Version token of a scope; it changes whenever the scope is invalidated"""
+    return _versions([scope])[0]
+
+
+def _bump(scopes):
+    _cache().set_many({_version_key(scope): uuid.uuid4().hex for scope in scopes}, None)
+
+
+def invalidate(*scopes):
+    """Drop every cached response that depends on any of the scopes
+
+    Bumped now and again on commit, so a response cached from data read
+    before the writing transaction committed is not served afterwards.
+    """
+    scopes = [scope for scope in scopes if scope]
+    if not scopes:
+        return
+    _bump(scopes)
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def invalidate_users(user_ids):
+    invalidate(*(user_scope(user_id) for user_id in set(user_ids) if user_id))
+
+
+def _user_id(telegram_id):
+    """Resolve a telegram id to a user id, None if there is no such user"""
+    key = f"view_cache:user_id:{telegram_id}"
+    user_id = _cache().get(key)
+    if user_id is None:
+        user_id = (
+            User.objects.filter(telegram_id=telegram_id)
+            .values_list("id", flat=True)
+            .first()
+        )
+        if user_id is not None:
+            _cache().set(key, user_id, USER_ID_TIMEOUT)
+    return user_id
+
+
+def _not_modified(request, etag):
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return "*" in etags or etag in etags
+
+
+def _respond(request, entry):
+    if _not_modified(request, entry["etag"]):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(
+            entry["content"],
+            status=entry["status"],
+            content_type=entry["content_type"],
+        )
+    response["ETag"] = entry["etag"]
+    return response
+
+
+def _lookup(name, scopes, telegram_id):
+    """(cache key, cached entry or None); no key if there is no such user"""
+    user_id = _user_id(telegram_id)
+    if user_id is None:
+        return None, None
+    versions = _versions([user_scope(user_id), *scopes])
+    raw = f"{name}|{telegram_id}|{'|'.join(versions)}"
+    key = f"view_cache:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+    return key, _cache().get(key)
+
+
+def _store(request, key, response):
+    if response.status_code != 200 or "no-store" in response.get("Cache-Control", ""):
+        return response
+
+    entry = {
+        "etag": quote_etag(hashlib.sha1(response.content).hexdigest()),
+        "content": response.content,
+        "status": response.status_code,
+        "content_type": response["Content-Type"],
+    }
+    _cache().set(key, entry, CACHE_TIMEOUT)
+    return _respond(request, entry)
+
+
+def cached_user_view(name, scopes=()):
+    """Serve a per-user GET view from the cache with ETag/304 support
+
+    The view takes ``telegram_id``; its responses are keyed on the versions
+    of the user's scope plus ``scopes``, and any write to them invalidates
+    the entry. Only 200 responses without ``Cache-Control: no-store`` are
+    stored. Async views get an async wrapper.
+    """
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+
+            @wraps(view)
+            async def async_wrapper(request, telegram_id, **kwargs):
+                key, entry = await sync_to_async(_lookup)(name, scopes, telegram_id)
+                if entry is not None:
+                    return _respond(request, entry)
+                response = await view(request, telegram_id, **kwargs)
+                if key is None:
+                    return response
+                return await sync_to_async(_store)(request, key, response)
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, telegram_id, **kwargs):
+            key, entry = _lookup(name, scopes, telegram_id)
+            if entry is not None:
+                return _respond(request, entry)
+            response = view(request, telegram_id, **kwargs)
+            if key is None:
+                return response
+            return _store(request, key, response)
+
+        return wrapper
+
+    return decorator
+
+
+# Saves through the ORM invalidate here; bulk writes call invalidate
+# themselves
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _user_changed(sender, instance, **kwargs):
+    invalidate_users([instance.id])
+
+
+@receiver(post_save, sender=UserTask)
+@receiver(post_delete, sender=UserTask)
+@receiver(post_save, sender=LearningPath)
+@receiver(post_delete, sender=LearningPath)
+def _user_data_changed(sender, instance, **kwargs):
+    invalidate_users([instance.user_id])
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def _task_changed(sender, instance, created=False, **kwargs):
+    if created:
+        # A new task is seen only once assigned, unless it is a quest
+        if instance.task_type == "quest":
+            invalidate(QUESTS)
+        return
+    invalidate(QUESTS, TASKS)
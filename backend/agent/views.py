@@ -1,15 +1,29 @@
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 import json
 import logging
-from .models import User, Task, UserTask, LearningPath
+from .models import User, Task, UserTask, LearningPath, PathJob, GradingRequest
 from .ai_core import LearnEarnAIAgent
-from .blockchain import issue_token_reward, mint_nft_badge
-from time import timezone
+from .content_store import (
+    aget_lesson_content,
+    get_lesson_content,
+    stream_lesson_content,
+)
+from .grading import grading_metrics, grading_status
+from .structured import structured_output_stats
+from .jobs import submit_path_job, get_job_status
+from .notifications import notify_new_task
+from .prompt_cache import task_template_cache
+from .view_cache import QUESTS, TASKS, cached_user_view
+from .claims import asend_badge_mint, asend_claim, open_badge_mint, open_claim
+from .bulk_verify import pending_quest_proofs, verify_proofs_bulk
+from .requirements import RequirementError, compile_requirements
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from django.views.generic import TemplateView
 from django.conf import settings
-from telegram import Bot
 
 logger = logging.getLogger(__name__)
 ai_agent = LearnEarnAIAgent()
@@ -19,45 +33,6 @@ class FrontendView(TemplateView):
     template_name = "index.html"
 
 
-def send_telegram_notification(user_telegram_id, task):
-    try:
-        # Skip if in testing or no token
-        if not settings.TELEGRAM_BOT_TOKEN or getattr(settings, "TESTING", False):
-            return False
-
-        # Validate required fields
-        if not all([user_telegram_id, task.id, task.title]):
-            logger.warning("Invalid notification parameters")
-            return False
-
-        bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
-
-        # Format message with emojis and Markdown
-        message = (
-            f"🎯 *New Task Available!*\n\n"
-            f"**{task.title}**\n"
-            f"📍 {task.description[:100]}...\n\n"
-            f"🏆 Reward: {task.xp_reward} XP"
-            f"{f' + {task.token_reward} LEARN' if task.token_reward else ''}\n"
-            f"🔗 [Open in App]({settings.WEBAPP_URL}/task/{task.id})"
-        )
-
-        bot.send_message(
-            chat_id=user_telegram_id,
-            text=message,
-            parse_mode="Markdown",
-            disable_web_page_preview=True,
-        )
-        return True
-
-    except Exception as e:
-        logger.error(
-            f"Telegram notification failed: {str(e)}",
-            extra={"user_id": user_telegram_id, "task_id": task.id},
-        )
-        return False
-
-
 # Helper functions
 def get_request_data(request):
     try:
@@ -80,53 +55,94 @@ def success_response(data=None):
 # System endpoints
 @require_http_methods(["GET"])
 def health_check(request):
-    return success_response({"status": "healthy"})
+    return success_response(
+        {"status": "healthy", "task_template_cache": task_template_cache.stats()}
+    )
 
 
 # User onboarding flow
 @csrf_exempt
 @require_http_methods(["POST"])
-def onboard_user(request):
-    """Complete user onboarding and create initial learning path"""
+async def onboard_user(request):
+    """Complete user onboarding and queue the initial learning path"""
     data = get_request_data(request)
     if not data or "telegram_id" not in data or "interest" not in data:
         return error_response("Telegram ID and interest are required")
 
     try:
         # Create or update user
-        user, created = User.objects.get_or_create(
+        wallet_address = data.get("wallet_address")
+        user, created = await User.objects.aget_or_create(
             telegram_id=data["telegram_id"],
             defaults={
                 "interests": {"primary": data["interest"]},
-                "wallet_address": data.get("wallet_address"),
+                "wallet_addresses": (
+                    {"gnosis": wallet_address} if wallet_address else {}
+                ),
             },
         )
 
-        # Create initial learning path
-        path_result = ai_agent.create_personalized_path(
-            user.telegram_id, data["interest"]
-        )
-        if not path_result["success"]:
-            return error_response(path_result["error"])
+        # Path generation runs in the background; the client polls the job
+        job = await sync_to_async(submit_path_job)(user, data["interest"], ai_agent)
 
-        # Get first task to start with
-        first_task = (
-            UserTask.objects.filter(user=user, learning_path_id=path_result["path_id"])
-            .order_by("id")
-            .first()
+        return JsonResponse(
+            {
+                "success": True,
+                "onboarded": True,
+                "job_id": str(job.id),
+                "status": job.status,
+                "user_level": user.level,
+            },
+            status=202,
         )
 
+    except Exception as e:
+        logger.error(f"Onboarding error: {e}")
+        return error_response(str(e))
+
+
+@require_http_methods(["GET"])
+@cached_user_view("get_user_profile")
+def get_user_profile(request, telegram_id):
+    """Get user profile with progress summary"""
+    try:
+        user = User.objects.get(telegram_id=telegram_id)
         return success_response(
             {
-                "onboarded": True,
-                "path_id": path_result["path_id"],
-                "first_task_id": first_task.id if first_task else None,
-                "user_level": user.level,
+                "telegram_id": user.telegram_id,
+                "level": user.level,
+                "xp_points": user.xp_points,
+                "wallet_addresses": user.wallet_addresses,
+                "preferred_chain": user.preferred_chain,
+                "interests": user.interests,
             }
         )
+    except User.DoesNotExist:
+        return error_response("User not found", 404)
+    except Exception as e:
+        logger.error(f"Error getting user profile: {e}")
+        return error_response(str(e))
+
+
+# Wallet management
+@csrf_exempt
+@require_http_methods(["POST"])
+def update_wallet(request):
+    """Connect or update a wallet address for a chain"""
+    data = get_request_data(request)
+    if not data or "telegram_id" not in data or "wallet_address" not in data:
+        return error_response("Telegram ID and wallet address are required")
 
+    try:
+        user = User.objects.get(telegram_id=data["telegram_id"])
+        chain = data.get("chain", user.preferred_chain)
+        user.wallet_addresses[chain] = data["wallet_address"]
+        user.save(update_fields=["wallet_addresses", "updated_at"])
+        return success_response({"wallet_addresses": user.wallet_addresses})
+    except User.DoesNotExist:
+        return error_response("User not found", 404)
     except Exception as e:
-        logger.error(f"Onboarding error: {e}")
+        logger.error(f"Error updating wallet: {e}")
         return error_response(str(e))
 
 
@@ -134,42 +150,108 @@ def onboard_user(request):
 @csrf_exempt
 @require_http_methods(["POST"])
 def start_learning_path(request):
-    """Start a new learning path for user"""
+    """Queue a new learning path for user"""
     data = get_request_data(request)
     if not data or "telegram_id" not in data or "topic" not in data:
         return error_response("Telegram ID and topic are required")
 
     try:
-        result = ai_agent.create_personalized_path(data["telegram_id"], data["topic"])
-        if result["success"]:
-            return success_response(
-                {"path_id": result["path_id"], "steps_count": result["steps_count"]}
-            )
-        return error_response(result["error"])
+        user = User.objects.get(telegram_id=data["telegram_id"])
+        job = submit_path_job(user, data["topic"], ai_agent)
+        return JsonResponse(
+            {"success": True, "job_id": str(job.id), "status": job.status},
+            status=202,
+        )
+    except User.DoesNotExist:
+        return error_response("User not found", 404)
     except Exception as e:
         logger.error(f"Error creating learning path: {e}")
         return error_response(str(e))
 
 
 @require_http_methods(["GET"])
+def get_path_job(request, job_id):
+    """Poll the status of a learning path generation job"""
+    try:
+        job = PathJob.objects.get(id=job_id)
+        return success_response(get_job_status(job))
+    except PathJob.DoesNotExist:
+        return error_response("Job not found", 404)
+    except Exception as e:
+        logger.error(f"Error getting path job: {e}")
+        return error_response(str(e))
+
+
+@require_http_methods(["GET"])
+def get_learning_path(request, path_id):
+    """Get a learning path with its tasks"""
+    try:
+        path = LearningPath.objects.get(id=path_id)
+        user_tasks = (
+            UserTask.objects.filter(learning_path=path)
+            .select_related("task")
+            .order_by("order", "id")
+        )
+
+        return success_response(
+            {
+                "id": path.id,
+                "topic": path.topic,
+                "description": path.description,
+                "status": path.status,
+                "created_at": path.created_at,
+                "tasks": [
+                    {
+                        "id": user_task.id,
+                        "task_id": user_task.task.id,
+                        "title": user_task.task.title,
+                        "type": user_task.task.task_type,
+                        "status": user_task.status,
+                    }
+                    for user_task in user_tasks
+                ],
+            }
+        )
+    except LearningPath.DoesNotExist:
+        return error_response("Learning path not found", 404)
+    except Exception as e:
+        logger.error(f"Error getting learning path: {e}")
+        return error_response(str(e))
+
+
+@require_http_methods(["GET"])
+@cached_user_view("get_user_paths")
 def get_user_paths(request, telegram_id):
     """Get all learning paths for user"""
     try:
-        user = User.objects.get(telegram_id=telegram_id)
-        paths = LearningPath.objects.filter(user=user).order_by("-created_at")
+        user_id = User.objects.values_list("id", flat=True).get(telegram_id=telegram_id)
+        # Progress counters are denormalized on the path, so this is one query
+        paths = (
+            LearningPath.objects.filter(user_id=user_id)
+            .order_by("-created_at")
+            .values(
+                "id",
+                "topic",
+                "status",
+                "created_at",
+                "task_count",
+                "completed_task_count",
+            )
+        )
 
         return success_response(
             {
                 "paths": [
                     {
-                        "id": path.id,
-                        "topic": path.topic,
-                        "status": path.status,
-                        "created_at": path.created_at,
-                        "progress": UserTask.objects.filter(
-                            learning_path=path, status__in=["completed", "verified"]
-                        ).count()
-                        / UserTask.objects.filter(learning_path=path).count(),
+                        "id": path["id"],
+                        "topic": path["topic"],
+                        "status": path["status"],
+                        "created_at": path["created_at"],
+                        "progress": (
+                            path["completed_task_count"] / path["task_count"]
+                            if path["task_count"]
+                            else 0.0
+                        ),
                     }
                     for path in paths
                 ]
@@ -184,30 +266,34 @@ def get_user_paths(request, telegram_id):
 
 # Task management
 @require_http_methods(["GET"])
-def get_current_task(request, telegram_id):
+@cached_user_view("get_current_task", scopes=[TASKS])
+async def get_current_task(request, telegram_id):
     """Get user's current active task"""
     try:
-        user = User.objects.get(telegram_id=telegram_id)
-        task = (
+        user = await User.objects.aget(telegram_id=telegram_id)
+        task = await (
             UserTask.objects.filter(user=user, status__in=["active", "pending"])
+            .select_related("task")
             .order_by("id")
-            .first()
+            .afirst()
         )
 
         if not task:
             return success_response({"has_task": False})
 
-        # Generate content if it's a learning task
+        # Lesson content is generated once and then served from the store
         content = {}
         if task.task.task_type == "learning":
-            content_result = ai_agent.generate_lesson_content(task.task.id)
+            content_result = await aget_lesson_content(task.task, ai_agent)
             if content_result["success"]:
                 content = {
                     "lesson": content_result["lesson"],
                     "quiz": content_result["quiz"],
                 }
+            elif content_result.get("pending"):
+                content = {"pending": True}
 
-        return success_response(
+        response = success_response(
             {
                 "has_task": True,
                 "task_id": task.id,
@@ -219,6 +305,10 @@ def get_current_task(request, telegram_id):
                 "content": content,
             }
         )
+        if content.get("pending"):
+            # The lesson is still generating; the client polls for it
+            patch_cache_control(response, no_store=True)
+        return response
     except User.DoesNotExist:
         return error_response("User not found", 404)
     except Exception as e:
@@ -226,6 +316,64 @@ def get_current_task(request, telegram_id):
         return error_response(str(e))
 
 
+@require_http_methods(["GET"])
+def get_task_content(request, task_id):
+    """Get lesson and quiz content for a learning task"""
+    try:
+        task = Task.objects.get(id=task_id)
+        content_result = get_lesson_content(task, ai_agent)
+        if content_result["success"]:
+            return success_response(
+                {
+                    "task_id": task.id,
+                    "lesson": content_result["lesson"],
+                    "quiz": content_result["quiz"],
+                    "version": content_result["version"],
+                }
+            )
+        if content_result.get("pending"):
+            return JsonResponse(
+                {"success": False, "pending": True, "error": content_result["error"]},
+                status=202,
+            )
+        return error_response(content_result["error"])
+    except Task.DoesNotExist:
+        return error_response("Task not found", 404)
+    except Exception as e:
+        logger.error(f"Error getting task content: {e}")
+        return error_response(str(e))
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@require_http_methods(["GET"])
+async def stream_task_content(request, task_id):
+    """Stream a learning task's lesson as server-sent events (ASGI only)
+
+    Events: "lesson" deltas, "quiz" once generated, then "done"; "pending"
+    if another request is generating the lesson, "error" on failure.
+    """
+    try:
+        task = await Task.objects.aget(id=task_id)
+    except Task.DoesNotExist:
+        return error_response("Task not found", 404)
+    if task.task_type != "learning":
+        return error_response("Not a learning task")
+
+    response = StreamingHttpResponse(
+        (
+            sse_event(event, data)
+            async for event, data in stream_lesson_content(task, ai_agent)
+        ),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Keep nginx from buffering the stream
+    return response
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def start_task(request, user_task_id):
@@ -249,14 +397,14 @@ def start_task(request, user_task_id):
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def verify_task(request, user_task_id):
+async def verify_task(request, user_task_id):
     """Verify task completion with proof data"""
     data = get_request_data(request)
     if not data or "proof" not in data:
         return error_response("Proof data is required")
 
     try:
-        verification_result = ai_agent.verify_task_completion(
+        verification_result = await ai_agent.averify_task_completion(
             user_task_id, data["proof"]
         )
         if not verification_result["success"]:
@@ -269,6 +417,11 @@ def verify_task(request, user_task_id):
 
         if "tokens_earned" in verification_result:
             response_data["tokens_earned"] = verification_result["tokens_earned"]
+        if "grading_id" in verification_result:
+            response_data["grading_id"] = verification_result["grading_id"]
+        if verification_result.get("pending_review"):
+            # Graded by the worker; poll get_grading_status or wait for Telegram
+            response_data["pending_review"] = True
 
         return success_response(response_data)
     except Exception as e:
@@ -276,8 +429,33 @@ def verify_task(request, user_task_id):
         return error_response(str(e))
 
 
+@require_http_methods(["GET"])
+def get_grading_status(request, grading_id):
+    """Poll the review of a social proof or submission"""
+    try:
+        grading = GradingRequest.objects.get(id=grading_id)
+        return success_response(grading_status(grading))
+    except GradingRequest.DoesNotExist:
+        return error_response("Grading request not found", 404)
+    except Exception as e:
+        logger.error(f"Error getting grading status: {e}")
+        return error_response(str(e))
+
+
+@require_http_methods(["GET"])
+def get_grading_metrics(request):
+    """Grading queue depth and throughput, and model reply parse outcomes"""
+    return success_response(
+        {
+            "grading": grading_metrics(),
+            "structured_output": structured_output_stats(),
+        }
+    )
+
+
 # Quest system
 @require_http_methods(["GET"])
+@cached_user_view("get_available_quests", scopes=[QUESTS])
 def get_available_quests(request, telegram_id):
     """Get available quests from projects"""
     try:
@@ -303,8 +481,8 @@ def assign_quest(request, quest_id, telegram_id):
 
         user_task = UserTask.objects.create(user=user, task=quest, status="pending")
 
-        # Send notification
-        send_telegram_notification(user.telegram_id, quest)
+        # Queued; the notification worker sends it
+        notify_new_task(user.telegram_id, quest)
 
         return success_response(
             {"assigned": True, "task_id": user_task.id, "title": quest.title}
@@ -319,36 +497,33 @@ def assign_quest(request, quest_id, telegram_id):
 # Reward system
 @csrf_exempt
 @require_http_methods(["POST"])
-def claim_tokens(request, telegram_id):
+async def claim_tokens(request, telegram_id):
     """Claim accumulated token rewards"""
     try:
-        user = User.objects.get(telegram_id=telegram_id)
-        if not user.wallet_address:
+        user = await User.objects.aget(telegram_id=telegram_id)
+        wallet_address = user.wallet_addresses.get(user.preferred_chain)
+        if not wallet_address:
             return error_response("User has no wallet connected")
 
-        # Get all verified tasks with token rewards not yet claimed
-        tasks = UserTask.objects.filter(
-            user=user, status="verified", task__token_reward__gt=0
-        ).exclude(verification_data__has_key="tokens_claimed")
-
-        total_tokens = sum(task.task.token_reward for task in tasks)
-        if total_tokens == 0:
+        # Pending rewards are summed in SQL and linked to one claim record
+        claim = await sync_to_async(open_claim)(user, wallet_address)
+        if claim is None:
             return error_response("No tokens to claim")
 
-        # Send transaction
-        tx_result = issue_token_reward(user.wallet_address, total_tokens)
-        if not tx_result["success"]:
+        # Sent at most once per claim; a retry returns the original transfer
+        claim = await asend_claim(claim)
+        if claim.status == "sending":
+            return error_response("Token transfer already in progress", 409)
+        if claim.status != "sent":
             return error_response("Token transfer failed")
 
-        # Mark tasks as claimed
-        for task in tasks:
-            verification_data = task.verification_data or {}
-            verification_data["tokens_claimed"] = True
-            task.verification_data = verification_data
-            task.save()
-
         return success_response(
-            {"tx_hash": tx_result["tx_hash"], "tokens_claimed": total_tokens}
+            {
+                "claim_id": claim.id,
+                "tx_hash": claim.tx_hash,
+                "tokens_claimed": float(claim.amount),
+                "tasks_claimed": claim.task_count,
+            }
         )
     except User.DoesNotExist:
         return error_response("User not found", 404)
@@ -359,11 +534,12 @@ def claim_tokens(request, telegram_id):
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def claim_nft_badge(request, telegram_id):
+async def claim_nft_badge(request, telegram_id):
     """Claim NFT badge for level achievement"""
     try:
-        user = User.objects.get(telegram_id=telegram_id)
-        if not user.wallet_address:
+        user = await User.objects.aget(telegram_id=telegram_id)
+        wallet_address = user.wallet_addresses.get(user.preferred_chain)
+        if not wallet_address:
             return error_response("User has no wallet connected")
 
         # Check if user has reached a level that qualifies for NFT
@@ -371,9 +547,9 @@ def claim_nft_badge(request, telegram_id):
             return error_response("User level too low for NFT badge")
 
         # Check if already claimed
-        if UserTask.objects.filter(
+        if await UserTask.objects.filter(
             user=user, task__nft_reward=True, status="verified"
-        ).exists():
+        ).aexists():
             return error_response("NFT already claimed for this level")
 
         # Mint NFT
@@ -384,15 +560,21 @@ def claim_nft_badge(request, telegram_id):
             "image": f"https://ipfs.io/ipfs/badges/level_{user.level}.png",
         }
 
-        tx_result = mint_nft_badge(user.wallet_address, badge_data)
-        if not tx_result["success"]:
+        # One mint record per level; only the request that sends it mints
+        mint = await sync_to_async(open_badge_mint)(user, wallet_address, badge_data)
+        if mint.status == "sent":
+            return error_response("NFT already claimed for this level")
+        mint = await asend_badge_mint(mint, badge_data)
+        if mint.status == "sending":
+            return error_response("NFT minting already in progress", 409)
+        if mint.status != "sent":
             return error_response("NFT minting failed")
 
         return success_response(
             {
-                "tx_hash": tx_result["tx_hash"],
-                "token_uri": tx_result["token_uri"],
-                "level": user.level,
+                "tx_hash": mint.tx_hash,
+                "token_uri": mint.token_uri,
+                "level": mint.level,
             }
         )
     except User.DoesNotExist:
@@ -413,6 +595,12 @@ def create_project_quest(request):
     if not data or any(field not in data for field in required_fields):
         return error_response("Missing required fields")
 
+    try:
+        # Reject requirements that cannot be compiled before the quest exists
+        compile_requirements(data.get("verification_data", {}).get("requirements"))
+    except RequirementError as e:
+        return error_response(str(e))
+
     try:
         # Verify project API key if needed
         # project_api_key = request.headers.get('X-Project-API-Key')
@@ -431,9 +619,56 @@ def create_project_quest(request):
             min_level=data.get("min_level", 1),
             verification_type=data["verification_type"],
             verification_data=data.get("verification_data", {}),
+            supported_chains=data.get("supported_chains", []),
+            tags=[str(tag).lower() for tag in data.get("tags", [])],
         )
 
         return success_response({"quest_id": quest.id, "title": quest.title})
     except Exception as e:
         logger.error(f"Error creating project quest: {e}")
         return error_response(str(e))
+
+
+def _ndjson_lines(results):
+    """Serialize results as NDJSON, ending with an error line if one fails
+
+    The response status is already sent once streaming starts, so errors
+    raised by the results iterator are reported in the body instead.
+    """
+    try:
+        for result in results:
+            yield json.dumps(result) + "\n"
+    except Exception as e:
+        logger.error(f"Error streaming quest proof results: {e}")
+        yield json.dumps({"error": str(e)}) + "\n"
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def verify_quest_proofs(request, quest_id):
+    """Verify transaction proofs for a quest in bulk, streaming NDJSON results"""
+    data = get_request_data(request) or {}
+
+    try:
+        quest = Task.objects.get(id=quest_id, task_type="quest")
+        if "proofs" in data:
+            proofs = [
+                (proof["user_task_id"], proof["transaction_hash"])
+                for proof in data["proofs"]
+            ]
+        else:
+            proofs = pending_quest_proofs(quest.id)
+
+        results = verify_proofs_bulk(
+            quest.id, proofs, chain=data.get("chain", "gnosis")
+        )
+        return StreamingHttpResponse(
+            _ndjson_lines(results), content_type="application/x-ndjson"
+        )
+    except Task.DoesNotExist:
+        return error_response("Quest not found", 404)
+    except (KeyError, TypeError):
+        return error_response("Each proof needs user_task_id and transaction_hash")
+    except Exception as e:
+        logger.error(f"Error verifying quest proofs: {e}")
+        return error_response(str(e))
@@ -0,0 +1,101 @@
+import logging
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
+from .models import User, UserTask, XPLedgerEntry
+from .progress import refresh_path_progress
+from .view_cache import invalidate_users
+
+logger = logging.getLogger(__name__)
+
+XP_PER_LEVEL = 100
+
+
+def level_for_xp(xp):
+    """Calculate user level based on XP: every 100 XP is a level"""
+    return max(1, xp // XP_PER_LEVEL + 1)
+
+
+def award_xp(user_id, amount, reason, user_task=None):
+    """Add XP to one user; returns {"xp_points", "level", "level_up"}"""
+    return award_xp_bulk([(user_id, amount, reason, user_task)])[user_id]
+
+
+def award_xp_bulk(awards):
+    """Apply (user_id, amount, reason, user_task) awards in one transaction
+
+    Users are locked in id order so concurrent batches cannot deadlock, each
+    user row is written once with only its XP columns, and every award is
+    appended to the ledger. Returns the outcome per user id.
+    """
+    totals = defaultdict(int)
+    for user_id, amount, _, _ in awards:
+        totals[user_id] += amount
+
+    now = timezone.now()
+    results = {}
+    # Joins the caller's transaction if there is one; no savepoint needed
+    with transaction.atomic(savepoint=False):
+        users = list(
+            User.objects.select_for_update()
+            .filter(id__in=totals)
+            .order_by("id")
+            .only("id", "xp_points", "level")
+        )
+        balances = {}
+        for user in users:
+            balances[user.id] = user.xp_points
+            old_level = user.level
+            user.xp_points += totals[user.id]
+            # Levels are never taken away
+            user.level = max(user.level, level_for_xp(user.xp_points))
+            user.updated_at = now
+            results[user.id] = {
+                "xp_points": user.xp_points,
+                "level": user.level,
+                "level_up": user.level > old_level,
+            }
+        User.objects.bulk_update(users, ["xp_points", "level", "updated_at"])
+
+        entries = []
+        for user_id, amount, reason, user_task in awards:
+            balances[user_id] += amount
+            entries.append(
+                XPLedgerEntry(
+                    user_id=user_id,
+                    user_task=user_task,
+                    amount=amount,
+                    reason=reason,
+                    balance=balances[user_id],
+                )
+            )
+        XPLedgerEntry.objects.bulk_create(entries)
+        # bulk_update sends no signals
+        invalidate_users(totals)
+    return results
+
+
+def complete_user_task(user_task, verification_data, reason):
+    """Mark a user task verified and award its XP exactly once
+
+    Returns the award, or None if the task was already verified, e.g. by a
+    concurrent request with the same proof.
+    """
+    now = timezone.now()
+    with transaction.atomic(savepoint=False):
+        updated = (
+            UserTask.objects.filter(id=user_task.id)
+            .exclude(status="verified")
+            .update(
+                status="verified",
+                completed_at=now,
+                verification_data=verification_data,
+            )
+        )
+        if not updated:
+            return None
+        user_task.status = "verified"
+        user_task.completed_at = now
+        user_task.verification_data = verification_data
+        refresh_path_progress([user_task.learning_path_id])
+        return award_xp(user_task.user_id, user_task.task.xp_reward, reason, user_task)